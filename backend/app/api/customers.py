@@ -1,17 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.models.crm import CustomerCreate, CustomerUpdate
-from app.services.neo4j import Neo4jService
+from app.services.neo4j import AsyncNeo4jService
+from app.api.deps import get_neo4j_service
 
 router = APIRouter()
 
 @router.get("/")
-async def list_customers(skip: int = 0, limit: int = 100):
-    neo = Neo4jService()
-    try:
-        items = neo.list_customers(skip, limit)
-        return {"items": items, "skip": skip, "limit": limit}
-    finally:
-        neo.close()
+async def list_customers(skip: int = 0, limit: int = 100, neo: AsyncNeo4jService = Depends(get_neo4j_service)):
+    items = await neo.list_customers(skip, limit)
+    return {"items": items, "skip": skip, "limit": limit}
 
 @router.get("/{customer_id}")
 async def get_customer(customer_id: str):
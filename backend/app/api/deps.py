@@ -0,0 +1,21 @@
+from fastapi import Request
+from app.services.graphrag import GraphRAGService
+from app.services.graphrag_manager import GraphRAGManager
+from app.services.neo4j import AsyncNeo4jService
+from app.services.graph_lod import GraphLODCache
+from app.services.graph_snapshot import GraphSnapshotManager
+
+def get_graphrag_manager(request: Request) -> GraphRAGManager:
+    return request.app.state.graphrag
+
+def get_graphrag_service(request: Request) -> GraphRAGService:
+    return request.app.state.graphrag.service
+
+def get_neo4j_service(request: Request) -> AsyncNeo4jService:
+    return AsyncNeo4jService(driver=request.app.state.neo4j_driver)
+
+def get_graph_lod(request: Request) -> GraphLODCache:
+    return request.app.state.graph_lod
+
+def get_graph_snapshot(request: Request) -> GraphSnapshotManager:
+    return request.app.state.graph_snapshot
@@ -1,35 +1,118 @@
-from fastapi import APIRouter, Query
-from app.services.neo4j import Neo4jService
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from app.services.neo4j import AsyncNeo4jService
 from app.services.graphrag import GraphRAGService
-from app.core.config import settings
+from app.services.graph_export import ExportEncoder
+from app.services.graph_lod import GraphLODCache, MODES
+from app.services.graph_snapshot import GraphSnapshotManager
+from app.services.query_pool import run_blocking
+from app.api.deps import get_graphrag_service, get_neo4j_service, get_graph_lod, get_graph_snapshot
 
 router = APIRouter()
 
+CODE_LABELS = ["CodeFile","Component","Function","Hook","Import","Export"]
+
+def _rel_types(types: Optional[str]):
+    return [t.strip() for t in types.split(",") if t.strip()] if types else None
+
 @router.get("/export")
-async def export_graph(dataset: str = Query(default="crm")):
-    neo = Neo4jService()
+async def export_graph(
+    dataset: str = Query(default="crm"),
+    format: str = Query(default="json", description="json, or a streamed ndjson / arrow / msgpack export"),
+    props: Optional[str] = Query(default=None, description="comma-separated node properties to keep (streamed formats); empty keeps none"),
+    page_size: Optional[int] = Query(default=None, ge=1),
+    lod: Optional[str] = Query(default=None, description="directory or community: aggregated super-nodes instead of the raw graph"),
+    neo: AsyncNeo4jService = Depends(get_neo4j_service),
+    lods: GraphLODCache = Depends(get_graph_lod),
+    snapshots: GraphSnapshotManager = Depends(get_graph_snapshot),
+):
+    labels = CODE_LABELS if dataset == "code" else None
+    if lod is not None:
+        if lod not in MODES:
+            raise HTTPException(status_code=400, detail=f"lod must be one of {', '.join(MODES)}")
+        return (await lods.get(neo, dataset, labels)).view(lod)
+    if format == "json":
+        # The snapshot only holds id-indexed nodes and a GraphRAG-sourced one is a different
+        # graph, so it stands in for the labelled (code) export from Neo4j only; the full export
+        # keeps returning every node.
+        snap = snapshots.get() if labels else None
+        if snap is not None and snapshots.source == "neo4j":
+            return await run_blocking(snap.export, labels)
+        if labels:
+            return await neo.export_graph_for_labels(labels)
+        return await neo.export_graph_for_graphrag()
     try:
-        if dataset == "code":
-            return neo.export_graph_for_labels(["CodeFile","Component","Function","Hook","Import","Export"])
-        return neo.export_graph_for_graphrag()
-    finally:
-        neo.close()
+        enc = ExportEncoder(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    keep = [p.strip() for p in props.split(",") if p.strip()] if props is not None else None
+
+    async def body():
+        async for kind, items in neo.export_stream(labels, props=keep, page_size=page_size):
+            yield enc.encode(kind, items)
+        yield enc.close()
+
+    return StreamingResponse(body(), media_type=enc.media_type)
+
+@router.get("/export/members")
+async def export_members(
+    group: str,
+    dataset: str = Query(default="crm"),
+    lod: str = Query(default="directory"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=500, ge=1, le=5000),
+    neo: AsyncNeo4jService = Depends(get_neo4j_service),
+    lods: GraphLODCache = Depends(get_graph_lod),
+):
+    if lod not in MODES:
+        raise HTTPException(status_code=400, detail=f"lod must be one of {', '.join(MODES)}")
+    res = (await lods.get(neo, dataset, CODE_LABELS if dataset == "code" else None)).members(lod, group, offset=offset, limit=limit)
+    if res is None:
+        raise HTTPException(status_code=404, detail=f"Group {group} not found")
+    return res
 
 @router.get("/neighbors/{node_id}")
-async def get_neighbors(node_id: str, depth: int = 1):
-    neo = Neo4jService()
-    try:
-        return neo.get_neighbors(node_id=node_id, depth=depth)
-    finally:
-        neo.close()
+async def get_neighbors(
+    node_id: str,
+    depth: int = Query(default=1, ge=1),
+    types: Optional[str] = Query(default=None, description="comma-separated relationship types"),
+    limit: Optional[int] = Query(default=None, ge=1, description="edges of the node itself per page"),
+    fanout: Optional[int] = Query(default=None, ge=1, description="edges expanded per node at each further hop"),
+    cursor: Optional[str] = None,
+    neo: AsyncNeo4jService = Depends(get_neo4j_service),
+    snapshots: GraphSnapshotManager = Depends(get_graph_snapshot),
+):
+    rel_types = _rel_types(types)
+    snap = snapshots.get()
+    # Served from the in-memory snapshot when it knows the node, otherwise (not loaded yet,
+    # or the node is newer than the snapshot) from Neo4j.
+    if snap is not None and node_id in snap:
+        return snap.neighbors(node_id, depth=depth, rel_types=rel_types, limit=limit, fanout=fanout, cursor=cursor)
+    return await neo.get_neighbors(node_id=node_id, depth=depth, rel_types=rel_types, limit=limit, fanout=fanout, cursor=cursor)
 
 @router.get("/path/{source_id}/{target_id}")
-async def find_path(source_id: str, target_id: str):
-    return {"source": source_id, "target": target_id, "path": []}
+async def find_path(
+    source_id: str,
+    target_id: str,
+    max_hops: Optional[int] = Query(default=None, ge=1, description="longest path searched (capped by GRAPH_PATH_MAX_HOPS)"),
+    types: Optional[str] = Query(default=None, description="comma-separated relationship types"),
+    directed: bool = Query(default=False, description="follow relationships in their direction only"),
+    neo: AsyncNeo4jService = Depends(get_neo4j_service),
+    snapshots: GraphSnapshotManager = Depends(get_graph_snapshot),
+):
+    rel_types = _rel_types(types)
+    snap = snapshots.get()
+    if snap is not None and source_id in snap and target_id in snap:
+        res = snap.shortest_path(source_id, target_id, max_hops=max_hops, rel_types=rel_types, directed=directed)
+    else:
+        res = await neo.shortest_path(source_id, target_id, max_hops=max_hops, rel_types=rel_types, directed=directed)
+    if res is None:
+        return {"source": source_id, "target": target_id, "path": [], "nodes": [], "edges": [], "length": None}
+    return {"source": source_id, "target": target_id, **res}
 
 @router.post("/import/ast")
-async def import_ast_graph():
-    svc = GraphRAGService(settings.graphrag_index_path)
+async def import_ast_graph(svc: GraphRAGService = Depends(get_graphrag_service), neo: AsyncNeo4jService = Depends(get_neo4j_service), lods: GraphLODCache = Depends(get_graph_lod)):
     if svc.entities is None or svc.relationships is None:
         return {"imported": False, "reason": "No artifacts loaded"}
     try:
@@ -37,12 +120,9 @@ async def import_ast_graph():
         rels = svc.relationships.to_dict(orient="records")
     except Exception as e:
         return {"imported": False, "reason": f"Artifacts to_dict failed: {str(e)}"}
-    neo = Neo4jService()
     try:
-        try:
-            res = neo.import_ast(ents, rels)
-            return {"imported": True, **res}
-        except Exception as e:
-            return {"imported": False, "reason": f"Neo4j import failed: {str(e)}"}
-    finally:
-        neo.close()
+        res = await neo.import_ast(ents, rels)
+        lods.warm(neo, "code", CODE_LABELS)
+        return {"imported": True, **res}
+    except Exception as e:
+        return {"imported": False, "reason": f"Neo4j import failed: {str(e)}"}
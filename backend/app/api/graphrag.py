@@ -1,76 +1,203 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
-from app.models.queries import QueryRequest, DriftQueryRequest, ConversationalRequest
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager, AsyncExitStack
+from typing import Optional
+from app.models.queries import QueryRequest, BatchQueryRequest, DriftQueryRequest, ConversationalRequest
 from app.services.graphrag import GraphRAGService
-from app.core.config import settings
+from app.services.graphrag_manager import GraphRAGManager
 from app.services.ms_graphrag import MicrosoftGraphRAGIntegrator
+from app.services.query_pool import QueueFull, get_limiter, limiter_stats
+from app.services.query_cache import normalize_query, filters_key
+from app.core.config import settings
+from app.core.metrics import span, collect_trace, trace_summary
+from app.api.deps import get_graphrag_service, get_graphrag_manager
 
 router = APIRouter()
 
+@asynccontextmanager
+async def _slot(endpoint: str):
+    try:
+        async with get_limiter(endpoint).slot():
+            yield
+    except QueueFull:
+        raise HTTPException(status_code=503, detail=f"Too many concurrent {endpoint} queries", headers={"Retry-After": "1"})
+
+def _respond(res, trace, t0: float, **info) -> JSONResponse:
+    # Encoding happens here rather than in FastAPI so it shows up as its own stage.
+    with span("graphrag.serialize"):
+        content = jsonable_encoder(res)
+    if trace is not None:
+        content = {**content, "debug": {**info, "stages_ms": trace_summary(trace), "total_ms": round((time.perf_counter() - t0) * 1000.0, 3)}}
+    return JSONResponse(content)
+
+async def _cached(manager: GraphRAGManager, service: GraphRAGService, endpoint: str, key: tuple, run, debug: bool = False):
+    # Keyed on the snapshot that answers the request, so a reload can never serve old results.
+    t0 = time.perf_counter()
+    with collect_trace(bool(debug)) as trace:
+        full = (endpoint, service.version) + key
+        res = manager.cache.get(full)
+        hit = res is not None
+        if not hit:
+            async with _slot(endpoint):
+                res = await run()
+            manager.cache.put(full, res)
+        return _respond(res, trace, t0, cache="hit" if hit else "miss")
+
+def _local_key(query: QueryRequest) -> tuple:
+    return (normalize_query(query.query), query.top_k or 5, query.offset or 0, query.min_score or 0.0, filters_key(query.filters or None), query.nprobe)
+
 @router.post("/query/local")
-async def local_query(query: QueryRequest):
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return await service.local_search(
+async def local_query(query: QueryRequest, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    top_k, offset, min_score, filters = query.top_k or 5, query.offset or 0, query.min_score or 0.0, query.filters or None
+    return await _cached(
+        manager, service, "local",
+        _local_key(query),
+        lambda: service.local_search(query.query, query.history, top_k=top_k, offset=offset, min_score=min_score, filters=filters, nprobe=query.nprobe),
+        debug=query.debug,
+    )
+
+class _SlotStreamingResponse(StreamingResponse):
+    # Releases the limiter slot once the response has been sent, failed, or the client went
+    # away; unlike a finally in the body generator this also runs when iteration never starts.
+    def __init__(self, content, stack: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self._stack = stack
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._stack.aclose()
+
+async def _stream(request: Request, endpoint: str, events):
+    # The slot is taken before the response starts so a full queue is still a plain 503.
+    stack = AsyncExitStack()
+    await stack.enter_async_context(_slot(endpoint))
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for ev in events:
+            line = json.dumps(ev, default=str)
+            yield f"event: {ev['type']}\ndata: {line}\n\n" if sse else line + "\n"
+
+    return _SlotStreamingResponse(body(), stack, media_type="text/event-stream" if sse else "application/x-ndjson")
+
+@router.post("/query/local/stream")
+async def local_query_stream(query: QueryRequest, request: Request, service: GraphRAGService = Depends(get_graphrag_service)):
+    return await _stream(request, "local", service.local_search_stream(
         query.query,
-        query.history,
         top_k=query.top_k or 5,
         offset=query.offset or 0,
         min_score=query.min_score or 0.0,
         filters=query.filters or None,
-    )
+        nprobe=query.nprobe,
+    ))
+
+@router.post("/query/global/stream")
+async def global_query_stream(query: QueryRequest, request: Request, service: GraphRAGService = Depends(get_graphrag_service)):
+    return await _stream(request, "global", service.global_search_stream(query.query, top_k=query.top_k or 5))
+
+@router.post("/query/batch")
+async def batch_query(batch: BatchQueryRequest, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    if len(batch.queries) > settings.graphrag_query_batch_max:
+        raise HTTPException(status_code=413, detail=f"At most {settings.graphrag_query_batch_max} queries per batch")
+    # Answers are shared with /query/local: cached ones are reused and only the rest are scored.
+    t0 = time.perf_counter()
+    with collect_trace(bool(batch.debug)) as trace:
+        keys = [("local", service.version) + _local_key(q) for q in batch.queries]
+        results = [manager.cache.get(k) for k in keys]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            async with _slot("batch"):
+                fresh = await service.batch_local_search([
+                    {
+                        "query": q.query,
+                        "top_k": q.top_k or 5,
+                        "offset": q.offset or 0,
+                        "min_score": q.min_score or 0.0,
+                        "filters": q.filters or None,
+                        "nprobe": q.nprobe,
+                    }
+                    for q in (batch.queries[i] for i in todo)
+                ])
+            for i, res in zip(todo, fresh):
+                manager.cache.put(keys[i], res)
+                results[i] = res
+        return _respond({"results": results}, trace, t0, cached=len(keys) - len(todo), computed=len(todo))
 
 @router.post("/query/global")
-async def global_query(query: QueryRequest):
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return await service.global_search(query.query, query.history, top_k=query.top_k or 5)
+async def global_query(query: QueryRequest, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    top_k = query.top_k or 5
+    return await _cached(
+        manager, service, "global",
+        (normalize_query(query.query), top_k),
+        lambda: service.global_search(query.query, query.history, top_k=top_k),
+        debug=query.debug,
+    )
 
 @router.post("/query/drift")
-async def drift_query(query: DriftQueryRequest):
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return await service.drift_search(
-        query.query,
-        query.periods,
-        top_k=query.top_k or 5,
-        min_score=query.min_score or 0.0,
-        filters=query.filters or None,
+async def drift_query(query: DriftQueryRequest, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    top_k, min_score, filters = query.top_k or 5, query.min_score or 0.0, query.filters or None
+    return await _cached(
+        manager, service, "drift",
+        (normalize_query(query.query), tuple(query.periods), top_k, min_score, filters_key(filters), query.nprobe),
+        lambda: service.drift_search(query.query, query.periods, top_k=top_k, min_score=min_score, filters=filters, nprobe=query.nprobe),
+        debug=query.debug,
     )
 
 @router.post("/query/conversational")
-async def conversational_query(query: ConversationalRequest):
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return await service.local_search(query.query, query.history)
+async def conversational_query(query: ConversationalRequest, service: GraphRAGService = Depends(get_graphrag_service)):
+    async with _slot("local"):
+        return await service.local_search(query.query, query.history)
 
 @router.get("/debug/index")
-async def debug_index():
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
+async def debug_index(service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
     return {
         "artifacts_dir": service.artifacts_dir,
+        "version": service.version[1] if service.version else None,
         "text_units_loaded": bool(service.text_units is not None and not service.text_units.empty),
         "entities_loaded": bool(service.entities is not None and not service.entities.empty),
         "relationships_loaded": bool(service.relationships is not None and not service.relationships.empty),
         "community_reports_loaded": bool(service.community_reports is not None and not service.community_reports.empty),
+        "query_limits": limiter_stats(),
+        "query_cache": manager.cache.stats(),
     }
 
+@router.get("/entities/search")
+async def search_entities(q: str, limit: int = Query(default=10, ge=1, le=100), service: GraphRAGService = Depends(get_graphrag_service)):
+    return {"query": q, "items": service.search_entities(q, limit=limit)}
+
 @router.get("/entities/{entity_id}")
-async def get_entity_details(entity_id: str):
-    return {"id": entity_id}
+async def get_entity_details(entity_id: str, service: GraphRAGService = Depends(get_graphrag_service)):
+    data = service.get_context_data(entity_id)
+    if not data:
+        raise HTTPException(status_code=404, detail=f"Entity {entity_id} not found")
+    return data
 
 @router.post("/index/embeddings")
-async def index_embeddings():
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return service.enrich_text_unit_embeddings()
+async def index_embeddings(batch_size: Optional[int] = None, concurrency: Optional[int] = None, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    res = await asyncio.to_thread(service.enrich_text_unit_embeddings, batch_size, concurrency)
+    await asyncio.to_thread(manager.refresh, True)
+    return res
 
 @router.post("/index/microsoft")
-async def index_with_microsoft():
+async def index_with_microsoft(manager: GraphRAGManager = Depends(get_graphrag_manager)):
     integrator = MicrosoftGraphRAGIntegrator()
     init_res = integrator.init_project()
     src = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "frontend", "src"))
     prep_res = integrator.prepare_input_from_dir(src)
     run_res = integrator.run_index()
     latest = integrator.latest_artifacts()
+    await asyncio.to_thread(manager.refresh)
     return {"init": init_res, "prepare": prep_res, "run": run_res, "artifacts": latest}
 
 @router.post("/index/gemini_graph")
-async def index_with_gemini_graph(limit: int = 50):
-    service = GraphRAGService(index_path=settings.graphrag_index_path)
-    return service.enrich_graph_with_gemini(limit=limit)
+async def index_with_gemini_graph(limit: Optional[int] = None, concurrency: Optional[int] = None, extractor: Optional[str] = None, service: GraphRAGService = Depends(get_graphrag_service), manager: GraphRAGManager = Depends(get_graphrag_manager)):
+    res = await asyncio.to_thread(service.enrich_graph_with_gemini, limit, concurrency, extractor)
+    await asyncio.to_thread(manager.refresh, True)
+    return res
@@ -1,15 +1,66 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_DRIFT_SEGMENTS = {
+    "Q1": r"frontend/src/components",
+    "Q2": r"frontend/src/app",
+    "Q3": r"frontend/src/lib",
+}
+
+DEFAULT_QUERY_CONCURRENCY = {"local": 8, "global": 8, "drift": 4, "batch": 2}
+DEFAULT_QUERY_QUEUE_DEPTH = {"local": 64, "global": 64, "drift": 32, "batch": 8}
+
+def _json_env(name: str, default):
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except Exception:
+        return default
+
 class Settings:
     def __init__(self):
         self.neo4j_uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.neo4j_user = os.getenv("NEO4J_USER", "neo4j")
         self.neo4j_password = os.getenv("NEO4J_PASSWORD", "password123")
+        self.neo4j_max_pool_size = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+        self.neo4j_acquisition_timeout = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+        self.neo4j_max_connection_lifetime = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+        self.neo4j_import_batch_size = int(os.getenv("NEO4J_IMPORT_BATCH_SIZE", "5000"))
+        self.neo4j_neighbors_limit = int(os.getenv("NEO4J_NEIGHBORS_LIMIT", "100"))
+        self.neo4j_neighbors_fanout = int(os.getenv("NEO4J_NEIGHBORS_FANOUT", "25"))
+        self.neo4j_neighbors_max_depth = int(os.getenv("NEO4J_NEIGHBORS_MAX_DEPTH", "3"))
+        self.neo4j_export_page_size = int(os.getenv("NEO4J_EXPORT_PAGE_SIZE", "5000"))
+        self.neo4j_init_schema = os.getenv("NEO4J_INIT_SCHEMA", "true").lower() not in ("0", "false", "no")
+        self.graph_snapshot_source = os.getenv("GRAPH_SNAPSHOT_SOURCE", "neo4j")
+        self.graph_snapshot_check_interval = float(os.getenv("GRAPH_SNAPSHOT_CHECK_INTERVAL", "5"))
+        self.graph_lod_check_interval = float(os.getenv("GRAPH_LOD_CHECK_INTERVAL", "5"))
+        self.graph_path_max_hops = int(os.getenv("GRAPH_PATH_MAX_HOPS", "10"))
         self.api_base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
         self.graphrag_index_path = os.getenv("GRAPHRAG_INDEX_PATH", "graphrag-pipeline/output")
+        self.graphrag_reload_interval = float(os.getenv("GRAPHRAG_RELOAD_INTERVAL", "5"))
+        self.graphrag_ann_nprobe = int(os.getenv("GRAPHRAG_ANN_NPROBE", "8"))
+        self.graphrag_ann_min_units = int(os.getenv("GRAPHRAG_ANN_MIN_UNITS", "5000"))
+        self.graphrag_drift_segments = _json_env("GRAPHRAG_DRIFT_SEGMENTS", DEFAULT_DRIFT_SEGMENTS)
+        self.graphrag_query_workers = int(os.getenv("GRAPHRAG_QUERY_WORKERS", "8"))
+        self.graphrag_query_concurrency = _json_env("GRAPHRAG_QUERY_CONCURRENCY", DEFAULT_QUERY_CONCURRENCY)
+        self.graphrag_query_queue_depth = _json_env("GRAPHRAG_QUERY_QUEUE_DEPTH", DEFAULT_QUERY_QUEUE_DEPTH)
+        self.graphrag_query_batch_max = int(os.getenv("GRAPHRAG_QUERY_BATCH_MAX", "256"))
+        self.graphrag_query_cache_size = int(os.getenv("GRAPHRAG_QUERY_CACHE_SIZE", "1024"))
+        self.graphrag_query_cache_ttl = float(os.getenv("GRAPHRAG_QUERY_CACHE_TTL", "300"))
         self.gemini_api_key = os.getenv("GEMINI_API_KEY", "")
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", "")
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        self.embedding_concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+        self.embedding_max_retries = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+        self.embedding_checkpoint_rows = int(os.getenv("EMBEDDING_CHECKPOINT_ROWS", "5000"))
+        self.graph_extraction_model = os.getenv("GRAPH_EXTRACTION_MODEL", "gemini")
+        self.graph_extraction_concurrency = int(os.getenv("GRAPH_EXTRACTION_CONCURRENCY", "8"))
+        self.graph_extraction_cache_path = os.getenv("GRAPH_EXTRACTION_CACHE_PATH", "")
 
 settings = Settings()
@@ -0,0 +1,149 @@
+import time
+import bisect
+import inspect
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; roughly Prometheus' defaults with more resolution below 10ms, where most stages sit.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+class Registry:
+    def __init__(self):
+        self._hists: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str = "", **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        h = self._hists.get(key)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(key, Histogram())
+                if help:
+                    self._help.setdefault(name, help)
+        return h
+
+    def add_collector(self, fn: Callable[[], Iterable[str]]):
+        # fn yields ready-made exposition lines (gauges, counters owned elsewhere).
+        self._collectors.append(fn)
+
+    def remove_collector(self, fn: Callable[[], Iterable[str]]):
+        if fn in self._collectors:
+            self._collectors.remove(fn)
+
+    def render(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            items = sorted(self._hists.items())
+        seen = set()
+        for (name, labels), h in items:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    out.append(f"# HELP {name} {self._help[name]}")
+                out.append(f"# TYPE {name} histogram")
+            counts, total, n = h.snapshot()
+            base = ",".join(f'{k}="{v}"' for k, v in labels)
+            sep = "," if base else ""
+            acc = 0
+            for le, c in zip(BUCKETS + (float("inf"),), counts):
+                acc += c
+                le_s = "+Inf" if le == float("inf") else repr(le)
+                out.append(f'{name}_bucket{{{base}{sep}le="{le_s}"}} {acc}')
+            lbl = f"{{{base}}}" if base else ""
+            out.append(f"{name}_sum{lbl} {total}")
+            out.append(f"{name}_count{lbl} {n}")
+        for fn in list(self._collectors):
+            try:
+                out.extend(fn())
+            except Exception:
+                pass
+        return "\n".join(out) + "\n"
+
+registry = Registry()
+
+SPAN_METRIC = "app_span_seconds"
+_span_hists: Dict[str, Histogram] = {}
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("span_trace", default=None)
+
+def _record(name: str, dt: float):
+    # Always feeds the histogram; additionally recorded per request when a trace is active.
+    h = _span_hists.get(name)
+    if h is None:
+        h = _span_hists.setdefault(name, registry.histogram(SPAN_METRIC, "Time spent per instrumented stage", span=name))
+    h.observe(dt)
+    tr = _trace.get()
+    if tr is not None:
+        tr.append((name, dt))
+
+@contextmanager
+def span(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - t0)
+
+def timed(name: str):
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def ainner(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _record(name, time.perf_counter() - t0)
+            return ainner
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - t0)
+        return inner
+    return wrap
+
+@contextmanager
+def collect_trace(enabled: bool = True):
+    # Yields the list spans are appended to, or None when tracing is off for this request.
+    if not enabled:
+        yield None
+        return
+    tr: List[Tuple[str, float]] = []
+    token = _trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _trace.reset(token)
+
+def trace_summary(tr: List[Tuple[str, float]]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for name, dt in tr:
+        out[name] = round(out.get(name, 0.0) + dt * 1000.0, 3)
+    return out
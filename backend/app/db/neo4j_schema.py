@@ -1,3 +1,12 @@
+CRM_LABELS = ["Customer", "Company", "Deal", "Interaction", "Product", "SalesRep"]
+CODE_LABELS = ["CodeFile", "Component", "Function", "Hook", "Import", "Export", "Code"]
+# Shared label on every code-graph node; its id index serves lookups that do not know the node's kind.
+CODE_NODE_LABEL = "CodeNode"
+# Single bookkeeping node holding a counter bumped by imports and CRM writes (see graph_version).
+GRAPH_META_LABEL = "GraphMeta"
+# Labels whose id is index-backed, i.e. what an unlabeled id lookup has to try.
+ID_LABELS = [CODE_NODE_LABEL] + CRM_LABELS
+
 def get_schema_statements():
     return [
         "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Customer) REQUIRE c.id IS UNIQUE",
@@ -6,10 +15,35 @@ def get_schema_statements():
         "CREATE CONSTRAINT IF NOT EXISTS FOR (i:Interaction) REQUIRE i.id IS UNIQUE",
         "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Product) REQUIRE p.id IS UNIQUE",
         "CREATE CONSTRAINT IF NOT EXISTS FOR (r:SalesRep) REQUIRE r.id IS UNIQUE",
+        # A plain index rather than a constraint: graphs imported before the shared label may
+        # hold duplicate ids, which would make the constraint (and startup) fail.
+        code_node_index_statement(),
     ]
 
+def code_node_index_statement():
+    return f"CREATE INDEX code_node_id IF NOT EXISTS FOR (n:{CODE_NODE_LABEL}) ON (n.id)"
+
+def code_node_backfill_statement():
+    # Idempotent backfill for code nodes written before the shared label; batched so a large
+    # graph does not need one huge transaction. Runs in auto-commit mode (IN TRANSACTIONS).
+    labels = ", ".join(f"'{l}'" for l in CODE_LABELS)
+    return (
+        f"MATCH (n) WHERE any(l IN labels(n) WHERE l IN [{labels}]) AND NOT n:{CODE_NODE_LABEL} "
+        f"CALL {{ WITH n SET n:{CODE_NODE_LABEL} }} IN TRANSACTIONS OF 10000 ROWS"
+    )
+
+def get_migration_statements():
+    return [code_node_backfill_statement()]
+
+AWAIT_INDEXES = "CALL db.awaitIndexes(300)"
+
 def init_schema(driver):
-    stmts = get_schema_statements()
     with driver.session() as session:
-        for s in stmts:
-            session.execute_write(lambda tx: tx.run(s))
\ No newline at end of file
+        for s in get_schema_statements() + [AWAIT_INDEXES] + get_migration_statements():
+            session.run(s).consume()
+
+async def ainit_schema(driver):
+    async with driver.session() as session:
+        for s in get_schema_statements() + [AWAIT_INDEXES] + get_migration_statements():
+            res = await session.run(s)
+            await res.consume()
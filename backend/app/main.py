@@ -1,8 +1,102 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api import customers, companies, deals, interactions, graphrag, analytics, graph
+from app.core.config import settings
+from app.services.graphrag_manager import GraphRAGManager
+from app.services.query_pool import shutdown_query_pool, limiter_stats
+from app.core.metrics import registry
+from app.services.neo4j import create_async_driver, pool_stats, add_write_listener, remove_write_listener
+from app.db.neo4j_schema import ainit_schema
+from app.services.graph_lod import GraphLODCache
+from app.services.graph_snapshot import GraphSnapshotManager
 
-app = FastAPI(title="Smart CRM API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+def _graphrag_metrics(manager: GraphRAGManager):
+    def collect():
+        c = manager.cache.stats()
+        yield "# TYPE graphrag_query_cache_hits_total counter"
+        yield f"graphrag_query_cache_hits_total {c['hits']}"
+        yield "# TYPE graphrag_query_cache_misses_total counter"
+        yield f"graphrag_query_cache_misses_total {c['misses']}"
+        yield "# TYPE graphrag_query_cache_entries gauge"
+        yield f"graphrag_query_cache_entries {c['size']}"
+        limits = limiter_stats()
+        for field, kind in (("running", "gauge"), ("waiting", "gauge"), ("rejected", "counter")):
+            name = f"graphrag_query_{field}" + ("_total" if kind == "counter" else "")
+            yield f"# TYPE {name} {kind}"
+            for endpoint, st in limits.items():
+                yield f'{name}{{endpoint="{endpoint}"}} {st[field]}'
+    return collect
+
+def _neo4j_metrics(driver):
+    def collect():
+        st = pool_stats(driver)
+        for key, name, kind in (
+            ("max_size", "neo4j_pool_max_size", "gauge"),
+            ("open", "neo4j_pool_connections_open", "gauge"),
+            ("in_use", "neo4j_pool_connections_in_use", "gauge"),
+            ("sessions_active", "neo4j_sessions_active", "gauge"),
+            ("sessions_total", "neo4j_sessions_total", "counter"),
+        ):
+            yield f"# TYPE {name} {kind}"
+            yield f"{name} {st[key]}"
+    return collect
+
+def _snapshot_metrics(manager: GraphSnapshotManager):
+    def collect():
+        st = manager.stats()
+        for key, name in (("ready", "graph_snapshot_ready"), ("nodes", "graph_snapshot_nodes"), ("edges", "graph_snapshot_edges")):
+            yield f"# TYPE {name} gauge"
+            yield f"{name} {int(st[key])}"
+    return collect
+
+async def _init_neo4j_schema(driver):
+    # Background so the API starts (and GraphRAG keeps working) while Neo4j is down or slow.
+    try:
+        await ainit_schema(driver)
+        logger.info("Neo4j schema ready")
+    except Exception as e:
+        logger.warning("Neo4j schema initialisation failed: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.graphrag = GraphRAGManager(settings.graphrag_index_path, reload_interval=settings.graphrag_reload_interval)
+    await app.state.graphrag.start()
+    app.state.neo4j_driver = create_async_driver()
+    app.state.graph_lod = GraphLODCache(settings.graph_lod_check_interval)
+    app.state.graph_snapshot = GraphSnapshotManager(app.state.neo4j_driver, app.state.graphrag, settings.graph_snapshot_source, settings.graph_snapshot_check_interval)
+    add_write_listener(app.state.graph_snapshot.on_write)
+    add_write_listener(app.state.graph_lod.on_write)
+    app.state.graph_snapshot.get()
+    schema_task = asyncio.create_task(_init_neo4j_schema(app.state.neo4j_driver)) if settings.neo4j_init_schema else None
+    collectors = [_graphrag_metrics(app.state.graphrag), _neo4j_metrics(app.state.neo4j_driver), _snapshot_metrics(app.state.graph_snapshot)]
+    for c in collectors:
+        registry.add_collector(c)
+    try:
+        yield
+    finally:
+        for c in collectors:
+            registry.remove_collector(c)
+        remove_write_listener(app.state.graph_lod.on_write)
+        remove_write_listener(app.state.graph_snapshot.on_write)
+        await app.state.graph_snapshot.stop()
+        await app.state.graphrag.stop()
+        shutdown_query_pool()
+        if schema_task is not None:
+            schema_task.cancel()
+            try:
+                await schema_task
+            except asyncio.CancelledError:
+                pass
+        await app.state.neo4j_driver.close()
+
+app = FastAPI(title="Smart CRM API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +106,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestTimer:
+    # Pure ASGI rather than BaseHTTPMiddleware: the clock stops on the final body message, so
+    # streamed responses (NDJSON/SSE search, Arrow/msgpack exports) are timed to their last byte
+    # instead of to their headers.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        done = False
+
+        def observe():
+            # Label by route template, not raw path, so ids do not explode the series count.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            registry.histogram("http_request_duration_seconds", "HTTP request latency by route", method=scope["method"], route=path).observe(time.perf_counter() - t0)
+
+        async def send_timed(message):
+            nonlocal done
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not done:
+                done = True
+                observe()
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # Errors and client disconnects end the request without a final body message.
+            if not done:
+                done = True
+                observe()
+
+app.add_middleware(RequestTimer)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(customers.router, prefix="/api/customers", tags=["customers"]) 
 app.include_router(companies.router, prefix="/api/companies", tags=["companies"]) 
 app.include_router(deals.router, prefix="/api/deals", tags=["deals"]) 
@@ -8,6 +8,12 @@ class QueryRequest(BaseModel):
     offset: Optional[int] = 0
     min_score: Optional[float] = 0.0
     filters: Optional[Dict[str, Any]] = None
+    nprobe: Optional[int] = None
+    debug: Optional[bool] = False
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+    debug: Optional[bool] = False
 
 class DriftQueryRequest(BaseModel):
     query: str
@@ -15,6 +21,8 @@ class DriftQueryRequest(BaseModel):
     top_k: Optional[int] = 5
     min_score: Optional[float] = 0.0
     filters: Optional[Dict[str, Any]] = None
+    nprobe: Optional[int] = None
+    debug: Optional[bool] = False
 
 class ConversationalRequest(BaseModel):
     query: str
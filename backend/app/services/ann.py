@@ -0,0 +1,82 @@
+import os
+import shutil
+from typing import List, Optional
+import numpy as np
+from app.services.artifact_store import EMBEDDINGS_FILE, save_arrays, load_arrays, source_paths
+
+ANN_INDEX_FILE = 'text_unit_embeddings.ivf'
+
+class IVFFlatIndex:
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, ids: np.ndarray, count: int):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.count = count
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.centroids.shape[1])
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, valid: Optional[np.ndarray] = None, nlist: Optional[int] = None, iters: int = 10, sample: int = 65536, seed: int = 0) -> "IVFFlatIndex":
+        rows = np.flatnonzero(valid) if valid is not None else np.arange(matrix.shape[0])
+        if rows.size == 0:
+            raise ValueError("no embeddings to index")
+        nlist = max(1, min(nlist or int(np.sqrt(rows.size)), 4096, rows.size))
+        rng = np.random.default_rng(seed)
+        train = matrix[rng.choice(rows, size=min(sample, rows.size), replace=False)]
+        centroids = train[rng.choice(train.shape[0], size=nlist, replace=False)].copy()
+        # Spherical k-means: rows are unit vectors, so the closest centroid is the one with the largest dot product.
+        for _ in range(iters):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = (sums / norms[:, None]).astype(np.float32)
+        assign = np.empty(rows.size, dtype=np.int64)
+        for start in range(0, rows.size, 65536):
+            chunk = rows[start:start + 65536]
+            assign[start:start + chunk.size] = np.argmax(matrix[chunk] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+        return cls(np.ascontiguousarray(centroids), offsets, rows[order].astype(np.int64), int(matrix.shape[0]))
+
+    def search(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        cs = self.centroids @ q
+        probe = np.argpartition(-cs, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        return np.concatenate([self.ids[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+    def save(self, path: str):
+        save_arrays(path, {'centroids': self.centroids, 'offsets': self.offsets, 'ids': self.ids}, {'count': self.count})
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFFlatIndex"]:
+        loaded = load_arrays(path, ('centroids', 'offsets', 'ids'))
+        if loaded is None:
+            return None
+        a, meta = loaded
+        return cls(a['centroids'], a['offsets'], a['ids'], int(meta['count']))
+
+def ann_sources(artifacts_dir: str) -> List[str]:
+    # The vectors come from the embeddings sidecar or the text units table, whichever is loaded.
+    return source_paths(artifacts_dir, 'create_final_text_units') + [os.path.join(artifacts_dir, EMBEDDINGS_FILE)]
+
+def write_ann_index(artifacts_dir: str, matrix: Optional[np.ndarray], valid: Optional[np.ndarray], min_units: int = 0) -> Optional[str]:
+    if not artifacts_dir or matrix is None:
+        return None
+    path = os.path.join(artifacts_dir, ANN_INDEX_FILE)
+    if int(valid.sum() if valid is not None else matrix.shape[0]) < max(1, min_units):
+        # An index left over from earlier embeddings would otherwise be probed with stale centroids.
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+    IVFFlatIndex.build(matrix, valid).save(path)
+    return path
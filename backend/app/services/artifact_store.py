@@ -0,0 +1,93 @@
+import os
+import json
+import shutil
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+EMBEDDINGS_FILE = 'text_unit_embeddings.npy'
+EMBEDDINGS_MASK_FILE = 'text_unit_embeddings.mask.npy'
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def is_fresh(path: str, sources: Iterable[str]) -> bool:
+    # A derived file is only trusted if nothing it was built from has been rewritten since.
+    t = _mtime(path)
+    return t > 0 and all(_mtime(s) <= t for s in sources)
+
+def source_paths(artifacts_dir: str, name: str) -> list:
+    return [os.path.join(artifacts_dir, name + ext) for ext in ('.parquet', '.json', '.csv')]
+
+def write_table(artifacts_dir: str, name: str, df: pd.DataFrame):
+    path = os.path.join(artifacts_dir, name + '.arrow')
+    table = pa.Table.from_pandas(df.drop(columns=['embedding'], errors='ignore'), preserve_index=False)
+    tmp = path + '.tmp'
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+def read_table(artifacts_dir: str, name: str) -> Optional[pd.DataFrame]:
+    path = os.path.join(artifacts_dir, name + '.arrow')
+    if not is_fresh(path, source_paths(artifacts_dir, name)):
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except Exception:
+        return None
+    # ArrowDtype columns wrap the mapped buffers (strings stay offsets + data) instead of
+    # copying them into Python objects, so workers share the page cache.
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def write_embeddings(artifacts_dir: str, matrix: np.ndarray, mask: np.ndarray):
+    for name, arr in ((EMBEDDINGS_FILE, matrix.astype(np.float32, copy=False)), (EMBEDDINGS_MASK_FILE, mask.astype(bool, copy=False))):
+        path = os.path.join(artifacts_dir, name)
+        tmp = path + '.tmp.npy'
+        np.save(tmp, arr)
+        os.replace(tmp, path)
+
+def read_embeddings(artifacts_dir: str, n_rows: int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    path = os.path.join(artifacts_dir, EMBEDDINGS_FILE)
+    mask_path = os.path.join(artifacts_dir, EMBEDDINGS_MASK_FILE)
+    sources = source_paths(artifacts_dir, 'create_final_text_units')
+    if not is_fresh(path, sources) or not os.path.exists(mask_path):
+        return None, None
+    try:
+        mat = np.load(path, mmap_mode='r')
+        mask = np.load(mask_path, mmap_mode='r')
+    except Exception:
+        return None, None
+    if mat.ndim != 2 or mat.shape[0] != n_rows or mask.shape != (n_rows,):
+        return None, None
+    return mat, mask
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None):
+    tmp = path + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for k, v in arrays.items():
+        np.save(os.path.join(tmp, k + '.npy'), v)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta or {}, f)
+    old = path + '.old'
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+def load_arrays(path: str, names: Iterable[str]) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    if not os.path.isdir(path):
+        return None
+    try:
+        arrays = {n: np.load(os.path.join(path, n + '.npy'), mmap_mode='r') for n in names}
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except Exception:
+        return None
+    return arrays, meta
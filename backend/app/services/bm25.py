@@ -0,0 +1,102 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from app.services.artifact_store import save_arrays, load_arrays
+
+BM25_INDEX_FILE = 'text_units.bm25'
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or '').lower())
+
+class BM25Index:
+    def __init__(self, terms: List[str], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray, doc_len: np.ndarray, k1: float = 1.2, b: float = 0.75):
+        self.terms = terms
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.n_docs = int(doc_len.shape[0])
+        avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+        self._norm = (k1 * (1.0 - b + b * doc_len / avgdl)).astype(np.float32) if avgdl > 0 else np.full(self.n_docs, k1, dtype=np.float32)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], **kw) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        lens: List[int] = []
+        for d, text in enumerate(texts):
+            toks = tokenize(text)
+            lens.append(len(toks))
+            for t, c in Counter(toks).items():
+                term_col.append(vocab.setdefault(t, len(vocab)))
+                doc_col.append(d)
+                tf_col.append(c)
+        terms = np.array(term_col, dtype=np.int64)
+        order = np.argsort(terms, kind='stable')
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(vocab)))
+        return cls(
+            list(vocab.keys()),
+            offsets,
+            np.array(doc_col, dtype=np.int64)[order],
+            np.array(tf_col, dtype=np.float32)[order],
+            np.array(lens, dtype=np.float32),
+            **kw,
+        )
+
+    def _idf(self, df: int) -> float:
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def _postings(self, query: str) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for t in set(tokenize(query)):
+            ti = self.vocab.get(t)
+            if ti is None:
+                continue
+            lo, hi = self.offsets[ti], self.offsets[ti + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi]
+            yield docs, self._idf(hi - lo) * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+
+    def sparse(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        hits = list(self._postings(query))
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        docs = np.concatenate([h[0] for h in hits])
+        vals = np.concatenate([h[1] for h in hits]).astype(np.float32)
+        ids, inv = np.unique(docs, return_inverse=True)
+        out = np.zeros(ids.size, dtype=np.float32)
+        np.add.at(out, inv, vals)
+        return ids, out
+
+    def scores(self, query: str, normalize: bool = True) -> np.ndarray:
+        # Accumulates straight into the dense vector: a document appears at most once per
+        # posting list, so fancy-index += is exact and no sort/unique pass is needed.
+        dense = np.zeros(self.n_docs, dtype=np.float32)
+        for docs, vals in self._postings(query):
+            dense[docs] += vals
+        if normalize and self.n_docs:
+            top = float(dense.max())
+            if top > 0:
+                dense /= top
+        return dense
+
+    def save(self, path: str):
+        save_arrays(path, {'offsets': self.offsets, 'doc_ids': self.doc_ids, 'tfs': self.tfs, 'doc_len': self.doc_len}, {'terms': self.terms, 'k1': self.k1, 'b': self.b})
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        # Postings are memory-mapped; only the vocabulary and length norms live on the heap.
+        loaded = load_arrays(path, ('offsets', 'doc_ids', 'tfs', 'doc_len'))
+        if loaded is None:
+            return None
+        a, meta = loaded
+        return cls(meta['terms'], a['offsets'], a['doc_ids'], a['tfs'], a['doc_len'], k1=meta.get('k1', 1.2), b=meta.get('b', 0.75))
@@ -0,0 +1,304 @@
+import os
+import time
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+try:
+    import google.generativeai as genai
+except Exception:
+    genai = None
+try:
+    from openai import OpenAI, AsyncOpenAI
+except Exception:
+    OpenAI = None
+    AsyncOpenAI = None
+
+logger = logging.getLogger(__name__)
+
+GEMINI_EMBED_MODEL = "models/text-embedding-004"
+OPENAI_EMBED_MODEL = "text-embedding-3-small"
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+def gemini_vector(r: Any) -> Optional[List[float]]:
+    e = r.get("embedding") if isinstance(r, dict) else getattr(r, "embedding", None)
+    if e is None and isinstance(r, dict) and "values" in r:
+        e = r.get("values")
+    if hasattr(e, "values"):
+        e = e.values
+    return list(e) if e is not None else None
+
+class EmbeddingCache:
+    def __init__(self, max_size: int = 2048, path: Optional[str] = None):
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (provider TEXT, model TEXT, text TEXT, vec BLOB, PRIMARY KEY (provider, model, text))")
+                self._db.commit()
+            except Exception:
+                self._db = None
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[np.ndarray]:
+        with self._lock:
+            v = self._items.get(key)
+            if v is not None:
+                self._items.move_to_end(key)
+                return v
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT vec FROM embeddings WHERE provider=? AND model=? AND text=?", key).fetchone()
+        if row is None:
+            return None
+        v = np.frombuffer(row[0], dtype=np.float32)
+        self._remember(key, v)
+        return v
+
+    def put(self, key: Tuple[str, str, str], vec: List[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        self._remember(key, v)
+        if self._db is not None:
+            with self._lock:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", (*key, v.tobytes()))
+                    self._db.commit()
+                except Exception:
+                    pass
+        return v
+
+    def _remember(self, key: Tuple[str, str, str], v: np.ndarray):
+        with self._lock:
+            self._items[key] = v
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class EmbeddingClient:
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self._lock = threading.Lock()
+        self._gemini_key: Optional[str] = None
+        self._openai = None
+        self._openai_key: Optional[str] = None
+        self._aopenai = None
+        self._aopenai_key: Optional[str] = None
+
+    def provider(self) -> Optional[Tuple[str, str]]:
+        if genai is not None and os.getenv("GEMINI_API_KEY"):
+            return ("gemini", GEMINI_EMBED_MODEL)
+        if OpenAI is not None and os.getenv("OPENAI_API_KEY"):
+            return ("openai", OPENAI_EMBED_MODEL)
+        return None
+
+    def _gemini(self):
+        key = os.getenv("GEMINI_API_KEY")
+        with self._lock:
+            if key != self._gemini_key:
+                genai.configure(api_key=key)
+                self._gemini_key = key
+        return genai
+
+    def _openai_client(self):
+        key = os.getenv("OPENAI_API_KEY")
+        with self._lock:
+            if self._openai is None or key != self._openai_key:
+                self._openai = OpenAI(api_key=key)
+                self._openai_key = key
+            return self._openai
+
+    def _async_openai_client(self):
+        key = os.getenv("OPENAI_API_KEY")
+        with self._lock:
+            if self._aopenai is None or key != self._aopenai_key:
+                self._aopenai = AsyncOpenAI(api_key=key)
+                self._aopenai_key = key
+            return self._aopenai
+
+    def _request(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        if provider == "gemini":
+            return gemini_vector(self._gemini().embed_content(model=model, content=text))
+        r = self._openai_client().embeddings.create(model=model, input=text)
+        e = r.data[0].embedding if getattr(r, "data", None) else None
+        return list(e) if e is not None else None
+
+    async def _arequest(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        if provider == "gemini":
+            fn = getattr(self._gemini(), "embed_content_async", None)
+            if fn is None:
+                return await asyncio.to_thread(self._request, provider, model, text)
+            return gemini_vector(await fn(model=model, content=text))
+        if AsyncOpenAI is None:
+            return await asyncio.to_thread(self._request, provider, model, text)
+        r = await self._async_openai_client().embeddings.create(model=model, input=text)
+        e = r.data[0].embedding if getattr(r, "data", None) else None
+        return list(e) if e is not None else None
+
+    async def _arequest_batch(self, provider: str, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        if provider == "gemini":
+            fn = getattr(self._gemini(), "embed_content_async", None)
+            if fn is None:
+                return await asyncio.to_thread(self.embed_batch, texts, (provider, model))
+            r = await fn(model=model, content=texts)
+            e = r.get("embedding") if isinstance(r, dict) else getattr(r, "embedding", None)
+            return [list(v) if v is not None else None for v in (e or [None] * len(texts))]
+        if AsyncOpenAI is None:
+            return await asyncio.to_thread(self.embed_batch, texts, (provider, model))
+        r = await self._async_openai_client().embeddings.create(model=model, input=texts)
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for d in getattr(r, "data", None) or []:
+            out[d.index] = list(d.embedding)
+        return out
+
+    def embed_batch(self, texts: List[str], provider: Optional[Tuple[str, str]] = None) -> List[Optional[List[float]]]:
+        prov = provider or self.provider()
+        if prov is None:
+            raise RuntimeError("Embeddings unavailable (set GEMINI_API_KEY or OPENAI_API_KEY)")
+        if prov[0] == "gemini":
+            r = self._gemini().embed_content(model=prov[1], content=texts)
+            e = r.get("embedding") if isinstance(r, dict) else getattr(r, "embedding", None)
+            return [list(v) if v is not None else None for v in (e or [None] * len(texts))]
+        r = self._openai_client().embeddings.create(model=prov[1], input=texts)
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for d in getattr(r, "data", None) or []:
+            out[d.index] = list(d.embedding)
+        return out
+
+    def embed(self, text: str) -> Optional[List[float]]:
+        prov = self.provider()
+        if prov is None:
+            return None
+        key = (prov[0], prov[1], normalize_text(text))
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit.tolist()
+        try:
+            vec = self._request(prov[0], prov[1], text)
+        except Exception:
+            return None
+        if vec is None:
+            return None
+        self.cache.put(key, vec)
+        return vec
+
+    async def aembed(self, text: str) -> Optional[List[float]]:
+        # Same contract as embed(), but the provider call does not hold an event-loop thread.
+        prov = self.provider()
+        if prov is None:
+            return None
+        key = (prov[0], prov[1], normalize_text(text))
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit.tolist()
+        try:
+            vec = await self._arequest(prov[0], prov[1], text)
+        except Exception:
+            return None
+        if vec is None:
+            return None
+        self.cache.put(key, vec)
+        return vec
+
+    async def aembed_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        # Cached texts are answered locally; the remaining distinct texts go out in provider calls of
+        # at most EMBEDDING_BATCH_SIZE (Gemini rejects batches over 100), run concurrently.
+        prov = self.provider()
+        if prov is None:
+            return [None] * len(texts)
+        keys = [(prov[0], prov[1], normalize_text(t)) for t in texts]
+        found = {}
+        misses = {}
+        for k, t in zip(keys, texts):
+            if k in found or k in misses:
+                continue
+            hit = self.cache.get(k)
+            if hit is not None:
+                found[k] = hit.tolist()
+            else:
+                misses[k] = t
+        if misses:
+            size = max(1, settings.embedding_batch_size)
+            miss_keys = list(misses)
+            chunks = [miss_keys[i:i + size] for i in range(0, len(miss_keys), size)]
+            sem = asyncio.Semaphore(max(1, settings.embedding_concurrency))
+
+            async def run(chunk):
+                async with sem:
+                    try:
+                        return await self._arequest_batch(prov[0], prov[1], [misses[k] for k in chunk])
+                    except Exception as e:
+                        # Callers fall back to keyword-only scores for these texts; say so.
+                        logger.warning("Query embedding batch of %d texts failed (%s): %s", len(chunk), prov[0], e)
+                        return [None] * len(chunk)
+
+            for chunk, vecs in zip(chunks, await asyncio.gather(*(run(c) for c in chunks))):
+                for k, v in zip(chunk, vecs):
+                    if v is not None:
+                        self.cache.put(k, v)
+                        found[k] = v
+        return [found.get(k) for k in keys]
+
+def _with_retry(fn, max_retries: int, backoff: float):
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1.0 + random.random()))
+            attempt += 1
+
+def embed_in_batches(client: EmbeddingClient, items: Sequence[Tuple[int, str]], batch_size: int = 100, concurrency: int = 4, max_retries: int = 5, backoff: float = 1.0) -> Iterator[Tuple[List[int], Optional[List[Optional[List[float]]]]]]:
+    # Yields (row ids, vectors) per batch as requests complete; vectors is None when a batch
+    # still failed after all retries so the caller can leave those rows for a later run.
+    prov = client.provider()
+    batches = [items[i:i + batch_size] for i in range(0, len(items), max(1, batch_size))]
+    pending = iter(batches)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        running = {}
+        def submit():
+            b = next(pending, None)
+            if b is None:
+                return False
+            texts = [t for _, t in b]
+            running[pool.submit(_with_retry, lambda: client.embed_batch(texts, prov), max_retries, backoff)] = b
+            return True
+        for _ in range(max(1, concurrency)):
+            if not submit():
+                break
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                b = running.pop(fut)
+                try:
+                    vecs = fut.result()
+                except Exception:
+                    vecs = None
+                yield [r for r, _ in b], vecs
+                submit()
+
+_client: Optional[EmbeddingClient] = None
+_client_lock = threading.Lock()
+
+def get_embedder() -> EmbeddingClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EmbeddingClient(EmbeddingCache(settings.embedding_cache_size, settings.embedding_cache_path or None))
+    return _client
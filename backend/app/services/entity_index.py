@@ -0,0 +1,106 @@
+import re
+import bisect
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.services.bm25 import tokenize
+
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|\d+")
+
+def name_tokens(name: str) -> List[str]:
+    toks = tokenize(name)
+    for part in CAMEL_RE.findall(name or ''):
+        p = part.lower()
+        if p not in toks:
+            toks.append(p)
+    return toks
+
+class EntityIndex:
+    MAX_PREFIX_TERMS = 64
+
+    def __init__(self, ids: List[str], names: List[str], postings: Dict[str, np.ndarray]):
+        self.ids = ids
+        self.names = names
+        self.lower_names = [n.casefold() for n in names]
+        self.by_id: Dict[str, int] = {}
+        for i, v in enumerate(ids):
+            self.by_id.setdefault(v, i)
+        self.postings = postings
+        self.vocab = sorted(postings)
+
+    @classmethod
+    def from_frame(cls, df: Optional[pd.DataFrame]) -> Optional["EntityIndex"]:
+        if df is None or 'id' not in df.columns:
+            return None
+        ids = df['id'].astype(str).tolist()
+        names = df['name'].fillna('').astype(str).tolist() if 'name' in df.columns else [''] * len(ids)
+        acc: Dict[str, List[int]] = {}
+        for i, n in enumerate(names):
+            for t in name_tokens(n):
+                acc.setdefault(t, []).append(i)
+        return cls(ids, names, {t: np.asarray(v, dtype=np.int64) for t, v in acc.items()})
+
+    def get(self, entity_id: str) -> Optional[int]:
+        return self.by_id.get(entity_id)
+
+    def match(self, query: str, limit: int = 5) -> List[int]:
+        # Entities sharing any token with the query, in table order; postings are sorted,
+        # so the first `limit` rows of each list are enough.
+        heads = [self.postings[t][:limit] for t in set(tokenize(query)) if t in self.postings]
+        if not heads:
+            return []
+        return [int(i) for i in np.unique(np.concatenate(heads))[:limit]]
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        out = []
+        i = bisect.bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix) and len(out) < self.MAX_PREFIX_TERMS:
+            out.append(self.vocab[i])
+            i += 1
+        return out
+
+    @staticmethod
+    def _member(ids: np.ndarray, postings: np.ndarray) -> np.ndarray:
+        at = np.searchsorted(postings, ids)
+        return postings[np.minimum(at, len(postings) - 1)] == ids
+
+    def search(self, text: str, limit: int = 10) -> List[int]:
+        # Typeahead: every complete token must match and the last token is treated as a prefix.
+        toks = tokenize(text)
+        if not toks:
+            return []
+        cap = max(limit * 20, 200)
+        *full, last = toks
+        prefix_lists = [self.postings[t] for t in self._prefix_terms(last)]
+        if not prefix_lists:
+            return []
+        if not full:
+            hits = np.unique(np.concatenate([p[:cap] for p in prefix_lists]))[:cap]
+        else:
+            lists = [self.postings.get(t) for t in full]
+            if any(p is None for p in lists):
+                return []
+            lists.sort(key=len)
+            driver, others = lists[0], lists[1:]
+            small = [p for p in prefix_lists if len(p) <= 256]
+            groups = [p for p in prefix_lists if len(p) > 256] + ([np.unique(np.concatenate(small))] if small else [])
+            found = []
+            total = 0
+            for start in range(0, len(driver), 16384):
+                c = driver[start:start + 16384]
+                m = np.zeros(len(c), dtype=bool)
+                for p in groups:
+                    m |= self._member(c, p)
+                for p in others:
+                    m &= self._member(c, p)
+                found.append(c[m])
+                total += int(m.sum())
+                if total >= cap:
+                    break
+            hits = np.concatenate(found)[:cap] if found else np.empty(0, dtype=np.int64)
+        q = " ".join(text.split()).casefold()
+        ranked = sorted(
+            (int(i) for i in hits),
+            key=lambda i: (self.lower_names[i] != q, not self.lower_names[i].startswith(q), len(self.names[i]), i),
+        )
+        return ranked[:limit]
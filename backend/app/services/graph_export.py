@@ -0,0 +1,105 @@
+import json
+from typing import Dict, List, Optional
+import pyarrow as pa
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/x-msgpack",
+}
+
+# One schema for both record kinds so the whole export is a single Arrow IPC stream; node rows
+# leave source/target/type null and edge rows leave id/labels/props null. Props are JSON text
+# because their keys vary per node.
+ARROW_SCHEMA = pa.schema([
+    ("kind", pa.string()),
+    ("id", pa.string()),
+    ("labels", pa.list_(pa.string())),
+    ("props", pa.string()),
+    ("source", pa.string()),
+    ("target", pa.string()),
+    ("type", pa.string()),
+])
+
+def _str(v) -> Optional[str]:
+    return None if v is None else str(v)
+
+class _Chunks:
+    # Minimal writable sink: pyarrow writes the IPC messages here and the encoder hands
+    # them out page by page instead of accumulating the whole stream.
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self.parts)
+        self.parts = []
+        return out
+
+class ExportEncoder:
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        if fmt == "msgpack" and msgpack is None:
+            raise ValueError("msgpack export needs the msgpack package (pip install msgpack)")
+        self.fmt = fmt
+        self.media_type = FORMATS[fmt]
+        self._sink: Optional[_Chunks] = None
+        self._writer = None
+        if fmt == "arrow":
+            self._sink = _Chunks()
+            self._writer = pa.ipc.new_stream(self._sink, ARROW_SCHEMA)
+
+    def _records(self, kind: str, items: List[Dict]):
+        if kind == "nodes":
+            return ({"kind": "node", **n} for n in items)
+        return ({"kind": "edge", **e} for e in items)
+
+    def encode(self, kind: str, items: List[Dict]) -> bytes:
+        if self.fmt == "ndjson":
+            return "".join(json.dumps(r, default=str) + "\n" for r in self._records(kind, items)).encode()
+        if self.fmt == "msgpack":
+            # Concatenated maps; msgpack.Unpacker reads them back one at a time.
+            return b"".join(msgpack.packb(r, default=str) for r in self._records(kind, items))
+        if kind == "nodes":
+            cols = {
+                "kind": ["node"] * len(items),
+                "id": [_str(n["id"]) for n in items],
+                "labels": [n["labels"] for n in items],
+                "props": [json.dumps(n["props"], default=str) for n in items],
+                "source": [None] * len(items),
+                "target": [None] * len(items),
+                "type": [None] * len(items),
+            }
+        else:
+            cols = {
+                "kind": ["edge"] * len(items),
+                "id": [None] * len(items),
+                "labels": [None] * len(items),
+                "props": [None] * len(items),
+                "source": [_str(e["source"]) for e in items],
+                "target": [_str(e["target"]) for e in items],
+                "type": [e["type"] for e in items],
+            }
+        self._writer.write_batch(pa.record_batch(cols, schema=ARROW_SCHEMA))
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        if self._writer is None:
+            return b""
+        self._writer.close()
+        return self._sink.take()
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import pandas as pd
+try:
+    import google.generativeai as genai
+except Exception:
+    genai = None
+
+EXTRACTION_CACHE_FILE = 'graph_extraction_cache.sqlite'
+
+EXTRACTION_PROMPT = (
+    "You are extracting a code graph from TypeScript/TSX code. "
+    "Return JSON with keys 'entities' and 'relationships'. "
+    "entities: list of {id,name,type} where type is one of File, Component, Function, Hook, Import, Export. "
+    "relationships: list of {source,target,type} where type is one of CONTAINS, IMPORTS, CALLS, RENDERS, USES_HOOK, EXPORTS. "
+    "Infer ids as stable strings (e.g., 'fn_Name', 'cmp_Name', 'file_path'). "
+    "Output strictly JSON only."
+)
+
+def _parse_graph_json(t: str) -> Dict[str, Any]:
+    try:
+        j = json.loads(t)
+    except Exception:
+        m = re.search(r"\{[\s\S]*\}", t)
+        j = json.loads(m.group(0)) if m else None
+    if not isinstance(j, dict):
+        raise ValueError("model output is not a JSON object")
+    return {"entities": j.get("entities") or [], "relationships": j.get("relationships") or []}
+
+class GeminiGraphExtractor:
+    def __init__(self, model_name: str = "gemini-1.5-pro"):
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return genai is not None and bool(os.getenv("GEMINI_API_KEY"))
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                self._model = genai.GenerativeModel(self.name)
+            return self._model
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        r = self._get_model().generate_content([EXTRACTION_PROMPT, text])
+        t = getattr(r, "text", None)
+        if not t and hasattr(r, "candidates") and r.candidates:
+            try:
+                t = r.candidates[0].content.parts[0].text
+            except Exception:
+                t = None
+        if not t:
+            raise ValueError("empty model response")
+        return _parse_graph_json(t)
+
+class StubGraphExtractor:
+    FUNC_RE = re.compile(r"\bfunction\s+([A-Za-z_]\w*)|\bconst\s+([A-Za-z_]\w*)\s*=\s*(?:async\s*)?\(")
+    CALL_RE = re.compile(r"\b([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)\s*\(")
+    RENDER_RE = re.compile(r"<([A-Z]\w*)")
+    IMPORT_RE = re.compile(r"\bimport\b[^;]*?from\s+['\"]([^'\"]+)['\"]")
+
+    def __init__(self, latency: float = 0.0):
+        self.name = "stub"
+        self.latency = latency
+
+    def available(self) -> bool:
+        return True
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        ents: Dict[str, Dict[str, Any]] = {}
+        rels = []
+        owner = None
+        for m in self.FUNC_RE.finditer(text):
+            name = m.group(1) or m.group(2)
+            typ = "Component" if name[:1].isupper() else ("Hook" if name.startswith("use") else "Function")
+            eid = {"Component": "cmp_", "Hook": "hook_", "Function": "fn_"}[typ] + name
+            ents[eid] = {"id": eid, "name": name, "type": typ}
+            owner = owner or eid
+        if owner:
+            for m in self.CALL_RE.finditer(text):
+                rels.append({"source": owner, "target": m.group(1), "type": "CALLS"})
+            for m in self.RENDER_RE.finditer(text):
+                rels.append({"source": owner, "target": f"cmp_{m.group(1)}", "type": "RENDERS"})
+        for m in self.IMPORT_RE.finditer(text):
+            iid = f"imp_{m.group(1)}"
+            ents[iid] = {"id": iid, "name": m.group(1), "type": "Import"}
+            if owner:
+                rels.append({"source": owner, "target": iid, "type": "IMPORTS"})
+        return {"entities": list(ents.values()), "relationships": rels}
+
+def get_extractor(name: Optional[str] = None):
+    name = (name or "gemini").lower()
+    if name == "stub":
+        return StubGraphExtractor(latency=float(os.getenv("GRAPH_EXTRACTION_STUB_LATENCY", "0")))
+    if name == "gemini":
+        return GeminiGraphExtractor()
+    return GeminiGraphExtractor(model_name=name)
+
+class ExtractionCache:
+    def __init__(self, path: Optional[str]):
+        self._db = None
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS extractions (key TEXT PRIMARY KEY, result TEXT)")
+            self._db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, EXTRACTION_PROMPT, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT result FROM extractions WHERE key=?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO extractions VALUES (?, ?)", (key, json.dumps(result)))
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+def extract_graphs(extractor, items: Sequence[Tuple[Any, str]], cache: ExtractionCache, concurrency: int = 4) -> Iterator[Tuple[Any, Optional[Dict[str, Any]], bool]]:
+    # Yields (item key, result, from_cache); result is None when the model call failed,
+    # in which case nothing is cached and the chunk is retried on the next run.
+    misses = []
+    for ref, text in items:
+        k = cache.key(extractor.name, text)
+        hit = cache.get(k)
+        if hit is not None:
+            yield ref, hit, True
+        else:
+            misses.append((ref, k, text))
+    pending = iter(misses)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        running = {}
+        def submit():
+            item = next(pending, None)
+            if item is None:
+                return False
+            running[pool.submit(extractor.extract, item[2])] = item
+            return True
+        for _ in range(max(1, concurrency)):
+            if not submit():
+                break
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                ref, k, _ = running.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception:
+                    res = None
+                if res is not None:
+                    cache.put(k, res)
+                yield ref, res, False
+                submit()
+
+def merge_graph(entities: Optional[pd.DataFrame], relationships: Optional[pd.DataFrame], new_entities: List[Dict[str, Any]], new_relationships: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame, int, int]:
+    ents = entities if entities is not None else pd.DataFrame(columns=["id", "name", "type"])
+    rels = relationships if relationships is not None else pd.DataFrame(columns=["source", "target", "type"])
+    seen_ids = set(ents["id"].astype(str)) if "id" in ents.columns else set()
+    add_e = []
+    for e in new_entities:
+        eid = e.get("id")
+        if eid is None or str(eid) in seen_ids:
+            continue
+        seen_ids.add(str(eid))
+        add_e.append(e)
+    if {"source", "target", "type"} <= set(rels.columns):
+        seen_r = set(zip(rels["source"].astype(str), rels["target"].astype(str), rels["type"].astype(str)))
+    else:
+        seen_r = set()
+    add_r = []
+    for r in new_relationships:
+        key = (str(r.get("source")), str(r.get("target")), str(r.get("type")))
+        if r.get("source") is None or r.get("target") is None or key in seen_r:
+            continue
+        seen_r.add(key)
+        add_r.append(r)
+    if add_e:
+        ents = pd.concat([ents, pd.DataFrame(add_e)], ignore_index=True)
+    if add_r:
+        rels = pd.concat([rels, pd.DataFrame(add_r)], ignore_index=True)
+    return ents, rels, len(add_e), len(add_r)
@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+class GraphAdjacency:
+    def __init__(self, ids: List[str], forward: Dict[str, Tuple[np.ndarray, np.ndarray]], reverse: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        self.ids = ids
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(ids)}
+        self.forward = forward
+        self.reverse = reverse
+        self._lower: Optional[List[str]] = None
+        self._targets: Dict[str, np.ndarray] = {}
+
+    @property
+    def types(self) -> List[str]:
+        return list(self.forward.keys())
+
+    @staticmethod
+    def _csr(rows: np.ndarray, cols: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(rows, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(rows, minlength=n))
+        return offsets, cols[order].astype(np.int32)
+
+    @classmethod
+    def from_edges(cls, sources: Iterable, targets: Iterable, types: Iterable) -> "GraphAdjacency":
+        src = pd.Series(list(sources), dtype=object).astype(str)
+        tgt = pd.Series(list(targets), dtype=object).astype(str)
+        typ = pd.Series(list(types), dtype=object).astype(str)
+        codes, uniques = pd.factorize(pd.concat([src, tgt], ignore_index=True))
+        n = len(uniques)
+        s_codes = codes[:len(src)]
+        t_codes = codes[len(src):]
+        forward = {}
+        reverse = {}
+        for t in pd.unique(typ):
+            m = (typ == t).to_numpy()
+            forward[t] = cls._csr(s_codes[m], t_codes[m], n)
+            reverse[t] = cls._csr(t_codes[m], s_codes[m], n)
+        return cls([str(u) for u in uniques], forward, reverse)
+
+    @classmethod
+    def from_frame(cls, df: Optional[pd.DataFrame]) -> Optional["GraphAdjacency"]:
+        if df is None or df.empty or not {'source', 'target', 'type'} <= set(df.columns):
+            return None
+        return cls.from_edges(df['source'].tolist(), df['target'].tolist(), df['type'].tolist())
+
+    def _lookup(self, csr: Dict[str, Tuple[np.ndarray, np.ndarray]], node: str, rel_type: Optional[str]) -> List[str]:
+        i = self.index.get(node)
+        if i is None:
+            return []
+        out: List[str] = []
+        for t in ([rel_type] if rel_type else csr.keys()):
+            if t not in csr:
+                continue
+            offsets, cols = csr[t]
+            out.extend(self.ids[j] for j in cols[offsets[i]:offsets[i + 1]])
+        return out
+
+    def out_neighbors(self, node: str, rel_type: Optional[str] = None) -> List[str]:
+        return self._lookup(self.forward, node, rel_type)
+
+    def in_neighbors(self, node: str, rel_type: Optional[str] = None) -> List[str]:
+        return self._lookup(self.reverse, node, rel_type)
+
+    def sources_of(self, targets: Iterable[str], rel_type: Optional[str] = None) -> List[str]:
+        seen = set()
+        out = []
+        for t in targets:
+            for s in self.in_neighbors(t, rel_type):
+                if s not in seen:
+                    seen.add(s)
+                    out.append(s)
+        return out
+
+    def targets_of_type(self, rel_type: str) -> List[str]:
+        if rel_type not in self.reverse:
+            return []
+        hit = self._targets.get(rel_type)
+        if hit is None:
+            offsets, _ = self.reverse[rel_type]
+            hit = np.flatnonzero(np.diff(offsets) > 0)
+            self._targets[rel_type] = hit
+        return [self.ids[i] for i in hit]
+
+    def match_targets(self, rel_type: str, pred) -> List[str]:
+        if self._lower is None:
+            self._lower = [i.lower() for i in self.ids]
+        if rel_type not in self.reverse:
+            return []
+        self.targets_of_type(rel_type)
+        return [self.ids[i] for i in self._targets[rel_type] if pred(self.ids[i], self._lower[i])]
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from app.core.metrics import span, timed
+from app.services.graph_index import GraphAdjacency
+
+logger = logging.getLogger(__name__)
+
+MODES = ("directory", "community")
+REST_GROUP = "(other)"
+
+def _primary_label(labels: List[str]) -> str:
+    rest = [l for l in labels if l != "CodeNode"]
+    return rest[0] if rest else (labels[0] if labels else "Node")
+
+def _directories(labels: List[str], ids: List[str], files: List[Optional[str]]) -> pd.Series:
+    # Code nodes carry file_path (a file's id is its path); anything else is grouped by label.
+    lab = pd.Series(labels, dtype=object)
+    path = pd.Series(files, dtype=object)
+    path = path.where(path.notna() & (path != ""), pd.Series(ids, dtype=object).where(lab == "CodeFile"))
+    has = path.notna()
+    dirs = path[has].astype(str).str.replace("\\", "/", regex=False).str.rpartition("/")[0].replace("", ".")
+    return lab.where(~has, dirs)
+
+@timed("graph_lod.label_propagation")
+def label_propagation(n: int, src: np.ndarray, dst: np.ndarray, iters: int = 10) -> np.ndarray:
+    # Synchronous label propagation on the undirected graph, vectorised over all edges per round.
+    # Each node keeps its own label as one extra vote, which damps the oscillation plain
+    # synchronous LPA shows on bipartite structures; ties go to the smallest label.
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    self_ = np.arange(n, dtype=np.int64)
+    u = np.concatenate([src, dst, self_]).astype(np.int64)
+    v = np.concatenate([dst, src, self_]).astype(np.int64)
+    labels = self_.copy()
+    for _ in range(iters):
+        # One sort per round: runs of equal (node, label) keys are the votes, and the first
+        # run reaching its node's maximum is the smallest winning label.
+        k = np.sort(u * n + labels[v])
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        keys = k[starts]
+        counts = np.diff(np.r_[starts, len(k)])
+        uu = keys // n
+        seg = np.flatnonzero(np.r_[True, uu[1:] != uu[:-1]])
+        best = np.repeat(np.maximum.reduceat(counts, seg), np.diff(np.r_[seg, len(counts)]))
+        pos = np.flatnonzero(counts == best)
+        win = pos[np.r_[True, uu[pos][1:] != uu[pos][:-1]]]
+        new = labels.copy()
+        new[uu[win]] = keys[win] % n
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return labels
+
+class GraphLOD:
+    """Super-node views of one graph version, built once and served from memory."""
+
+    def __init__(self, version: Any, ids: List[str], labels: List[str], names: List[str], files: List[Optional[str]], src: np.ndarray, dst: np.ndarray, types: List[str]):
+        self.version = version
+        self.ids = ids
+        self.index = {v: i for i, v in enumerate(ids)}
+        self.labels = labels
+        self.names = names
+        self.files = files
+        self.src = src
+        self.dst = dst
+        self.types = types
+        self.adjacency = GraphAdjacency.from_edges([ids[i] for i in src], [ids[i] for i in dst], types) if len(src) else None
+        self.groups: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        with span("graph_lod.build"):
+            self.groups["directory"] = self._directory_groups()
+            self.groups["community"] = self._community_groups()
+        self._views: Dict[str, Dict] = {mode: self._view(mode) for mode in MODES}
+        self._members: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            mode: GraphAdjacency._csr(assign, np.arange(len(ids), dtype=np.int64), len(names_))
+            for mode, (names_, assign) in self.groups.items()
+        }
+
+    @classmethod
+    def from_records(cls, version: Any, nodes: List[Dict], edges: List[Dict]) -> "GraphLOD":
+        # Ids can repeat (legacy code imports, or an id on both a code and a CRM node); the first
+        # node with an id wins, as in GraphSnapshot.
+        first: Dict[str, Dict] = {}
+        for n in nodes:
+            first.setdefault(str(n["id"]), n)
+        nodes = list(first.values())
+        ids = list(first)
+        labels = [_primary_label(n.get("labels") or []) for n in nodes]
+        props = [n.get("props") or {} for n in nodes]
+        names = [str(p.get("name") or i) for p, i in zip(props, ids)]
+        files = [p.get("file_path") for p in props]
+        # Edges whose ends are outside the exported set (e.g. unresolved call targets) are dropped.
+        ix = pd.Index(ids)
+        src = ix.get_indexer([str(e["source"]) for e in edges]).astype(np.int64)
+        dst = ix.get_indexer([str(e["target"]) for e in edges]).astype(np.int64)
+        keep = (src >= 0) & (dst >= 0)
+        types = [str(e["type"]) for e, k in zip(edges, keep) if k]
+        return cls(version, ids, labels, names, files, src[keep], dst[keep], types)
+
+    def _directory_groups(self) -> Tuple[List[str], np.ndarray]:
+        codes, uniques = pd.factorize(_directories(self.labels, self.ids, self.files), sort=True)
+        return [f"dir:{u}" for u in uniques], codes.astype(np.int64)
+
+    def _community_groups(self) -> Tuple[List[str], np.ndarray]:
+        n = len(self.ids)
+        comm = label_propagation(n, self.src, self.dst)
+        codes, _ = pd.factorize(comm)
+        sizes = np.bincount(codes, minlength=codes.max() + 1 if n else 0)
+        # Singletons (mostly isolated nodes) would each become a super-node; pool them instead.
+        big = np.flatnonzero(sizes > 1)
+        big = big[np.argsort(-sizes[big], kind="stable")]
+        remap = np.full(len(sizes), len(big), dtype=np.int64)
+        remap[big] = np.arange(len(big))
+        assign = remap[codes] if n else codes.astype(np.int64)
+        names = [f"community:{k}" for k in range(len(big))]
+        if len(big) < len(sizes):
+            names.append(f"community:{REST_GROUP}")
+        return names, assign
+
+    def _view(self, mode: str) -> Dict:
+        names, assign = self.groups[mode]
+        g = len(names)
+        sizes = np.bincount(assign, minlength=g)
+        degree = np.bincount(np.concatenate([self.src, self.dst]), minlength=len(self.ids)) if len(self.src) else np.zeros(len(self.ids), dtype=np.int64)
+        gs = assign[self.src]
+        gt = assign[self.dst]
+        internal = np.bincount(gs[gs == gt], minlength=g) if len(gs) else np.zeros(g, dtype=np.int64)
+        lab_codes, lab_names = pd.factorize(pd.Series(self.labels, dtype=object))
+        by_label = np.zeros((g, len(lab_names)), dtype=np.int64)
+        np.add.at(by_label, (assign, lab_codes), 1)
+        # Representative member per group: its best-connected node.
+        order = np.lexsort((-degree, assign))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = assign[order][1:] != assign[order][:-1]
+        top = dict(zip(assign[order][first].tolist(), order[first].tolist()))
+        nodes = []
+        for k, name in enumerate(names):
+            counts = {lab_names[j]: int(by_label[k, j]) for j in np.flatnonzero(by_label[k])}
+            title = name.split(":", 1)[1]
+            if mode == "community" and k in top and title != REST_GROUP:
+                title = f"{self.names[top[k]]} (+{int(sizes[k]) - 1})"
+            nodes.append({
+                "id": name,
+                "labels": ["Group"],
+                "props": {"name": title, "mode": mode, "size": int(sizes[k]), "internal_edges": int(internal[k]), "labels": counts},
+            })
+        edges = []
+        cross = gs != gt
+        if cross.any():
+            typ_codes, typ_names = pd.factorize(pd.Series(self.types, dtype=object)[cross])
+            keys = (gs[cross] * g + gt[cross]) * len(typ_names) + typ_codes
+            uniq, weight = np.unique(keys, return_counts=True)
+            for key, w in zip(uniq.tolist(), weight.tolist()):
+                pair, t = divmod(key, len(typ_names))
+                a, b = divmod(pair, g)
+                edges.append({"source": names[a], "target": names[b], "type": typ_names[t], "weight": int(w)})
+        return {"version": self.version, "mode": mode, "nodes": nodes, "edges": edges}
+
+    def view(self, mode: str) -> Dict:
+        return self._views[mode]
+
+    def members(self, mode: str, group: str, offset: int = 0, limit: int = 500) -> Optional[Dict]:
+        names, assign = self.groups[mode]
+        try:
+            k = names.index(group)
+        except ValueError:
+            return None
+        offsets, cols = self._members[mode]
+        all_members = cols[offsets[k]:offsets[k + 1]]
+        page = all_members[offset:offset + limit]
+        nodes = [{"id": self.ids[i], "labels": [self.labels[i]], "props": {"name": self.names[i], "file_path": self.files[i], "group": group}} for i in page]
+        # Edges leaving the page point at the neighbour itself when it is in the same group,
+        # otherwise at that neighbour's super-node, so the drilled view stays connected.
+        edges = []
+        seen = set()
+        if self.adjacency is not None:
+            for i in page:
+                nid = self.ids[i]
+                for t in self.adjacency.types:
+                    for other in self.adjacency.out_neighbors(nid, t):
+                        j = self.index[other]
+                        tgt = other if assign[j] == k else names[assign[j]]
+                        key = (nid, tgt, t)
+                        if key not in seen:
+                            seen.add(key)
+                            edges.append({"source": nid, "target": tgt, "type": t})
+                    for other in self.adjacency.in_neighbors(nid, t):
+                        j = self.index[other]
+                        if assign[j] == k:
+                            continue
+                        key = (names[assign[j]], nid, t)
+                        if key not in seen:
+                            seen.add(key)
+                            edges.append({"source": names[assign[j]], "target": nid, "type": t})
+        return {"version": self.version, "mode": mode, "group": group, "total": int(len(all_members)), "offset": offset, "nodes": nodes, "edges": edges}
+
+class GraphLODCache:
+    # One GraphLOD per dataset, rebuilt only when the graph version changes; concurrent
+    # requests for a stale dataset wait for a single rebuild. The version is read at most every
+    # `check_interval` seconds per dataset, and straight away after a write in this process.
+    def __init__(self, check_interval: float = 0.0):
+        self.check_interval = check_interval
+        self._items: Dict[str, GraphLOD] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get(self, neo, dataset: str, labels: Optional[List[str]]) -> GraphLOD:
+        lod = self._items.get(dataset)
+        checked = self._checked.get(dataset)
+        if lod is not None and checked is not None and time.monotonic() - checked < self.check_interval:
+            return lod
+        version = await neo.graph_version()
+        self._checked[dataset] = time.monotonic()
+        if lod is not None and lod.version == version:
+            return lod
+        async with self._lock:
+            lod = self._items.get(dataset)
+            if lod is not None and lod.version == version:
+                return lod
+            nodes: List[Dict] = []
+            edges: List[Dict] = []
+            async for kind, items in neo.export_stream(labels, props=["name", "file_path"]):
+                (nodes if kind == "nodes" else edges).extend(items)
+            lod = await asyncio.to_thread(GraphLOD.from_records, version, nodes, edges)
+            self._items[dataset] = lod
+            return lod
+
+    def warm(self, neo, dataset: str, labels: Optional[List[str]]):
+        # Rebuild in the background after a write so the next coarse view is already computed.
+        task = asyncio.create_task(self._warm(neo, dataset, labels))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _warm(self, neo, dataset: str, labels: Optional[List[str]]):
+        try:
+            await self.get(neo, dataset, labels)
+        except Exception as e:
+            logger.warning("Graph level-of-detail rebuild failed: %s", e)
+
+    def on_write(self, event: str, data: Dict[str, Any]):
+        # Write listener (app.services.neo4j): the next request re-reads the version.
+        self._checked.clear()
+
+    def clear(self):
+        self._items.clear()
+        self._checked.clear()
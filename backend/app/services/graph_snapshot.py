@@ -0,0 +1,504 @@
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from app.core.metrics import span, timed
+from app.db.neo4j_schema import CODE_NODE_LABEL
+from app.services.graph_index import GraphAdjacency
+from app.services.neo4j import AsyncNeo4jService, _neighbor_args, _path_args
+from app.services.neo4j_queries import ast_label, ast_props
+
+logger = logging.getLogger(__name__)
+
+# (neighbour index, type code, edge id, stored as an out-edge of the visited node)
+Step = Tuple[int, int, int, bool]
+
+def _meta_counter(version: Any) -> Optional[int]:
+    # The write counter at the end of a Neo4j graph version ("nodes:rels:counter").
+    try:
+        return int(str(version).rsplit(":", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+class GraphSnapshot:
+    """In-memory copy of the graph with interned ids and CSR adjacency in both directions.
+
+    Small writes are applied as overlay edges/nodes so the arrays never have to be rebuilt
+    for them; bulk changes replace the whole snapshot instead.
+    """
+
+    def __init__(self, version: Any, ids: List[str], labels: List[List[str]], props: List[Dict[str, Any]], src: np.ndarray, dst: np.ndarray, types: List[str]):
+        self.version = version
+        self.ids = list(ids)
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(self.ids)}
+        self.labels = list(labels)
+        self.props = list(props)
+        codes, uniques = pd.factorize(pd.Series(types, dtype=object))
+        self.type_names: List[str] = [str(t) for t in uniques]
+        self.type_index: Dict[str, int] = {t: i for i, t in enumerate(self.type_names)}
+        n = len(self.ids)
+        eids = np.arange(len(src), dtype=np.int64)
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.etype = codes.astype(np.int32)
+        self.out_off, self.out_eid = GraphAdjacency._csr(self.src, eids, n)
+        self.in_off, self.in_eid = GraphAdjacency._csr(self.dst, eids, n)
+        # Neighbour and type per CSR slot, so expanding a node is a few slices rather than a per-edge lookup.
+        self.out_nbr, self.out_type = self.dst[self.out_eid], self.etype[self.out_eid]
+        self.in_nbr, self.in_type = self.src[self.in_eid], self.etype[self.in_eid]
+        self._base_nodes = n
+        self._extra_edges: List[Tuple[int, int, int]] = []
+        self._extra_out: Dict[int, List[int]] = defaultdict(list)
+        self._extra_in: Dict[int, List[int]] = defaultdict(list)
+        # BFS scratch reused across queries: an entry is only valid where its stamp equals the
+        # current epoch, so nothing is cleared per query. Queries run on the event loop, one at a time.
+        self._epoch = 0
+        self._stamp: List[np.ndarray] = []
+        self._dist: List[np.ndarray] = []
+        self._via: List[np.ndarray] = []
+        self._prev: List[np.ndarray] = []
+
+    @classmethod
+    def from_records(cls, version: Any, nodes: List[Dict], edges: List[Dict]) -> "GraphSnapshot":
+        with span("graph_snapshot.build"):
+            return cls._from_records(version, nodes, edges)
+
+    @classmethod
+    def _from_records(cls, version: Any, nodes: List[Dict], edges: List[Dict]) -> "GraphSnapshot":
+        # Ids are not guaranteed unique (code graphs imported before the CodeNode index, or an id
+        # shared by a code node and a CRM node); the first node with an id wins. Nodes without an
+        # id cannot be looked up, so they and their edges are left out.
+        first: Dict[str, Dict] = {}
+        for n in nodes:
+            if n["id"] is not None:
+                first.setdefault(str(n["id"]), n)
+        nodes = list(first.values())
+        ids = list(first)
+        ix = pd.Index(ids)
+        edges = [e for e in edges if e["source"] is not None and e["target"] is not None]
+        src = ix.get_indexer([str(e["source"]) for e in edges]).astype(np.int64)
+        dst = ix.get_indexer([str(e["target"]) for e in edges]).astype(np.int64)
+        keep = (src >= 0) & (dst >= 0)
+        types = [str(e["type"]) for e, k in zip(edges, keep) if k]
+        return cls(version, ids, [list(n.get("labels") or []) for n in nodes], [n.get("props") or {} for n in nodes], src[keep], dst[keep], types)
+
+    @classmethod
+    def from_frames(cls, version: Any, entities: Optional[pd.DataFrame], relationships: Optional[pd.DataFrame]) -> "GraphSnapshot":
+        # GraphRAG artifacts: entity rows become nodes labelled like import_ast would label them;
+        # relationship endpoints that are not entities (call targets, modules) become bare nodes.
+        nodes: List[Dict] = []
+        if entities is not None and not entities.empty and 'id' in entities.columns:
+            for rec in entities.to_dict(orient="records"):
+                props = ast_props({k: v for k, v in rec.items() if 'embedding' not in k})
+                nodes.append({"id": str(rec['id']), "labels": [ast_label(str(rec.get('type', 'Code'))), CODE_NODE_LABEL], "props": props})
+        edges: List[Dict] = []
+        if relationships is not None and not relationships.empty and {'source', 'target', 'type'} <= set(relationships.columns):
+            edges = relationships[['source', 'target', 'type']].astype(str).to_dict(orient="records")
+            known = {n["id"] for n in nodes}
+            for e in edges:
+                for end in (e["source"], e["target"]):
+                    if end not in known:
+                        known.add(end)
+                        nodes.append({"id": end, "labels": [], "props": {}})
+        with span("graph_snapshot.build"):
+            return cls._from_records(version, nodes, edges)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.index
+
+    @property
+    def node_count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src) + len(self._extra_edges)
+
+    # Incremental updates -------------------------------------------------------------
+
+    def add_node(self, node_id: str, labels: List[str], props: Dict[str, Any]):
+        # MERGE ... SET n += $props semantics.
+        i = self.index.get(node_id)
+        if i is None:
+            self.index[node_id] = len(self.ids)
+            self.ids.append(node_id)
+            self.labels.append(list(labels))
+            self.props.append(dict(props))
+            return
+        self.labels[i] = list(dict.fromkeys(self.labels[i] + list(labels)))
+        self.props[i] = {**self.props[i], **props}
+
+    def add_edge(self, source: str, target: str, rel_type: str):
+        # MATCH both ends, MERGE the relationship: a no-op when an end is unknown or it already exists.
+        a = self.index.get(source)
+        b = self.index.get(target)
+        if a is None or b is None:
+            return
+        t = self.type_index.get(rel_type)
+        if t is None:
+            t = self.type_index[rel_type] = len(self.type_names)
+            self.type_names.append(rel_type)
+        if any(j == b and tt == t and out for j, tt, _, out in self._steps(a, out=True, back=False)):
+            return
+        eid = len(self.src) + len(self._extra_edges)
+        self._extra_edges.append((a, b, t))
+        self._extra_out[a].append(eid)
+        self._extra_in[b].append(eid)
+
+    # Traversal ----------------------------------------------------------------------
+
+    def _edge(self, eid: int) -> Tuple[int, int, int]:
+        if eid < len(self.src):
+            return int(self.src[eid]), int(self.dst[eid]), int(self.etype[eid])
+        return self._extra_edges[eid - len(self.src)]
+
+    def _steps(self, i: int, out: bool = True, back: bool = True, types: Optional[Set[int]] = None) -> List[Step]:
+        steps: List[Step] = []
+        base = i < self._base_nodes
+        if out:
+            if base:
+                a, b = self.out_off[i], self.out_off[i + 1]
+                steps.extend(zip(self.out_nbr[a:b].tolist(), self.out_type[a:b].tolist(), self.out_eid[a:b].tolist(), [True] * (b - a)))
+            for eid in self._extra_out.get(i, ()):
+                _, v, t = self._edge(eid)
+                steps.append((v, t, eid, True))
+        if back:
+            if base:
+                a, b = self.in_off[i], self.in_off[i + 1]
+                steps.extend(zip(self.in_nbr[a:b].tolist(), self.in_type[a:b].tolist(), self.in_eid[a:b].tolist(), [False] * (b - a)))
+            for eid in self._extra_in.get(i, ()):
+                v, _, t = self._edge(eid)
+                steps.append((v, t, eid, False))
+        if types is not None:
+            steps = [st for st in steps if st[1] in types]
+        return steps
+
+    def _type_codes(self, rel_types: Optional[List[str]]) -> Optional[Set[int]]:
+        if not rel_types:
+            return None
+        return {self.type_index[t] for t in rel_types if t in self.type_index}
+
+    def node(self, i: int) -> Dict[str, Any]:
+        return {"id": self.ids[i], "labels": self.labels[i], "props": self.props[i]}
+
+    def edge(self, eid: int) -> Dict[str, Any]:
+        a, b, t = self._edge(eid)
+        return {"source": self.ids[a], "target": self.ids[b], "type": self.type_names[t]}
+
+    @timed("graph_snapshot.neighbors")
+    def neighbors(self, node_id: str, depth: int = 1, rel_types: Optional[List[str]] = None, limit: Optional[int] = None, fanout: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+        # Same contract as Neo4jService.get_neighbors, including the page key format, so a
+        # cursor from either side can be passed to the other.
+        depth, rel_types, limit, fanout, cursor = _neighbor_args(depth, rel_types, limit, fanout, cursor)
+        root = self.index.get(node_id)
+        if root is None:
+            return {"nodes": [], "edges": [], "next_cursor": None}
+        types = self._type_codes(rel_types)
+        if types is not None and not types:
+            return {"nodes": [], "edges": [], "next_cursor": None}
+        keyed = []
+        for j, t, eid, out in self._steps(root, types=types):
+            key = f"{self.ids[j]}|{self.type_names[t]}|{'out' if out else 'in'}"
+            if cursor is None or key > cursor:
+                keyed.append((key, j, eid))
+        keyed.sort()
+        page = keyed[:max(1, limit)]
+        next_cursor = page[-1][0] if len(keyed) > len(page) else None
+        seen_nodes = {root}
+        nodes: List[int] = []
+        seen_edges: Set[int] = set()
+        edges: List[int] = []
+        frontier: List[int] = []
+        for _, j, eid in page:
+            if eid not in seen_edges:
+                seen_edges.add(eid)
+                edges.append(eid)
+            if j not in seen_nodes:
+                seen_nodes.add(j)
+                nodes.append(j)
+            frontier.append(j)
+        for _ in range(max(1, depth) - 1):
+            nxt: List[int] = []
+            for f in dict.fromkeys(frontier):
+                for j, t, eid, out in self._steps(f, types=types)[:max(1, fanout)]:
+                    if eid not in seen_edges:
+                        seen_edges.add(eid)
+                        edges.append(eid)
+                    if j not in seen_nodes:
+                        seen_nodes.add(j)
+                        nodes.append(j)
+                    nxt.append(j)
+            frontier = nxt
+        return {"nodes": [self.node(i) for i in nodes], "edges": [self.edge(e) for e in edges], "next_cursor": next_cursor}
+
+    def _expand(self, front: np.ndarray, out: bool, back: bool, type_mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (neighbour, edge id, expanded node) for every edge of the frontier, gathered from the
+        # CSR slices in one go.
+        nbrs, eids, froms, kinds = [], [], [], []
+        base = front[front < self._base_nodes]
+        for enabled, off, nbr, eid, typ in ((out, self.out_off, self.out_nbr, self.out_eid, self.out_type), (back, self.in_off, self.in_nbr, self.in_eid, self.in_type)):
+            if not enabled or not len(base):
+                continue
+            starts = off[base]
+            counts = off[base + 1] - starts
+            total = int(counts.sum())
+            if not total:
+                continue
+            idx = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            nbrs.append(nbr[idx])
+            eids.append(eid[idx])
+            froms.append(np.repeat(base, counts))
+            kinds.append(typ[idx])
+        if self._extra_edges:
+            extra = [(v, eid, u, t) for u in front.tolist() for v, t, eid, _ in self._steps(u, out, back) if eid >= len(self.src)]
+            if extra:
+                v, eid, u, t = (np.array(c, dtype=np.int64) for c in zip(*extra))
+                nbrs.append(v)
+                eids.append(eid)
+                froms.append(u)
+                kinds.append(t)
+        if not nbrs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        nbr, eid, frm, kind = (np.concatenate(c) for c in (nbrs, eids, froms, kinds))
+        if type_mask is not None:
+            keep = type_mask[kind]
+            nbr, eid, frm = nbr[keep], eid[keep], frm[keep]
+        return nbr, eid, frm
+
+    def _scratch(self) -> int:
+        n = len(self.ids)
+        if not self._stamp or len(self._stamp[0]) < n:
+            size = max(16, n + n // 4)
+            self._stamp = [np.zeros(size, dtype=np.int64) for _ in range(2)]
+            self._dist = [np.zeros(size, dtype=np.int64) for _ in range(2)]
+            self._via = [np.zeros(size, dtype=np.int64) for _ in range(2)]
+            self._prev = [np.zeros(size, dtype=np.int64) for _ in range(2)]
+        self._epoch += 1
+        return self._epoch
+
+    @timed("graph_snapshot.shortest_path")
+    def shortest_path(self, source_id: str, target_id: str, max_hops: Optional[int] = None, rel_types: Optional[List[str]] = None, directed: bool = False) -> Optional[Dict]:
+        # Bidirectional BFS, always growing the smaller frontier by one full level; among the
+        # meeting points of a level the one with the shortest total length wins.
+        max_hops = _path_args(max_hops)
+        s = self.index.get(source_id)
+        t = self.index.get(target_id)
+        if s is None or t is None:
+            return None
+        codes = self._type_codes(rel_types)
+        type_mask = None
+        if codes is not None:
+            type_mask = np.zeros(len(self.type_names), dtype=bool)
+            type_mask[list(codes)] = True
+        epoch = self._scratch()
+        ends = (s, t)
+        for side in (0, 1):
+            self._stamp[side][ends[side]] = epoch
+            self._dist[side][ends[side]] = 0
+        fronts = [np.array([s], dtype=np.int64), np.array([t], dtype=np.int64)]
+        meet = s if s == t else None
+        hops = 0
+        while meet is None and len(fronts[0]) and len(fronts[1]) and hops < max_hops:
+            side = 0 if len(fronts[0]) <= len(fronts[1]) else 1
+            # Directed search follows out-edges from the source side and in-edges from the target side.
+            nbr, eid, frm = self._expand(fronts[side], out=side == 0 or not directed, back=side == 1 or not directed, type_mask=type_mask)
+            stamp, dist = self._stamp[side], self._dist[side]
+            fresh = stamp[nbr] != epoch
+            nbr, first = np.unique(nbr[fresh], return_index=True)
+            eid, frm = eid[fresh][first], frm[fresh][first]
+            stamp[nbr] = epoch
+            dist[nbr] = dist[frm] + 1
+            self._via[side][nbr] = eid
+            self._prev[side][nbr] = frm
+            fronts[side] = nbr
+            hops += 1
+            other = 1 - side
+            hit = nbr[self._stamp[other][nbr] == epoch]
+            if len(hit):
+                meet = int(hit[np.argmin(dist[hit] + self._dist[other][hit])])
+        if meet is None:
+            return None
+        halves: List[Tuple[List[int], List[int]]] = []
+        for side in (0, 1):
+            nodes, eids, v = [], [], meet
+            while v != ends[side]:
+                eids.append(int(self._via[side][v]))
+                v = int(self._prev[side][v])
+                nodes.append(v)
+            halves.append((nodes, eids))
+        path = halves[0][0][::-1] + [meet] + halves[1][0]
+        eids = halves[0][1][::-1] + halves[1][1]
+        return {"path": [self.ids[i] for i in path], "nodes": [self.node(i) for i in path], "edges": [self.edge(e) for e in eids], "length": len(eids)}
+
+    def export(self, labels: Optional[List[str]] = None) -> Dict:
+        # Called off the event loop (it touches every node and edge); sizes are read once so
+        # overlay writes landing meanwhile are simply not part of this export.
+        m = self.edge_count
+        n = len(self.ids)
+        keep = None
+        if labels:
+            want = set(labels)
+            keep = np.array([bool(want.intersection(self.labels[i])) for i in range(n)], dtype=bool)
+        nodes = [self.node(i) for i in range(n) if keep is None or keep[i]]
+        edges = []
+        for eid in range(m):
+            a, b, _ = self._edge(eid)
+            if keep is None or (keep[a] and keep[b]):
+                edges.append(self.edge(eid))
+        return {"nodes": nodes, "edges": edges}
+
+class GraphSnapshotManager:
+    """Keeps the process-wide snapshot current.
+
+    Writes made through the Neo4j services in this process reach it through a write listener:
+    node/edge merges are applied in place and bulk imports trigger a rebuild. Changes made
+    elsewhere are noticed by comparing the cheap graph version at most every
+    `check_interval` seconds. While no snapshot is ready callers get None and use Neo4j.
+    """
+
+    def __init__(self, driver=None, graphrag=None, source: str = "neo4j", check_interval: float = 5.0):
+        self.driver = driver
+        self.graphrag = graphrag
+        self.source = source
+        self.check_interval = check_interval
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._checked = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        # Version whose build failed: not retried until the graph (or artifacts) change.
+        self._failed_version: Any = None
+        # Writes seen while a snapshot is being built; replayed onto it before it is published.
+        self._pending: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.source in ("neo4j", "graphrag")
+
+    def get(self) -> Optional[GraphSnapshot]:
+        if not self.enabled:
+            return None
+        snap = self._snapshot
+        now = time.monotonic()
+        if now < self._retry_at:
+            return snap
+        if self.source == "graphrag" and self.graphrag is not None:
+            svc = self.graphrag._service
+            if svc is not None and svc.version != self._failed_version and (snap is None or snap.version != svc.version):
+                self._schedule()
+        elif snap is None or now - self._checked >= self.check_interval:
+            self._schedule()
+        return snap
+
+    def invalidate(self):
+        self._snapshot = None
+        self._failed_version = None
+        self._retry_at = 0.0
+        self._schedule()
+
+    def on_write(self, event: str, data: Dict[str, Any]):
+        if self._pending is not None:
+            self._pending.append((event, data))
+        snap = self._snapshot
+        if event == "bulk":
+            self.invalidate()
+        elif snap is not None:
+            self._apply(snap, event, data)
+
+    def _apply(self, snap: GraphSnapshot, event: str, data: Dict[str, Any]):
+        if event == "node":
+            snap.add_node(str(data["id"]), [data["label"]], data.get("props") or {})
+        elif event == "edge":
+            snap.add_edge(str(data["source"]), str(data["target"]), data["type"])
+        else:
+            return
+        # Each CRM write reports the graph version it produced. When that is the very next
+        # counter value the snapshot now matches the graph, so the periodic check has nothing to
+        # reload; if another writer got in between the version is left alone and it reloads.
+        version = data.get("version")
+        before = _meta_counter(snap.version)
+        if self.source == "neo4j" and version is not None and before is not None and _meta_counter(version) == before + 1:
+            snap.version = version
+
+    def _schedule(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass
+
+    async def refresh(self, force: bool = False):
+        self._checked = time.monotonic()
+        version = None
+        try:
+            if self.source == "graphrag":
+                svc = self.graphrag._service if self.graphrag is not None else None
+                if svc is None:
+                    return
+                version = svc.version
+                if force or self._snapshot is None or self._snapshot.version != version:
+                    with span("graph_snapshot.load"):
+                        self._snapshot = await asyncio.to_thread(GraphSnapshot.from_frames, version, svc.entities, svc.relationships)
+                    self._loaded()
+                return
+            neo = AsyncNeo4jService(driver=self.driver)
+            version = await neo.graph_version()
+            if not force and self._snapshot is not None and self._snapshot.version == version:
+                return
+            if not force and version == self._failed_version:
+                return
+            self._pending = []
+            with span("graph_snapshot.load"):
+                nodes: List[Dict] = []
+                edges: List[Dict] = []
+                async for kind, items in neo.export_stream(None):
+                    (nodes if kind == "nodes" else edges).extend(items)
+                snap = await asyncio.to_thread(GraphSnapshot.from_records, version, nodes, edges)
+            # Writes made during the build may or may not be in the export; merges are idempotent,
+            # so all of them are replayed. An import meanwhile makes the next get() check again.
+            for event, data in self._pending:
+                if event == "bulk":
+                    self._checked = 0.0
+                else:
+                    self._apply(snap, event, data)
+            self._snapshot = snap
+            self._loaded()
+        except Exception as e:
+            # Back off exponentially (capped at five minutes) so an unreachable database or a graph
+            # that cannot be built is not re-read on every request; only the first failure warns.
+            (logger.debug if self._failures else logger.warning)("Graph snapshot refresh failed: %s", e)
+            self._failures += 1
+            self._failed_version = version
+            self._retry_at = time.monotonic() + min(300.0, max(1.0, self.check_interval) * 2 ** (self._failures - 1))
+        finally:
+            self._pending = None
+
+    def _loaded(self):
+        self._failures = 0
+        self._retry_at = 0.0
+        self._failed_version = None
+        logger.info("Graph snapshot loaded: %d nodes, %d edges", self._snapshot.node_count, self._snapshot.edge_count)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "source": self.source,
+            "ready": snap is not None,
+            "version": None if snap is None else snap.version,
+            "nodes": 0 if snap is None else snap.node_count,
+            "edges": 0 if snap is None else snap.edge_count,
+        }
@@ -1,50 +1,207 @@
 import os
 import glob
-from typing import List, Dict, Any, Optional
+import shutil
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 import re
+import time
+import numpy as np
 import pandas as pd
-import math
+import pyarrow as pa
+import pyarrow.parquet as pq
 import json
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+from app.core.config import settings
+from app.core.metrics import span, timed
+from app.services.ann import IVFFlatIndex, ANN_INDEX_FILE, ann_sources, write_ann_index
+from app.services.bm25 import BM25Index, BM25_INDEX_FILE
+from app.services.embeddings import get_embedder, embed_in_batches
+from app.services.graph_index import GraphAdjacency
+from app.services.entity_index import EntityIndex
+from app.services import artifact_store
+from app.services.query_pool import run_blocking
+from app.services.graph_extraction import ExtractionCache, EXTRACTION_CACHE_FILE, extract_graphs, get_extractor, merge_graph
+
+EMBEDDING_CHECKPOINT_DIR = 'text_unit_embeddings.checkpoint'
+
+ARTIFACT_FILES = [
+    'create_final_text_units',
+    'create_final_entities',
+    'create_final_relationships',
+    'create_final_community_reports',
+]
+
+def resolve_index_root(base: str) -> str:
+    if os.path.isabs(base):
+        return base
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+    return os.path.abspath(os.path.join(repo_root, base))
+
+def latest_artifacts_dir(base: str) -> Optional[str]:
+    root = resolve_index_root(base)
+    if not os.path.isdir(root):
+        return None
+    candidates = glob.glob(os.path.join(root, '*', 'artifacts'))
+    if not candidates:
+        return None
+    def score(p: str) -> int:
+        parent = os.path.basename(os.path.dirname(p))
+        try:
+            return int(parent)
+        except Exception:
+            return -1
+    best = sorted(candidates, key=score)[-1]
+    return best
+
+def artifacts_version(artifacts_dir: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not artifacts_dir or not os.path.isdir(artifacts_dir):
+        return None
+    latest = 0
+    for name in os.listdir(artifacts_dir):
+        if os.path.splitext(name)[0] not in ARTIFACT_FILES:
+            continue
+        try:
+            latest = max(latest, os.stat(os.path.join(artifacts_dir, name)).st_mtime_ns)
+        except OSError:
+            pass
+    return (artifacts_dir, latest)
+
+def _str_col(s: pd.Series) -> pd.Series:
+    # Arrow-backed string columns are already strings; astype(str) would copy them into objects.
+    if isinstance(s.dtype, pd.ArrowDtype) and pa.types.is_string(s.dtype.pyarrow_dtype):
+        return s.fillna('')
+    return s.astype(str)
+
+def _native(v: Any) -> Any:
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    return v
 
 class GraphRAGService:
-    def __init__(self, index_path: str):
+    def __init__(self, index_path: str, artifacts_dir: Optional[str] = None):
         self.index_path = index_path
-        self.artifacts_dir = self._latest_artifacts_dir(index_path)
+        self.artifacts_dir = artifacts_dir or self._latest_artifacts_dir(index_path)
+        self.version = artifacts_version(self.artifacts_dir)
         self.text_units = self._load_parquet('create_final_text_units.parquet')
         self.entities = self._load_parquet('create_final_entities.parquet')
         self.relationships = self._load_parquet('create_final_relationships.parquet')
         self.community_reports = self._load_parquet('create_final_community_reports.parquet')
+        self._build_indexes()
 
-    def _latest_artifacts_dir(self, base: str) -> Optional[str]:
-        root = base
-        if not os.path.isabs(root):
-            repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-            root = os.path.abspath(os.path.join(repo_root, base))
-        if not os.path.isdir(root):
-            return None
-        candidates = glob.glob(os.path.join(root, '*', 'artifacts'))
-        if not candidates:
-            return None
-        def score(p: str) -> int:
-            parent = os.path.basename(os.path.dirname(p))
+    @classmethod
+    def from_frames(cls, text_units: Optional[pd.DataFrame] = None, entities: Optional[pd.DataFrame] = None, relationships: Optional[pd.DataFrame] = None, community_reports: Optional[pd.DataFrame] = None, index_path: str = ''):
+        svc = cls.__new__(cls)
+        svc.index_path = index_path
+        svc.artifacts_dir = None
+        svc.version = None
+        svc.text_units = text_units
+        svc.entities = entities
+        svc.relationships = relationships
+        svc.community_reports = community_reports
+        svc._build_indexes()
+        return svc
+
+    @timed("graphrag.build_indexes")
+    def _build_indexes(self):
+        df = self.text_units
+        self.text_col = self._pick_text_col(df) if df is not None and not df.empty else None
+        if self.text_col:
+            self.unit_bm25 = self._load_unit_bm25(df[self.text_col])
+            if 'document_id' in df.columns:
+                self._unit_document_ids = _str_col(df['document_id'])
+            else:
+                self._unit_document_ids = pd.Series([''] * len(df), index=df.index)
+        else:
+            self.unit_bm25 = None
+            self._unit_document_ids = None
+        self.adjacency = GraphAdjacency.from_frame(self.relationships)
+        self.entity_index = EntityIndex.from_frame(self.entities)
+        reps = self.community_reports
+        if reps is not None and not reps.empty:
+            self.report_text_col = 'report' if 'report' in reps.columns else self._pick_text_col(reps)
+            texts = reps[self.report_text_col].fillna('').astype(str) if self.report_text_col else pd.Series([''] * len(reps), index=reps.index)
+            if 'community_id' in reps.columns:
+                texts = texts + ' ' + reps['community_id'].astype(str)
+            self.report_bm25 = BM25Index.build(texts)
+        else:
+            self.report_text_col = None
+            self.report_bm25 = None
+        self.embedding_matrix, self.embedding_mask = self._embedding_matrix(df)
+        self.segment_masks = self._segment_masks(settings.graphrag_drift_segments)
+        self.ann_index = self._load_ann_index()
+
+    def _segment_masks(self, segments: Dict[str, str]) -> Dict[str, np.ndarray]:
+        masks = {}
+        if self._unit_document_ids is None:
+            return masks
+        for name, regex in segments.items():
             try:
-                return int(parent)
+                masks[name] = self._unit_document_ids.str.contains(regex, regex=True).to_numpy()
             except Exception:
-                return -1
-        best = sorted(candidates, key=score)[-1]
-        return best
+                pass
+        return masks
+
+    def _entity_names_for(self, ids: List[str]) -> List[str]:
+        idx = self.entity_index
+        if idx is None:
+            return []
+        pos = sorted({p for p in (idx.get(i) for i in ids) if p is not None})
+        return [idx.names[p] for p in pos if idx.names[p]]
+
+    def _entity_record(self, pos: int, full: bool = False) -> Dict[str, Any]:
+        r = self.entities.iloc[pos]
+        rec = {'id': _native(r.get('id')), 'name': _native(r.get('name')), 'type': _native(r.get('type'))}
+        if full:
+            rec['description'] = _native(r.get('description'))
+        return rec
+
+    def _load_unit_bm25(self, texts: pd.Series) -> BM25Index:
+        if self.artifacts_dir:
+            path = os.path.join(self.artifacts_dir, BM25_INDEX_FILE)
+            # Same row count is not enough: text units rewritten in place must not keep old postings.
+            if artifact_store.is_fresh(os.path.join(path, 'meta.json'), artifact_store.source_paths(self.artifacts_dir, 'create_final_text_units')):
+                idx = BM25Index.load(path)
+                if idx is not None and idx.n_docs == len(texts):
+                    return idx
+        return BM25Index.build(texts.fillna('').astype(str))
+
+    def save_keyword_index(self) -> Optional[str]:
+        if self.unit_bm25 is None or not self.artifacts_dir:
+            return None
+        path = os.path.join(self.artifacts_dir, BM25_INDEX_FILE)
+        self.unit_bm25.save(path)
+        return path
+
+    def _load_ann_index(self) -> Optional[IVFFlatIndex]:
+        mat = self.embedding_matrix
+        if mat is None or not self.artifacts_dir:
+            return None
+        path = os.path.join(self.artifacts_dir, ANN_INDEX_FILE)
+        if not artifact_store.is_fresh(os.path.join(path, 'meta.json'), ann_sources(self.artifacts_dir)):
+            return None
+        idx = IVFFlatIndex.load(path)
+        if idx is None or idx.count != mat.shape[0] or idx.dim != mat.shape[1]:
+            return None
+        return idx
+
+    def build_ann_index(self) -> Dict[str, Any]:
+        if self.embedding_matrix is None or not self.artifacts_dir:
+            return {"built": False, "reason": "No embeddings loaded"}
+        path = write_ann_index(self.artifacts_dir, self.embedding_matrix, self.embedding_mask, min_units=settings.graphrag_ann_min_units)
+        if not path:
+            return {"built": False, "reason": f"Fewer than {settings.graphrag_ann_min_units} embedded text units"}
+        return {"built": True, "path": path}
+
+    def _latest_artifacts_dir(self, base: str) -> Optional[str]:
+        return latest_artifacts_dir(base)
 
+    @timed("graphrag.load_artifacts")
     def _load_parquet(self, name: str) -> Optional[pd.DataFrame]:
         if not self.artifacts_dir:
             return None
+        df = artifact_store.read_table(self.artifacts_dir, os.path.splitext(name)[0])
+        if df is not None:
+            return df
         base = os.path.join(self.artifacts_dir, name)
         if os.path.exists(base):
             try:
@@ -73,367 +230,520 @@ class GraphRAGService:
                 return c
         return None
 
-    def _keyword_score(self, text: str, query: str) -> int:
-        t = (text or '').lower()
-        score = 0
-        for w in query.lower().split():
-            if w and w in t:
-                score += 1
-        return score
-
-    def _cosine(self, a: List[float], b: List[float]) -> float:
-        if not a or not b:
-            return 0.0
-        s = 0.0
-        na = 0.0
-        nb = 0.0
-        for i in range(min(len(a), len(b))):
-            s += a[i] * b[i]
-            na += a[i] * a[i]
-            nb += b[i] * b[i]
-        if na == 0.0 or nb == 0.0:
-            return 0.0
-        return s / (math.sqrt(na) * math.sqrt(nb))
-
-    def _embed(self, text: str) -> Optional[List[float]]:
-        api_key_g = os.getenv("GEMINI_API_KEY")
-        if genai is not None and api_key_g:
+    def _as_vector(self, e: Any) -> Optional[np.ndarray]:
+        if e is None:
+            return None
+        if isinstance(e, str):
             try:
-                genai.configure(api_key=api_key_g)
-                r = genai.embed_content(model="models/text-embedding-004", content=text)
-                e = r.get("embedding") if isinstance(r, dict) else getattr(r, "embedding", None)
-                if e is None and isinstance(r, dict) and "values" in r:
-                    e = r.get("values")
-                if hasattr(e, "values"):
-                    e = e.values
-                return list(e) if e is not None else None
+                e = json.loads(e)
             except Exception:
-                pass
-        api_key_o = os.getenv("OPENAI_API_KEY")
-        if OpenAI is not None and api_key_o:
+                return None
+        try:
+            v = np.asarray(e, dtype=np.float32)
+        except Exception:
+            return None
+        return v if v.ndim == 1 and v.size else None
+
+    def _embedding_matrix(self, df: Optional[pd.DataFrame]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        if df is None or df.empty:
+            return None, None
+        if self.artifacts_dir:
+            mat, valid = artifact_store.read_embeddings(self.artifacts_dir, len(df))
+            if mat is not None:
+                return mat, valid
+        if 'embedding' in df.columns:
+            col = df['embedding'].tolist()
+        else:
+            col = self._stored_embeddings(len(df))
+            if col is None:
+                return None, None
+        return self._stack_embeddings(col)
+
+    def _stack_embeddings(self, col: List[Any]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        try:
+            mat = np.stack([np.asarray(e, dtype=np.float32) for e in col])
+            valid = np.ones(len(col), dtype=bool)
+            if mat.ndim != 2:
+                raise ValueError("ragged embeddings")
+        except Exception:
+            vecs = [self._as_vector(e) for e in col]
+            dim = next((len(v) for v in vecs if v is not None), 0)
+            if not dim:
+                return None, None
+            mat = np.zeros((len(vecs), dim), dtype=np.float32)
+            valid = np.zeros(len(vecs), dtype=bool)
+            for i, v in enumerate(vecs):
+                if v is not None and len(v) == dim:
+                    mat[i] = v
+                    valid[i] = True
+        norms = np.linalg.norm(mat, axis=1)
+        valid &= norms > 0
+        mat[valid] /= norms[valid, None]
+        mat[~valid] = 0.0
+        return np.ascontiguousarray(mat), valid
+
+    def _stored_embeddings(self, n_rows: int) -> Optional[List[Any]]:
+        # The columnar copy of text units leaves vectors out; fall back to the parquet column.
+        path = os.path.join(self.artifacts_dir or '', 'create_final_text_units.parquet')
+        try:
+            col = pq.read_table(path, columns=['embedding']).column('embedding').to_pylist()
+        except Exception:
+            return None
+        return col if len(col) == n_rows else None
+
+    def write_columnar(self) -> Dict[str, Any]:
+        if not self.artifacts_dir:
+            return {"written": [], "reason": "No artifacts directory"}
+        written = []
+        for name in ARTIFACT_FILES:
+            df = getattr(self, name.replace('create_final_', ''), None)
+            if df is not None:
+                artifact_store.write_table(self.artifacts_dir, name, df)
+                written.append(name + '.arrow')
+        if self.embedding_matrix is not None:
+            artifact_store.write_embeddings(self.artifacts_dir, self.embedding_matrix, self.embedding_mask)
+            written.append(artifact_store.EMBEDDINGS_FILE)
+        return {"written": written}
+
+    @timed("graphrag.embed")
+    def _embed(self, text: str) -> Optional[List[float]]:
+        return get_embedder().embed(text)
+
+    async def _aembed(self, text: str) -> List[float]:
+        # [] rather than None so the ranking code does not retry the provider synchronously.
+        if not self.text_col:
+            return []
+        with span("graphrag.embed"):
+            return await get_embedder().aembed(text) or []
+
+    def _load_embedding_checkpoint(self, path: str, vectors: List[Optional[np.ndarray]]) -> int:
+        restored = 0
+        for part in sorted(glob.glob(os.path.join(path, 'part-*.npz'))):
             try:
-                client = OpenAI(api_key=api_key_o)
-                r = client.embeddings.create(model="text-embedding-3-small", input=text)
-                e = r.data[0].embedding if getattr(r, "data", None) else None
-                return list(e) if e is not None else None
+                with np.load(part) as z:
+                    for r, v in zip(z['rows'], z['vectors']):
+                        if 0 <= r < len(vectors) and vectors[r] is None:
+                            vectors[r] = v
+                            restored += 1
             except Exception:
                 pass
-        return None
+        return restored
+
+    def _write_embedding_checkpoint(self, path: str, rows: List[int], vecs: List[np.ndarray]):
+        if not rows:
+            return
+        os.makedirs(path, exist_ok=True)
+        n = len(glob.glob(os.path.join(path, 'part-*.npz')))
+        tmp = os.path.join(path, f'.part-{n:06d}.tmp.npz')
+        np.savez(tmp, rows=np.asarray(rows, dtype=np.int64), vectors=np.stack(vecs))
+        os.replace(tmp, os.path.join(path, f'part-{n:06d}.npz'))
+
+    def _write_text_units(self, df: pd.DataFrame, vectors: List[Optional[np.ndarray]]):
+        # 64-bit offsets: int32 ones overflow once the column holds 2**31 floats (~2.8M 768-d rows).
+        lengths = np.array([0 if v is None else len(v) for v in vectors], dtype=np.int64)
+        offsets = np.zeros(len(vectors) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        present = [v for v in vectors if v is not None]
+        values = np.concatenate(present).astype(np.float32) if present else np.empty(0, dtype=np.float32)
+        emb = pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(values, type=pa.float32()), mask=pa.array([v is None for v in vectors]))
+        table = pa.Table.from_pandas(df.drop(columns=['embedding'], errors='ignore'), preserve_index=False).append_column('embedding', emb)
+        out_pq = os.path.join(self.artifacts_dir, "create_final_text_units.parquet")
+        tmp = out_pq + '.tmp'
+        pq.write_table(table, tmp)
+        os.replace(tmp, out_pq)
+        artifact_store.write_table(self.artifacts_dir, "create_final_text_units", df)
 
-    def enrich_text_unit_embeddings(self) -> Dict[str, Any]:
+    @timed("graphrag.enrich_embeddings")
+    def enrich_text_unit_embeddings(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None) -> Dict[str, Any]:
         df = self.text_units
         if df is None or df.empty:
             return {"updated": 0, "reason": "No text_units loaded"}
-        api_key_g = os.getenv("GEMINI_API_KEY")
-        api_key_o = os.getenv("OPENAI_API_KEY")
-        use_gemini = genai is not None and api_key_g
-        use_openai = (not use_gemini) and OpenAI is not None and api_key_o
-        if not use_gemini and not use_openai:
+        embedder = get_embedder()
+        if embedder.provider() is None:
             return {"updated": 0, "reason": "Embeddings unavailable (set GEMINI_API_KEY or OPENAI_API_KEY)"}
-        if use_gemini:
-            try:
-                genai.configure(api_key=api_key_g)
-            except Exception:
-                use_gemini = False
-        text_col = self._pick_text_col(df)
+        text_col = self.text_col
         if not text_col:
             return {"updated": 0, "reason": "No text column present"}
-        embs = []
+        if 'embedding' in df.columns:
+            vectors = [self._as_vector(e) for e in df['embedding'].tolist()]
+        elif self.embedding_matrix is not None:
+            vectors = [self.embedding_matrix[i] if ok else None for i, ok in enumerate(self.embedding_mask)]
+        else:
+            vectors = [None] * len(df)
+        existing = sum(v is not None for v in vectors)
+        ckpt = os.path.join(self.artifacts_dir, EMBEDDING_CHECKPOINT_DIR)
+        restored = self._load_embedding_checkpoint(ckpt, vectors)
+        texts = df[text_col].fillna('').astype(str).tolist()
+        todo = [(i, texts[i]) for i, v in enumerate(vectors) if v is None]
         updated = 0
-        for _, row in df.iterrows():
-            txt = str(row.get(text_col, ""))
-            try:
-                vec = None
-                if use_gemini:
-                    r = genai.embed_content(model="models/text-embedding-004", content=txt)
-                    e = r.get("embedding") if isinstance(r, dict) else getattr(r, "embedding", None)
-                    if e is None and isinstance(r, dict) and "values" in r:
-                        e = r.get("values")
-                    if hasattr(e, "values"):
-                        e = e.values
-                    vec = list(e) if e is not None else None
-                elif use_openai:
-                    client = OpenAI(api_key=api_key_o)
-                    r = client.embeddings.create(model="text-embedding-3-small", input=txt)
-                    e = r.data[0].embedding if getattr(r, "data", None) else None
-                    vec = list(e) if e is not None else None
-                embs.append(vec)
-                if vec is not None:
-                    updated += 1
-            except Exception:
-                embs.append(None)
+        failed = 0
+        buf_rows: List[int] = []
+        buf_vecs: List[np.ndarray] = []
+        for rows, vecs in embed_in_batches(
+            embedder,
+            todo,
+            batch_size=batch_size or settings.embedding_batch_size,
+            concurrency=concurrency or settings.embedding_concurrency,
+            max_retries=settings.embedding_max_retries,
+        ):
+            for r, v in zip(rows, vecs or [None] * len(rows)):
+                if v is None:
+                    failed += 1
+                    continue
+                vectors[r] = np.asarray(v, dtype=np.float32)
+                buf_rows.append(r)
+                buf_vecs.append(vectors[r])
+                updated += 1
+            if len(buf_rows) >= settings.embedding_checkpoint_rows:
+                self._write_embedding_checkpoint(ckpt, buf_rows, buf_vecs)
+                buf_rows, buf_vecs = [], []
+        res = {"updated": updated, "skipped": existing, "restored": restored, "failed": failed}
+        if updated == 0 and restored == 0:
+            # Nothing new to store; leave the table, sidecar and ANN index (and their mtimes) alone.
+            return {**res, "saved": False, "reason": "No new embeddings"}
         try:
-            df = df.copy()
-            df["embedding"] = embs
-            out_pq = os.path.join(self.artifacts_dir, "create_final_text_units.parquet")
-            df.to_parquet(out_pq, index=False)
-            out_json = os.path.join(self.artifacts_dir, "create_final_text_units.json")
-            try:
-                with open(out_json, "w") as f:
-                    json.dump(df.to_dict(orient="records"), f)
-            except Exception:
-                pass
-            self.text_units = df
-            return {"updated": updated, "saved": True}
+            self._write_text_units(df, vectors)
         except Exception as e:
-            return {"updated": updated, "saved": False, "reason": str(e)}
-
-    def _extract_graph_via_gemini(self, text: str) -> Dict[str, Any]:
-        if genai is None:
-            return {"entities": [], "relationships": []}
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            return {"entities": [], "relationships": []}
+            self._write_embedding_checkpoint(ckpt, buf_rows, buf_vecs)
+            return {**res, "saved": False, "reason": str(e)}
+        shutil.rmtree(ckpt, ignore_errors=True)
+        res["saved"] = True
+        # The text is unchanged, but the rewritten table would otherwise leave the persisted
+        # keyword index looking stale and have every load rebuild it.
+        res["bm25"] = self.save_keyword_index()
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel("gemini-1.5-pro")
-            prompt = (
-                "You are extracting a code graph from TypeScript/TSX code. "
-                "Return JSON with keys 'entities' and 'relationships'. "
-                "entities: list of {id,name,type} where type is one of File, Component, Function, Hook, Import, Export. "
-                "relationships: list of {source,target,type} where type is one of CONTAINS, IMPORTS, CALLS, RENDERS, USES_HOOK, EXPORTS. "
-                "Infer ids as stable strings (e.g., 'fn_Name', 'cmp_Name', 'file_path'). "
-                "Output strictly JSON only."
-            )
-            r = model.generate_content([prompt, text])
-            t = getattr(r, "text", None)
-            if not t and hasattr(r, "candidates") and r.candidates:
-                try:
-                    t = r.candidates[0].content.parts[0].text
-                except Exception:
-                    t = None
-            if not t:
-                return {"entities": [], "relationships": []}
-            try:
-                j = json.loads(t)
-            except Exception:
-                m = re.search(r"\{[\s\S]*\}", t)
-                j = json.loads(m.group(0)) if m else {"entities": [], "relationships": []}
-            ents = j.get("entities") or []
-            rels = j.get("relationships") or []
-            return {"entities": ents, "relationships": rels}
-        except Exception:
-            return {"entities": [], "relationships": []}
+            mat, valid = self._stack_embeddings(vectors)
+            artifact_store.write_embeddings(self.artifacts_dir, mat, valid)
+            res["ann_index"] = write_ann_index(self.artifacts_dir, mat, valid, min_units=settings.graphrag_ann_min_units)
+        except Exception as e:
+            res["ann_index"] = None
+            res["ann_reason"] = str(e)
+        return res
+
+    def _extraction_cache_path(self) -> str:
+        if settings.graph_extraction_cache_path:
+            return settings.graph_extraction_cache_path
+        return os.path.join(resolve_index_root(self.index_path), EXTRACTION_CACHE_FILE)
+
+    def _write_table(self, name: str, df: pd.DataFrame):
+        base = os.path.join(self.artifacts_dir, name)
+        df.to_parquet(base + ".parquet.tmp", index=False)
+        os.replace(base + ".parquet.tmp", base + ".parquet")
+        with open(base + ".json.tmp", "w") as f:
+            json.dump(df.to_dict(orient="records"), f, default=str)
+        os.replace(base + ".json.tmp", base + ".json")
+        artifact_store.write_table(self.artifacts_dir, name, df)
 
-    def enrich_graph_with_gemini(self, limit: int = 50) -> Dict[str, Any]:
+    @timed("graphrag.enrich_graph")
+    def enrich_graph_with_gemini(self, limit: Optional[int] = None, concurrency: Optional[int] = None, extractor: Any = None) -> Dict[str, Any]:
         df = self.text_units
         if df is None or df.empty:
             return {"entities": 0, "relationships": 0, "reason": "No text_units loaded"}
-        text_col = self._pick_text_col(df)
+        text_col = self.text_col
         if not text_col:
             return {"entities": 0, "relationships": 0, "reason": "No text column present"}
+        if extractor is None or isinstance(extractor, str):
+            extractor = get_extractor(extractor or settings.graph_extraction_model)
+        if not extractor.available():
+            return {"entities": 0, "relationships": 0, "reason": "Graph extraction unavailable (set GEMINI_API_KEY or use the stub extractor)"}
+        texts = df[text_col].fillna('').astype(str).tolist()
+        rows = range(len(texts)) if not limit else range(min(len(texts), max(1, limit)))
+        dids = df['document_id'].tolist() if 'document_id' in df.columns else [None] * len(texts)
         collected_entities: List[Dict[str, Any]] = []
         collected_relationships: List[Dict[str, Any]] = []
-        count = 0
-        for _, row in df.iterrows():
-            if count >= max(1, limit):
-                break
-            txt = str(row.get(text_col, ""))
-            res = self._extract_graph_via_gemini(txt)
-            did = row.get("document_id")
-            for e in res.get("entities", []):
-                ee = {"id": e.get("id"), "name": e.get("name"), "type": e.get("type"), "document_id": did}
-                collected_entities.append(ee)
-            for r in res.get("relationships", []):
-                rr = {"source": r.get("source"), "target": r.get("target"), "type": r.get("type"), "document_id": did}
-                collected_relationships.append(rr)
-            count += 1
+        stats = {"chunks": len(rows), "cached": 0, "extracted": 0, "failed": 0}
+        cache = ExtractionCache(self._extraction_cache_path())
+        t0 = time.perf_counter()
+        try:
+            for i, res, cached in extract_graphs(extractor, [(i, texts[i]) for i in rows], cache, concurrency=concurrency or settings.graph_extraction_concurrency):
+                if res is None:
+                    stats["failed"] += 1
+                    continue
+                stats["cached" if cached else "extracted"] += 1
+                did = _native(dids[i])
+                for e in res.get("entities", []):
+                    collected_entities.append({"id": e.get("id"), "name": e.get("name"), "type": e.get("type"), "document_id": did})
+                for r in res.get("relationships", []):
+                    collected_relationships.append({"source": r.get("source"), "target": r.get("target"), "type": r.get("type"), "document_id": did})
+        finally:
+            cache.close()
+        stats["seconds"] = round(time.perf_counter() - t0, 3)
         try:
-            ents_df = pd.DataFrame(collected_entities)
-            rels_df = pd.DataFrame(collected_relationships)
+            ents_df, rels_df, added_e, added_r = merge_graph(self.entities, self.relationships, collected_entities, collected_relationships)
             if self.artifacts_dir:
-                p1 = os.path.join(self.artifacts_dir, "create_final_entities.parquet")
-                p2 = os.path.join(self.artifacts_dir, "create_final_relationships.parquet")
-                ents_df.to_parquet(p1, index=False)
-                rels_df.to_parquet(p2, index=False)
-                j1 = p1.replace(".parquet", ".json")
-                j2 = p2.replace(".parquet", ".json")
-                with open(j1, "w") as f:
-                    json.dump(ents_df.to_dict(orient="records"), f)
-                with open(j2, "w") as f:
-                    json.dump(rels_df.to_dict(orient="records"), f)
-            self.entities = ents_df
-            self.relationships = rels_df
-            return {"entities": len(collected_entities), "relationships": len(collected_relationships), "saved": True}
+                self._write_table("create_final_entities", ents_df)
+                self._write_table("create_final_relationships", rels_df)
+            return {"entities": added_e, "relationships": added_r, "saved": bool(self.artifacts_dir), **stats}
         except Exception as e:
-            return {"entities": len(collected_entities), "relationships": len(collected_relationships), "saved": False, "reason": str(e)}
+            return {"entities": len(collected_entities), "relationships": len(collected_relationships), "saved": False, "reason": str(e), **stats}
+
+    @timed("graphrag.score")
+    def _unit_scores(self, query: str, qemb: Optional[List[float]] = None, nprobe: Optional[int] = None) -> np.ndarray:
+        scores = self.unit_bm25.scores(query)
+        mat = self.embedding_matrix
+        if qemb and mat is not None and len(qemb) == mat.shape[1]:
+            q = np.asarray(qemb, dtype=np.float32)
+            n = float(np.linalg.norm(q))
+            if n > 0:
+                q = q / n
+                if nprobe is None:
+                    nprobe = settings.graphrag_ann_nprobe
+                if self.ann_index is not None and nprobe > 0:
+                    cand = self.ann_index.search(q, nprobe)
+                    scores[cand] += mat[cand] @ q
+                else:
+                    scores += mat @ q
+        return scores
 
-    def _top_units(self, query: str, k: int = 5, offset: int = 0, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    @timed("graphrag.score_batch")
+    def _unit_scores_batch(self, queries: List[str], qembs: List[Optional[List[float]]], nprobes: List[Optional[int]]) -> np.ndarray:
+        # One row per query. Exact queries share a single matrix-matrix product; queries
+        # routed through the ANN index only touch their candidate rows.
+        scores = np.stack([self.unit_bm25.scores(q) for q in queries])
+        mat = self.embedding_matrix
+        if mat is None:
+            return scores
+        dense_rows: List[int] = []
+        dense_q: List[np.ndarray] = []
+        for j, (qemb, nprobe) in enumerate(zip(qembs, nprobes)):
+            if not qemb or len(qemb) != mat.shape[1]:
+                continue
+            q = np.asarray(qemb, dtype=np.float32)
+            n = float(np.linalg.norm(q))
+            if n == 0:
+                continue
+            q = q / n
+            if nprobe is None:
+                nprobe = settings.graphrag_ann_nprobe
+            if self.ann_index is not None and nprobe > 0:
+                cand = self.ann_index.search(q, nprobe)
+                scores[j, cand] += mat[cand] @ q
+            else:
+                dense_rows.append(j)
+                dense_q.append(q)
+        if dense_q:
+            sims = np.stack(dense_q) @ mat.T
+            if len(dense_rows) == len(queries):
+                scores += sims
+            else:
+                scores[dense_rows] += sims
+        return scores
+
+    @timed("graphrag.filter")
+    def _filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        did = self._unit_document_ids
+        mask = np.ones(len(did), dtype=bool)
+        if filters.get('document_id') is not None:
+            mask &= (did == str(filters['document_id'])).to_numpy()
+        if filters.get('document_id_contains'):
+            mask &= did.str.contains(str(filters['document_id_contains']), regex=False).to_numpy()
+        regex = filters.get('document_id_regex')
+        if regex:
+            try:
+                mask &= did.str.contains(regex, regex=True).to_numpy()
+            except Exception:
+                pass
+        return mask
+
+    def _rank_units(self, scores: np.ndarray, k: int, offset: int = 0, min_score: float = 0.0, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        return self._citations(scores, self._ranked_indices(scores, k, offset=offset, min_score=min_score, mask=mask))
+
+    @timed("graphrag.rank")
+    def _ranked_indices(self, scores: np.ndarray, k: int, offset: int = 0, min_score: float = 0.0, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        keep = (scores > 0) & (scores >= min_score)
+        if mask is not None:
+            keep &= mask
+        idx = np.flatnonzero(keep)
+        need = max(0, offset) + max(0, k)
+        if need == 0 or idx.size == 0:
+            return idx[:0]
+        if idx.size > need:
+            idx = idx[np.argpartition(-scores[idx], need - 1)[:need]]
+        return idx[np.lexsort((idx, -scores[idx]))][offset:offset + k]
+
+    @timed("graphrag.citations")
+    def _citations(self, scores: np.ndarray, idx: np.ndarray) -> List[Dict[str, Any]]:
         df = self.text_units
-        if df is None or df.empty:
-            return []
-        text_col = self._pick_text_col(df)
-        if not text_col:
-            return []
-        qemb = self._embed(query)
-        scored = []
-        for i, row in df.iterrows():
-            txt = row.get(text_col, '')
-            s_kw = self._keyword_score(str(txt), query)
-            emb = None
-            if 'embedding' in df.columns:
-                e = row.get('embedding')
-                try:
-                    emb = e if isinstance(e, list) else json.loads(e) if isinstance(e, str) else None
-                except Exception:
-                    emb = None
-            s_vec = self._cosine(qemb or [], emb or []) if qemb and emb else 0.0
-            s = s_kw + s_vec
-            if filters:
-                did = str(row.get('document_id', ''))
-                if filters.get('document_id') is not None and did != str(filters['document_id']):
-                    continue
-                if filters.get('document_id_contains') and filters['document_id_contains'] not in did:
-                    continue
-                regex = filters.get('document_id_regex')
-                if regex:
-                    try:
-                        if not re.search(regex, did):
-                            continue
-                    except Exception:
-                        pass
-            if s > 0:
-                scored.append((s, i, row))
-        scored.sort(key=lambda x: x[0], reverse=True)
         top = []
-        sliced = scored[offset:offset + k]
-        for s, i, row in sliced:
-            if s < min_score:
-                continue
-            preview = str(row.get(text_col, ''))[:280]
+        for i in idx:
+            row = df.iloc[int(i)]
             citation = {
-                'score': s,
-                'row_index': int(i),
-                'text_preview': preview,
+                'score': float(scores[i]),
+                'row_index': int(df.index[int(i)]),
+                'text_preview': str(row.get(self.text_col, ''))[:280],
             }
             for cid in ['document_id', 'chunk_id', 'unit_id', 'source', 'entity_ids']:
                 if cid in df.columns:
-                    citation[cid] = row.get(cid)
+                    citation[cid] = _native(row.get(cid))
             top.append(citation)
         return top
 
-    async def local_search(self, query: str, conversation_history: List = None, top_k: int = 5, offset: int = 0, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None):
-        citations = self._top_units(query, k=top_k, offset=offset, min_score=min_score, filters=filters)
+    def _top_units(self, query: str, k: int = 5, offset: int = 0, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None, qemb: Optional[List[float]] = None, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        if not self.text_col:
+            return []
+        if qemb is None:
+            qemb = self._embed(query)
+        scores = self._unit_scores(query, qemb, nprobe=nprobe)
+        return self._rank_units(scores, k, offset=offset, min_score=min_score, mask=self._filter_mask(filters))
+
+    async def local_search(self, query: str, conversation_history: List = None, top_k: int = 5, offset: int = 0, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None, nprobe: Optional[int] = None):
+        qemb = await self._aembed(query)
+        return await run_blocking(self._local_search, query, top_k, offset, min_score, filters, nprobe, qemb)
+
+    def _local_search(self, query: str, top_k: int, offset: int, min_score: float, filters: Optional[Dict[str, Any]], nprobe: Optional[int], qemb: Optional[List[float]]):
+        citations = self._top_units(query, k=top_k, offset=offset, min_score=min_score, filters=filters, qemb=qemb, nprobe=nprobe)
+        return self._local_result(query, citations)
+
+    async def batch_local_search(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with span("graphrag.embed_batch"):
+            qembs = await get_embedder().aembed_many([r['query'] for r in requests]) if self.text_col else [None] * len(requests)
+        return await run_blocking(self._batch_local_search, requests, [e or [] for e in qembs])
+
+    def _batch_local_search(self, requests: List[Dict[str, Any]], qembs: List[List[float]], block: int = 64) -> List[Dict[str, Any]]:
+        out = []
+        for start in range(0, len(requests), block):
+            reqs = requests[start:start + block]
+            scores = None
+            if self.text_col:
+                scores = self._unit_scores_batch([r['query'] for r in reqs], qembs[start:start + block], [r.get('nprobe') for r in reqs])
+            for j, r in enumerate(reqs):
+                citations = []
+                if scores is not None:
+                    citations = self._rank_units(scores[j], r.get('top_k', 5), offset=r.get('offset', 0), min_score=r.get('min_score', 0.0), mask=self._filter_mask(r.get('filters')))
+                out.append(self._local_result(r['query'], citations))
+        return out
+
+    def _local_result(self, query: str, citations: List[Dict[str, Any]]) -> Dict[str, Any]:
         answer = '\n'.join([c['text_preview'] for c in citations]) or 'No matching context found.'
-        entities = []
-        if self.entities is not None and 'name' in self.entities.columns and 'type' in self.entities.columns:
-            ents = []
-            for _, row in self.entities.iterrows():
-                name = str(row.get('name', ''))
-                if name and self._keyword_score(name, query) > 0:
-                    ents.append({'id': row.get('id'), 'name': name, 'type': row.get('type')})
-            entities = ents[:5]
-        ql = query.lower()
         extra = []
-        if self.relationships is not None and not self.relationships.empty:
-            if 'type' in self.relationships.columns and 'target' in self.relationships.columns and 'source' in self.relationships.columns:
-                wants_calls = ('call' in ql or 'calls' in ql)
-                asks_graphapi = ('graphapi' in ql)
-                asks_graphragapi = ('graphragapi' in ql)
-                if wants_calls and (asks_graphapi or asks_graphragapi):
-                    try:
-                        rels = self.relationships[self.relationships['type'] == 'CALLS']
-                        tgt = rels['target'].astype(str).str.lower()
-                        if asks_graphapi and not asks_graphragapi:
-                            rels = rels[tgt.str.contains('graphapi\.')]  # only graphAPI.*
-                        elif asks_graphragapi and not asks_graphapi:
-                            rels = rels[tgt.str.contains('graphragapi\.')]  # only graphragAPI.*
-                        else:
-                            rels = rels[tgt.str.contains('graphapi\.') | rels['target'].astype(str).str.lower().str.contains('graphragapi\.')]
-                        ids = list(set(rels['source'].tolist()))
-                        if ids:
-                            df = self.entities if self.entities is not None else None
-                            names = []
-                            if df is not None and 'id' in df.columns:
-                                m = df[df['id'].isin(ids)]
-                                for _, r in m.iterrows():
-                                    names.append(str(r.get('name', '')))
-                            extra = [n for n in names if n]
-                            if extra:
-                                answer = ('\n').join(extra)
-                    except Exception:
-                        pass
-                # components that render X
-                wants_render = ('render' in ql or 'renders' in ql)
-                if wants_render:
-                    try:
-                        raw_tokens = [t for t in query.split() if t and t[0].isupper()]
-                        tokens = [re.sub(r'[^A-Za-z0-9_]+$', '', t) for t in raw_tokens]
-                        target_cmp_ids = [f"cmp_{t}" for t in tokens if t]
-                        m = re.search(r"render\w*\s+(\w+)", ql)
-                        if m:
-                            target_cmp_ids.append(f"cmp_{m.group(1)}")
-                        rels = self.relationships[self.relationships['type'] == 'RENDERS']
-                        if target_cmp_ids:
-                            rels = rels[rels['target'].astype(str).isin(target_cmp_ids)]
-                        else:
-                            tkn = None
-                            if 'graphview' in ql:
-                                tkn = 'graphview'
-                            if tkn:
-                                rels = rels[rels['target'].astype(str).str.lower().str.contains(f"cmp_{tkn}")]
-                        src_ids = list(set(rels['source'].tolist()))
-                        df = self.entities if self.entities is not None else None
-                        names = []
-                        if df is not None and 'id' in df.columns:
-                            m = df[df['id'].isin(src_ids)]
-                            for _, r in m.iterrows():
-                                names.append(str(r.get('name', '')))
-                        extra = sorted(list(set([n for n in names if n])))
-                        if extra:
-                            answer = ('\n').join(extra)
-                    except Exception:
-                        pass
-                # files that import module X
-                wants_imports = ('import' in ql or 'imports' in ql)
-                if wants_imports:
-                    try:
-                        rels = self.relationships[self.relationships['type'] == 'IMPORTS']
-                        mod_tokens = [t.strip("'\".,") for t in query.split() if '/' in t or t.startswith('@')]
-                        if mod_tokens:
-                            r = rels[rels['target'].astype(str).str.contains('|'.join([t.lower() for t in mod_tokens]))]
-                        else:
-                            r = rels
-                        src_ids = list(set(r['source'].tolist()))
-                        df = self.entities if self.entities is not None else None
-                        names = []
-                        if df is not None and 'id' in df.columns:
-                            m = df[df['id'].isin(src_ids)]
-                            for _, rr in m.iterrows():
-                                names.append(str(rr.get('name', '')))
-                        extra = [n for n in names if n]
-                        if extra:
-                            answer = ('\n').join(extra)
-                    except Exception:
-                        pass
+        for _, extra in self._structural_hits(query):
+            if extra:
+                answer = ('\n').join(extra)
         return {
             'answer': answer,
             'sources': citations,
-            'entities': entities,
+            'entities': self._local_entities(query),
             'confidence': 0.5 if citations or extra else 0.1,
         }
 
+    @timed("graphrag.entities")
+    def _local_entities(self, query: str) -> List[Dict[str, Any]]:
+        if self.entity_index is not None and 'name' in self.entities.columns and 'type' in self.entities.columns:
+            return [self._entity_record(i) for i in self.entity_index.match(query, 5)]
+        return []
+
+    @timed("graphrag.structural")
+    def _structural_hits(self, query: str) -> List[Tuple[str, List[str]]]:
+        # (relation, entity names) for every structural branch the query triggers, in order;
+        # a later non-empty branch takes over the answer.
+        ql = query.lower()
+        hits = []
+        adj = self.adjacency
+        if adj is None:
+            return hits
+        wants_calls = ('call' in ql or 'calls' in ql)
+        asks_graphapi = ('graphapi' in ql)
+        asks_graphragapi = ('graphragapi' in ql)
+        if wants_calls and (asks_graphapi or asks_graphragapi):
+            try:
+                needles = []
+                if asks_graphapi:
+                    needles.append('graphapi.')  # graphAPI.*
+                if asks_graphragapi:
+                    needles.append('graphragapi.')  # graphragAPI.*
+                targets = adj.match_targets('CALLS', lambda _, low: any(n in low for n in needles))
+                hits.append(('CALLS', self._entity_names_for(adj.sources_of(targets, 'CALLS'))))
+            except Exception:
+                pass
+        # components that render X
+        wants_render = ('render' in ql or 'renders' in ql)
+        if wants_render:
+            try:
+                raw_tokens = [t for t in query.split() if t and t[0].isupper()]
+                tokens = [re.sub(r'[^A-Za-z0-9_]+$', '', t) for t in raw_tokens]
+                target_cmp_ids = [f"cmp_{t}" for t in tokens if t]
+                m = re.search(r"render\w*\s+(\w+)", ql)
+                if m:
+                    target_cmp_ids.append(f"cmp_{m.group(1)}")
+                if target_cmp_ids:
+                    targets = target_cmp_ids
+                elif 'graphview' in ql:
+                    targets = adj.match_targets('RENDERS', lambda _, low: 'cmp_graphview' in low)
+                else:
+                    targets = adj.targets_of_type('RENDERS')
+                hits.append(('RENDERS', sorted(set(self._entity_names_for(adj.sources_of(targets, 'RENDERS'))))))
+            except Exception:
+                pass
+        # files that import module X
+        wants_imports = ('import' in ql or 'imports' in ql)
+        if wants_imports:
+            try:
+                mod_tokens = [t.strip("'\".,") for t in query.split() if '/' in t or t.startswith('@')]
+                if mod_tokens:
+                    pattern = re.compile('|'.join([t.lower() for t in mod_tokens]))
+                    targets = adj.match_targets('IMPORTS', lambda orig, _: pattern.search(orig) is not None)
+                else:
+                    targets = adj.targets_of_type('IMPORTS')
+                hits.append(('IMPORTS', self._entity_names_for(adj.sources_of(targets, 'IMPORTS'))))
+            except Exception:
+                pass
+        return hits
+
+    async def local_search_stream(self, query: str, top_k: int = 5, offset: int = 0, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None, nprobe: Optional[int] = None, chunk: int = 32) -> AsyncIterator[Dict[str, Any]]:
+        # Same content as local_search, emitted as events: citations in rank order, then
+        # entities and structural hits, then the answer.
+        qemb = await self._aembed(query)
+        previews = []
+        if self.text_col:
+            scores, idx = await run_blocking(self._stream_ranking, query, qemb, nprobe, top_k, offset, min_score, filters)
+            for start in range(0, len(idx), chunk):
+                for c in await run_blocking(self._citations, scores, idx[start:start + chunk]):
+                    previews.append(c['text_preview'])
+                    yield {'type': 'citation', **c}
+        yield {'type': 'entities', 'entities': await run_blocking(self._local_entities, query)}
+        answer = '\n'.join(previews) or 'No matching context found.'
+        extra = []
+        for rel, extra in await run_blocking(self._structural_hits, query):
+            yield {'type': 'structural', 'relation': rel, 'names': extra}
+            if extra:
+                answer = ('\n').join(extra)
+        yield {'type': 'answer', 'answer': answer, 'confidence': 0.5 if previews or extra else 0.1}
+
+    def _stream_ranking(self, query: str, qemb: Optional[List[float]], nprobe: Optional[int], top_k: int, offset: int, min_score: float, filters: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        # Filter masks run regexes over every document id, so they are built on the pool too.
+        scores = self._unit_scores(query, qemb, nprobe=nprobe)
+        return scores, self._ranked_indices(scores, top_k, offset=offset, min_score=min_score, mask=self._filter_mask(filters))
+
     async def global_search(self, query: str, conversation_history: List = None, top_k: int = 5):
+        return await run_blocking(self._global_search, query, top_k)
+
+    async def global_search_stream(self, query: str, top_k: int = 5) -> AsyncIterator[Dict[str, Any]]:
+        res = await run_blocking(self._global_search, query, top_k)
+        for r in res['communities']:
+            yield {'type': 'community', **r}
+        yield {'type': 'answer', 'answer': res['answer'], 'key_themes': res['key_themes'], 'confidence': res['confidence']}
+
+    @timed("graphrag.global_rank")
+    def _global_search(self, query: str, top_k: int):
         df = self.community_reports
         reports = []
+        answer = None
         if df is not None and not df.empty:
-            text_col = 'report' if 'report' in df.columns else self._pick_text_col(df)
-            scored = []
-            for i, row in df.iterrows():
-                txt = str(row.get(text_col, ''))
-                s = self._keyword_score(txt, query) + self._keyword_score(str(row.get('community_id','')), query)
-                if s > 0:
-                    scored.append((s, i, row))
-            scored.sort(key=lambda x: x[0], reverse=True)
-            for s, i, row in scored[:top_k]:
-                reports.append({'score': s, 'community_id': row.get('community_id'), 'report_preview': str(row.get(text_col, ''))[:280]})
+            text_col = self.report_text_col
+            ids, vals = self.report_bm25.sparse(query)
+            order = np.lexsort((ids, -vals))[:top_k]
+            for j in order:
+                row = df.iloc[int(ids[j])]
+                reports.append({'score': float(vals[j]), 'community_id': _native(row.get('community_id')), 'report_preview': str(row.get(text_col, ''))[:280]})
             if not reports:
                 try:
                     sort_col = 'components' if 'components' in df.columns else ('functions' if 'functions' in df.columns else None)
                     if sort_col:
                         top = df.sort_values(by=sort_col, ascending=False).head(top_k)
                         for _, r in top.iterrows():
-                            reports.append({'score': float(r.get(sort_col, 0)), 'community_id': r.get('community_id'), 'report_preview': str(r.get(text_col, ''))[:280]})
+                            reports.append({'score': float(r.get(sort_col, 0)), 'community_id': _native(r.get('community_id')), 'report_preview': str(r.get(text_col, ''))[:280]})
                         answer = 'Top communities by code density: ' + ', '.join([f"{r['community_id']}({int(r['score'])})" for r in reports])
                     else:
                         answer = 'No community insights found.'
@@ -441,6 +751,8 @@ class GraphRAGService:
                     answer = 'No community insights found.'
         if reports and (not answer or answer == 'No community insights found.'):
             answer = '\n'.join([r['report_preview'] for r in reports])
+        if not answer:
+            answer = 'No community insights found.'
         return {
             'answer': answer,
             'communities': reports,
@@ -448,19 +760,28 @@ class GraphRAGService:
             'confidence': 0.5 if reports else 0.1,
         }
 
-    async def drift_search(self, query: str, time_periods: List[str], top_k: int = 5, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None):
+    async def drift_search(self, query: str, time_periods: List[str], top_k: int = 5, min_score: float = 0.0, filters: Optional[Dict[str, Any]] = None, nprobe: Optional[int] = None):
+        qemb = await self._aembed(query)
+        return await run_blocking(self._drift_search, query, time_periods, top_k, min_score, filters, nprobe, qemb)
+
+    @timed("graphrag.drift")
+    def _drift_search(self, query: str, time_periods: List[str], top_k: int, min_score: float, filters: Optional[Dict[str, Any]], nprobe: Optional[int], qemb: Optional[List[float]]):
         timeline = []
-        dir_map = {
-            'Q1': r"frontend/src/components",
-            'Q2': r"frontend/src/app",
-            'Q3': r"frontend/src/lib",
-        }
+        scores = None
+        if self.text_col:
+            scores = self._unit_scores(query, qemb, nprobe=nprobe)
+        # A period's segment replaces any document_id_regex filter, as it always has.
+        base = self._filter_mask(filters) if scores is not None else None
+        seg_base = self._filter_mask({k: v for k, v in (filters or {}).items() if k != 'document_id_regex'}) if scores is not None else None
         for p in time_periods:
-            regex = dir_map.get(p, None)
-            f = dict(filters or {})
-            if regex:
-                f['document_id_regex'] = regex
-            citations = self._top_units(query, k=top_k, min_score=min_score, filters=f)
+            citations = []
+            if scores is not None:
+                seg = self.segment_masks.get(p)
+                if seg is None:
+                    mask = base
+                else:
+                    mask = seg if seg_base is None else seg & seg_base
+                citations = self._rank_units(scores, top_k, min_score=min_score, mask=mask)
             timeline.append({'period': p, 'answer_preview': '\n'.join([c['text_preview'] for c in citations])[:280], 'metrics': {'matches': len(citations)}})
         return {
             'timeline': timeline,
@@ -469,10 +790,13 @@ class GraphRAGService:
         }
 
     def get_context_data(self, entity_id: str):
-        if self.entities is None:
-            return {}
-        row = self.entities[self.entities.get('id') == entity_id] if 'id' in self.entities.columns else None
-        if row is None or row.empty:
+        pos = self.entity_index.get(entity_id) if self.entity_index is not None else None
+        if pos is None:
             return {}
-        r = row.iloc[0]
-        return {'id': r.get('id'), 'name': r.get('name'), 'type': r.get('type'), 'description': r.get('description')}
+        return self._entity_record(pos, full=True)
+
+    @timed("graphrag.entity_search")
+    def search_entities(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        if self.entity_index is None:
+            return []
+        return [self._entity_record(i) for i in self.entity_index.search(text, limit)]
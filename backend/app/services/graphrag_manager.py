@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import span
+from app.services.graphrag import GraphRAGService, latest_artifacts_dir, artifacts_version
+from app.services.query_cache import QueryCache
+
+logger = logging.getLogger(__name__)
+
+class GraphRAGManager:
+    def __init__(self, index_path: str, reload_interval: float = 5.0):
+        self.index_path = index_path
+        self.reload_interval = reload_interval
+        self._service: Optional[GraphRAGService] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.cache = QueryCache(settings.graphrag_query_cache_size, settings.graphrag_query_cache_ttl)
+
+    @property
+    def service(self) -> GraphRAGService:
+        svc = self._service
+        if svc is None:
+            self.refresh(force=True)
+            svc = self._service
+        return svc
+
+    def refresh(self, force: bool = False) -> bool:
+        with self._lock:
+            current = self._service
+            target = latest_artifacts_dir(self.index_path)
+            if not force and current is not None and artifacts_version(target) == current.version:
+                return False
+            # Build the new snapshot completely before publishing it; requests that already
+            # hold the previous service keep using it until they finish.
+            with span("graphrag.reload"):
+                fresh = GraphRAGService(self.index_path, artifacts_dir=target)
+            self._service = fresh
+            # Keys carry the artifact version, so stale entries could never be hit; drop them now.
+            self.cache.clear()
+            logger.info("GraphRAG artifacts loaded from %s", fresh.artifacts_dir)
+            return True
+
+    async def start(self):
+        await asyncio.to_thread(self.refresh, True)
+        if self.reload_interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("GraphRAG artifact reload failed")
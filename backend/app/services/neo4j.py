@@ -1,198 +1,432 @@
-from neo4j import GraphDatabase
-from typing import List, Dict, Any
+import time
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from neo4j import GraphDatabase, AsyncGraphDatabase, Driver, AsyncDriver
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 from app.core.config import settings
+from app.core.metrics import timed
+from app.services import neo4j_queries as cq
+
+logger = logging.getLogger(__name__)
+
+_sessions = {"active": 0, "total": 0}
+_sessions_lock = threading.Lock()
+
+def _driver_options() -> Dict[str, Any]:
+    return {
+        "max_connection_pool_size": settings.neo4j_max_pool_size,
+        "connection_acquisition_timeout": settings.neo4j_acquisition_timeout,
+        "max_connection_lifetime": settings.neo4j_max_connection_lifetime,
+    }
+
+def create_driver(uri: str = settings.neo4j_uri, user: str = settings.neo4j_user, password: str = settings.neo4j_password) -> Driver:
+    # Connections are opened lazily, so this succeeds even while the database is down.
+    return GraphDatabase.driver(uri, auth=(user, password), **_driver_options())
+
+def create_async_driver(uri: str = settings.neo4j_uri, user: str = settings.neo4j_user, password: str = settings.neo4j_password) -> AsyncDriver:
+    return AsyncGraphDatabase.driver(uri, auth=(user, password), **_driver_options())
+
+def pool_stats(driver: Optional[Union[Driver, AsyncDriver]]) -> Dict[str, int]:
+    out = {"max_size": settings.neo4j_max_pool_size, "open": 0, "in_use": 0}
+    # The driver exposes no pool API; read its per-address connection lists best-effort.
+    try:
+        for conns in list(driver._pool.connections.values()):
+            for c in list(conns):
+                out["open"] += 1
+                out["in_use"] += int(bool(c.in_use))
+    except Exception:
+        pass
+    with _sessions_lock:
+        out["sessions_active"] = _sessions["active"]
+        out["sessions_total"] = _sessions["total"]
+    return out
+
+def _session_opened():
+    with _sessions_lock:
+        _sessions["active"] += 1
+        _sessions["total"] += 1
+
+def _session_closed():
+    with _sessions_lock:
+        _sessions["active"] -= 1
+
+# Callbacks told about every write made through either service, so in-process caches of the
+# graph (app.services.graph_snapshot, app.services.graph_lod) can follow along: ("node",
+# {label, id, props, version}), ("edge", {source, target, type, version}) or ("bulk", {}) for
+# imports that touch too much to replay. `version` is the graph version the write produced.
+_write_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+def add_write_listener(fn: Callable[[str, Dict[str, Any]], None]):
+    _write_listeners.append(fn)
+
+def remove_write_listener(fn: Callable[[str, Dict[str, Any]], None]):
+    if fn in _write_listeners:
+        _write_listeners.remove(fn)
+
+def _notify_write(event: str, **data):
+    for fn in list(_write_listeners):
+        try:
+            fn(event, data)
+        except Exception:
+            logger.exception("Graph write listener failed")
+
+def _merged(label: str, params: Dict[str, Any], version: str):
+    _notify_write("node", label=label, id=params["id"], props=params["props"], version=version)
+
+def _path_args(max_hops: Optional[int]) -> int:
+    return min(max(1, max_hops or settings.graph_path_max_hops), settings.graph_path_max_hops)
+
+def _neighbor_args(depth: int, rel_types: Optional[List[str]], limit: Optional[int], fanout: Optional[int], cursor: Optional[str]):
+    depth = min(max(1, depth), settings.neo4j_neighbors_max_depth)
+    return depth, rel_types, limit or settings.neo4j_neighbors_limit, fanout or settings.neo4j_neighbors_fanout, cursor
+
+class _ImportProgress:
+    def __init__(self, total_nodes: int, total_edges: int, progress: Optional[Callable[[Dict[str, Any]], None]]):
+        self.totals = {"nodes": total_nodes, "edges": total_edges}
+        self.done = {"nodes": 0, "edges": 0}
+        self.created = {"nodes": 0, "edges": 0}
+        self.by_key: Dict[str, Dict[str, int]] = {"nodes": {}, "edges": {}}
+        self.batches = 0
+        self.progress = progress
+        self.t0 = time.perf_counter()
+
+    def add(self, kind: str, key: str, rows: int, summary):
+        self.batches += 1
+        self.done[kind] += rows
+        self.by_key[kind][key] = self.by_key[kind].get(key, 0) + rows
+        c = summary.counters
+        self.created[kind] += c.nodes_created if kind == "nodes" else c.relationships_created
+        elapsed = time.perf_counter() - self.t0
+        event = {"kind": kind, "key": key, "done": self.done[kind], "total": self.totals[kind], "rows_per_s": round((self.done["nodes"] + self.done["edges"]) / max(elapsed, 1e-9), 1)}
+        logger.info("import_ast %s %s: %d/%d (%.0f rows/s)", kind, key, event["done"], event["total"], event["rows_per_s"])
+        if self.progress is not None:
+            self.progress(event)
+
+    def result(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.t0
+        rows = self.done["nodes"] + self.done["edges"]
+        return {
+            "nodes": self.done["nodes"],
+            "edges": self.done["edges"],
+            "nodes_created": self.created["nodes"],
+            "edges_created": self.created["edges"],
+            "labels": self.by_key["nodes"],
+            "types": self.by_key["edges"],
+            "batches": self.batches,
+            "seconds": round(elapsed, 3),
+            "rows_per_s": round(rows / max(elapsed, 1e-9), 1),
+        }
 
 class Neo4jService:
-    def __init__(self, uri: str = settings.neo4j_uri, user: str = settings.neo4j_user, password: str = settings.neo4j_password):
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri: str = settings.neo4j_uri, user: str = settings.neo4j_user, password: str = settings.neo4j_password, driver: Optional[Driver] = None):
+        # With a shared driver the service only borrows sessions and close() leaves the pool alone.
+        self._owns_driver = driver is None
+        self._driver = driver if driver is not None else create_driver(uri, user, password)
 
     def close(self):
-        self._driver.close()
+        if self._owns_driver:
+            self._driver.close()
+
+    @contextmanager
+    def _session(self):
+        _session_opened()
+        try:
+            with self._driver.session() as session:
+                yield session
+        finally:
+            _session_closed()
 
+    @timed("neo4j.write")
     def _run_write(self, query: str, params: Dict[str, Any]):
-        with self._driver.session() as session:
+        with self._session() as session:
             return session.execute_write(lambda tx: tx.run(query, **params).consume())
 
+    @timed("neo4j.read")
     def _run_read(self, query: str, params: Dict[str, Any] = None):
-        with self._driver.session() as session:
+        with self._session() as session:
             return session.execute_read(lambda tx: list(tx.run(query, **(params or {}))))
 
+    @timed("neo4j.write")
+    def _run_versioned(self, query: str, params: Dict[str, Any]) -> Tuple[Any, str]:
+        # (summary, graph version) for writes built with cq.versioned.
+        def work(tx):
+            res = tx.run(query, **params)
+            rows = list(res)
+            return res.consume(), cq.shape_graph_version(rows)
+        with self._session() as session:
+            return session.execute_write(work)
+
+    @timed("neo4j.write")
+    def _run_auto(self, query: str, params: Dict[str, Any]):
+        # Auto-commit, for statements that manage their own transactions (CALL ... IN TRANSACTIONS).
+        with self._session() as session:
+            return session.run(query, **params).consume()
+
+    @timed("neo4j.create_company")
     def create_company(self, company_data: Dict):
-        q = (
-            "MERGE (co:Company {id:$id}) "
-            "SET co += $props "
-        )
-        params = {"id": company_data.get("company_id") or company_data.get("id"), "props": company_data}
-        return self._run_write(q, params)
+        q, params = cq.merge_entity("Company", "company_id", company_data)
+        res, version = self._run_versioned(q, params)
+        _merged("Company", params, version)
+        return res
 
+    @timed("neo4j.create_customer")
     def create_customer(self, customer_data: Dict):
-        q = (
-            "MERGE (c:Customer {id:$id}) "
-            "SET c += $props "
-        )
-        params = {"id": customer_data.get("customer_id") or customer_data.get("id"), "props": customer_data}
-        res = self._run_write(q, params)
-        cid = params["id"]
+        q, params = cq.merge_entity("Customer", "customer_id", customer_data)
+        res, version = self._run_versioned(q, params)
+        _merged("Customer", params, version)
         coid = customer_data.get("company_id")
         if coid:
-            self.link_customer_to_company(cid, coid)
+            self.link_customer_to_company(params["id"], coid)
         return res
 
+    @timed("neo4j.create_deal")
     def create_deal(self, deal_data: Dict):
-        q = (
-            "MERGE (d:Deal {id:$id}) "
-            "SET d += $props "
-        )
-        params = {"id": deal_data.get("deal_id") or deal_data.get("id"), "props": deal_data}
-        res = self._run_write(q, params)
+        q, params = cq.merge_entity("Deal", "deal_id", deal_data)
+        res, version = self._run_versioned(q, params)
+        _merged("Deal", params, version)
         cid = deal_data.get("customer_id")
         if cid:
-            self._run_write(
-                "MATCH (c:Customer {id:$cid}),(d:Deal {id:$did}) MERGE (c)-[:HAS_DEAL]->(d)",
-                {"cid": cid, "did": params["id"]},
-            )
+            _, version = self._run_versioned(*cq.link_customer_to_deal(cid, params["id"]))
+            _notify_write("edge", source=cid, target=params["id"], type="HAS_DEAL", version=version)
         return res
 
+    @timed("neo4j.create_interaction")
     def create_interaction(self, interaction_data: Dict):
-        q = (
-            "MERGE (i:Interaction {id:$id}) "
-            "SET i += $props "
-        )
-        params = {"id": interaction_data.get("interaction_id") or interaction_data.get("id"), "props": interaction_data}
-        res = self._run_write(q, params)
+        q, params = cq.merge_entity("Interaction", "interaction_id", interaction_data)
+        res, version = self._run_versioned(q, params)
+        _merged("Interaction", params, version)
         cid = interaction_data.get("customer_id")
         if cid:
-            self._run_write(
-                "MATCH (c:Customer {id:$cid}),(i:Interaction {id:$iid}) MERGE (c)-[:PARTICIPATED_IN]->(i)",
-                {"cid": cid, "iid": params["id"]},
-            )
+            _, version = self._run_versioned(*cq.link_customer_to_interaction(cid, params["id"]))
+            _notify_write("edge", source=cid, target=params["id"], type="PARTICIPATED_IN", version=version)
         return res
 
+    @timed("neo4j.link_customer_to_company")
     def link_customer_to_company(self, customer_id: str, company_id: str):
-        q = "MATCH (c:Customer {id:$cid}),(co:Company {id:$coid}) MERGE (c)-[:WORKS_AT]->(co)"
-        return self._run_write(q, {"cid": customer_id, "coid": company_id})
+        res, version = self._run_versioned(*cq.link_customer_to_company(customer_id, company_id))
+        _notify_write("edge", source=customer_id, target=company_id, type="WORKS_AT", version=version)
+        return res
 
+    @timed("neo4j.export_graph_for_graphrag")
     def export_graph_for_graphrag(self) -> Dict:
-        nodes_q = "MATCH (n) RETURN labels(n) AS labels, n.id AS id, properties(n) AS props"
-        edges_q = "MATCH (a)-[r]->(b) RETURN a.id AS source, b.id AS target, type(r) AS type"
-        nodes = self._run_read(nodes_q)
-        edges = self._run_read(edges_q)
-        return {
-            "nodes": [{"id": rec["id"], "labels": rec["labels"], "props": rec["props"]} for rec in nodes],
-            "edges": [{"source": rec["source"], "target": rec["target"], "type": rec["type"]} for rec in edges],
-        }
+        nodes_q, edges_q = cq.export_all()
+        return cq.shape_graph(self._run_read(*nodes_q), self._run_read(*edges_q))
 
+    @timed("neo4j.export_graph_for_labels")
     def export_graph_for_labels(self, labels: List[str]) -> Dict:
-        nodes_q = (
-            "MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels) "
-            "RETURN labels(n) AS labels, n.id AS id, properties(n) AS props"
-        )
-        edges_q = (
-            "MATCH (a)-[r]->(b) WHERE any(l IN labels(a) WHERE l IN $labels) AND any(m IN labels(b) WHERE m IN $labels) "
-            "RETURN a.id AS source, b.id AS target, type(r) AS type"
-        )
-        nodes = self._run_read(nodes_q, {"labels": labels})
-        edges = self._run_read(edges_q, {"labels": labels})
-        return {
-            "nodes": [{"id": rec["id"], "labels": rec["labels"], "props": rec["props"]} for rec in nodes],
-            "edges": [{"source": rec["source"], "target": rec["target"], "type": rec["type"]} for rec in edges],
-        }
+        nodes_q, edges_q = cq.export_labels(labels)
+        return cq.shape_graph(self._run_read(*nodes_q), self._run_read(*edges_q))
 
+    def export_stream(self, labels: Optional[List[str]] = None, props: Optional[List[str]] = None, page_size: Optional[int] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        # ("nodes" | "edges", page) pairs, one read per page, so memory is bounded by the page size.
+        page = max(1, page_size or settings.neo4j_export_page_size)
+        sources = cq.export_sources(labels)
+        for label, flt, skip in sources:
+            after = None
+            while True:
+                nodes, after = cq.shape_export_nodes(self._run_read(*cq.export_nodes_page(label, flt, props, after, page, skip)), props, page)
+                if nodes:
+                    yield "nodes", nodes
+                if after is None:
+                    break
+        for label, flt, skip in sources:
+            after = None
+            while True:
+                edges, after = cq.shape_export_edges(self._run_read(*cq.export_edges_page(label, flt, after, page, skip)), page)
+                if edges:
+                    yield "edges", edges
+                if after is None:
+                    break
+
+    @timed("neo4j.graph_version")
+    def graph_version(self) -> str:
+        return cq.shape_graph_version(self._run_read(*cq.graph_version()))
+
+    @timed("neo4j.shortest_path")
+    def shortest_path(self, source_id: str, target_id: str, max_hops: Optional[int] = None, rel_types: Optional[List[str]] = None, directed: bool = False) -> Optional[Dict]:
+        return cq.shape_path(self._run_read(*cq.shortest_path(source_id, target_id, _path_args(max_hops), rel_types, directed)))
+
+    @timed("neo4j.get_all_entities_as_text")
     def get_all_entities_as_text(self) -> List[str]:
-        customers = self._run_read(
-            "MATCH (c:Customer) OPTIONAL MATCH (c)-[:WORKS_AT]->(co:Company) "
-            "OPTIONAL MATCH (c)-[:HAS_DEAL]->(d:Deal) "
-            "OPTIONAL MATCH (c)-[:PARTICIPATED_IN]->(i:Interaction) "
-            "RETURN c, co, collect(d) AS deals, collect(i) AS interactions"
-        )
-        docs: List[str] = []
-        for rec in customers:
-            c = rec["c"]
-            co = rec["co"]
-            deals = [d for d in rec["deals"] if d is not None]
-            interactions = [i for i in rec["interactions"] if i is not None]
-            lines = [
-                f"Customer: {c.get('first_name','')} {c.get('last_name','')} ({c.get('email','')})",
-                f"Company: {co.get('name','') if co else ''}",
-                f"Role: {c.get('role','')}",
-                "Deals:",
-            ]
-            for d in deals:
-                lines.append(f"- Deal {d.get('id','')}: stage {d.get('stage','')} value {d.get('value','')}")
-            lines.append("Interactions:")
-            for i in interactions:
-                lines.append(f"- {i.get('type','')} on {i.get('date','')}: {i.get('summary','')}")
-            docs.append("\n".join(lines))
-        return docs
+        return cq.shape_entity_docs(self._run_read(*cq.entities_as_text()))
 
+    @timed("neo4j.list_customers")
     def list_customers(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        rows = self._run_read("MATCH (c:Customer) RETURN c SKIP $skip LIMIT $limit", {"skip": skip, "limit": limit})
-        return [dict(r["c"]) for r in rows]
-
-    def get_neighbors(self, node_id: str, depth: int = 1) -> Dict:
-        nodes_out = self._run_read(
-            "MATCH (n {id:$id})-[]->(m) RETURN m.id AS id, labels(m) AS labels, properties(m) AS props",
-            {"id": node_id},
-        )
-        nodes_in = self._run_read(
-            "MATCH (m)-[]->(n {id:$id}) RETURN m.id AS id, labels(m) AS labels, properties(m) AS props",
-            {"id": node_id},
-        )
-        edges_out = self._run_read(
-            "MATCH (n {id:$id})-[r]->(m) RETURN n.id AS source, m.id AS target, type(r) AS type",
-            {"id": node_id},
-        )
-        edges_in = self._run_read(
-            "MATCH (m)-[r]->(n {id:$id}) RETURN m.id AS source, n.id AS target, type(r) AS type",
-            {"id": node_id},
-        )
-        seen = set()
-        nodes = []
-        for rec in nodes_out + nodes_in:
-            nid = rec["id"]
-            if nid == node_id:
-                continue
-            if nid in seen:
-                continue
-            seen.add(nid)
-            nodes.append({"id": rec["id"], "labels": rec["labels"], "props": rec["props"]})
-        edges = [{"source": r["source"], "target": r["target"], "type": r["type"]} for r in edges_out + edges_in]
-        return {"nodes": nodes, "edges": edges}
-
-    def import_ast(self, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict:
-        created = 0
-        def label_for(t: str) -> str:
-            m = {
-                'File': 'CodeFile',
-                'Component': 'Component',
-                'Function': 'Function',
-                'Hook': 'Hook',
-                'Import': 'Import',
-                'Export': 'Export',
-            }
-            return m.get(t, 'Code')
-        for e in entities:
-            idv = e.get('id')
-            typ = label_for(str(e.get('type', 'Code')))
-            props = {}
-            for k, v in e.items():
-                if k in ['id', 'type']:
-                    continue
-                if isinstance(v, (str, int, float)) or v is None:
-                    props[k] = v
-                else:
-                    try:
-                        import json
-                        props[k] = json.dumps(v)
-                    except Exception:
-                        props[k] = str(v)
-            q = f"MERGE (n:{typ} {{id:$id}}) SET n += $props"
-            self._run_write(q, {"id": idv, "props": props})
-            created += 1
-        for r in relationships:
-            src = r.get('source')
-            tgt = r.get('target')
-            typ = str(r.get('type', 'RELATED_TO'))
-            q = f"MATCH (a {{id:$src}}),(b {{id:$tgt}}) MERGE (a)-[:{typ}]->(b)"
-            self._run_write(q, {"src": src, "tgt": tgt})
-        return {"nodes": created, "edges": len(relationships)}
+        return cq.shape_customers(self._run_read(*cq.list_customers(skip, limit)))
+
+    @timed("neo4j.get_neighbors")
+    def get_neighbors(self, node_id: str, depth: int = 1, rel_types: Optional[List[str]] = None, limit: Optional[int] = None, fanout: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+        q, params = cq.neighbors(node_id, *_neighbor_args(depth, rel_types, limit, fanout, cursor))
+        return cq.shape_neighbors(node_id, self._run_read(q, params))
+
+    @timed("neo4j.import_ast")
+    def import_ast(self, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]], batch_size: Optional[int] = None, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict:
+        self._run_write(*cq.code_node_index())
+        self._run_read(*cq.await_indexes())
+        self._run_auto(*cq.code_node_backfill())
+        stats = _ImportProgress(len(entities), len(relationships), progress)
+        for kind, key, q, rows in cq.ast_import_plan(entities, relationships, batch_size or settings.neo4j_import_batch_size):
+            stats.add(kind, key, len(rows), self._run_write(q, {"rows": rows}))
+        self._run_write(*cq.bump_graph_version())
+        _notify_write("bulk")
+        return stats.result()
+
+class AsyncNeo4jService:
+    # Same methods and signatures as Neo4jService, as coroutines on the async driver, so
+    # concurrent requests overlap their database round trips instead of blocking the event loop.
+    def __init__(self, uri: str = settings.neo4j_uri, user: str = settings.neo4j_user, password: str = settings.neo4j_password, driver: Optional[AsyncDriver] = None):
+        self._owns_driver = driver is None
+        self._driver = driver if driver is not None else create_async_driver(uri, user, password)
+
+    async def close(self):
+        if self._owns_driver:
+            await self._driver.close()
+
+    @asynccontextmanager
+    async def _session(self):
+        _session_opened()
+        try:
+            async with self._driver.session() as session:
+                yield session
+        finally:
+            _session_closed()
+
+    @timed("neo4j.write")
+    async def _run_write(self, query: str, params: Dict[str, Any]):
+        async def work(tx):
+            res = await tx.run(query, **params)
+            return await res.consume()
+        async with self._session() as session:
+            return await session.execute_write(work)
+
+    @timed("neo4j.read")
+    async def _run_read(self, query: str, params: Dict[str, Any] = None):
+        async def work(tx):
+            res = await tx.run(query, **(params or {}))
+            return [rec async for rec in res]
+        async with self._session() as session:
+            return await session.execute_read(work)
+
+    @timed("neo4j.write")
+    async def _run_versioned(self, query: str, params: Dict[str, Any]) -> Tuple[Any, str]:
+        async def work(tx):
+            res = await tx.run(query, **params)
+            rows = [rec async for rec in res]
+            return await res.consume(), cq.shape_graph_version(rows)
+        async with self._session() as session:
+            return await session.execute_write(work)
+
+    @timed("neo4j.write")
+    async def _run_auto(self, query: str, params: Dict[str, Any]):
+        async with self._session() as session:
+            res = await session.run(query, **params)
+            return await res.consume()
+
+    @timed("neo4j.create_company")
+    async def create_company(self, company_data: Dict):
+        q, params = cq.merge_entity("Company", "company_id", company_data)
+        res, version = await self._run_versioned(q, params)
+        _merged("Company", params, version)
+        return res
+
+    @timed("neo4j.create_customer")
+    async def create_customer(self, customer_data: Dict):
+        q, params = cq.merge_entity("Customer", "customer_id", customer_data)
+        res, version = await self._run_versioned(q, params)
+        _merged("Customer", params, version)
+        coid = customer_data.get("company_id")
+        if coid:
+            await self.link_customer_to_company(params["id"], coid)
+        return res
+
+    @timed("neo4j.create_deal")
+    async def create_deal(self, deal_data: Dict):
+        q, params = cq.merge_entity("Deal", "deal_id", deal_data)
+        res, version = await self._run_versioned(q, params)
+        _merged("Deal", params, version)
+        cid = deal_data.get("customer_id")
+        if cid:
+            _, version = await self._run_versioned(*cq.link_customer_to_deal(cid, params["id"]))
+            _notify_write("edge", source=cid, target=params["id"], type="HAS_DEAL", version=version)
+        return res
+
+    @timed("neo4j.create_interaction")
+    async def create_interaction(self, interaction_data: Dict):
+        q, params = cq.merge_entity("Interaction", "interaction_id", interaction_data)
+        res, version = await self._run_versioned(q, params)
+        _merged("Interaction", params, version)
+        cid = interaction_data.get("customer_id")
+        if cid:
+            _, version = await self._run_versioned(*cq.link_customer_to_interaction(cid, params["id"]))
+            _notify_write("edge", source=cid, target=params["id"], type="PARTICIPATED_IN", version=version)
+        return res
+
+    @timed("neo4j.link_customer_to_company")
+    async def link_customer_to_company(self, customer_id: str, company_id: str):
+        res, version = await self._run_versioned(*cq.link_customer_to_company(customer_id, company_id))
+        _notify_write("edge", source=customer_id, target=company_id, type="WORKS_AT", version=version)
+        return res
+
+    @timed("neo4j.export_graph_for_graphrag")
+    async def export_graph_for_graphrag(self) -> Dict:
+        nodes_q, edges_q = cq.export_all()
+        return cq.shape_graph(await self._run_read(*nodes_q), await self._run_read(*edges_q))
+
+    @timed("neo4j.export_graph_for_labels")
+    async def export_graph_for_labels(self, labels: List[str]) -> Dict:
+        nodes_q, edges_q = cq.export_labels(labels)
+        return cq.shape_graph(await self._run_read(*nodes_q), await self._run_read(*edges_q))
+
+    async def export_stream(self, labels: Optional[List[str]] = None, props: Optional[List[str]] = None, page_size: Optional[int] = None) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        page = max(1, page_size or settings.neo4j_export_page_size)
+        sources = cq.export_sources(labels)
+        for label, flt, skip in sources:
+            after = None
+            while True:
+                nodes, after = cq.shape_export_nodes(await self._run_read(*cq.export_nodes_page(label, flt, props, after, page, skip)), props, page)
+                if nodes:
+                    yield "nodes", nodes
+                if after is None:
+                    break
+        for label, flt, skip in sources:
+            after = None
+            while True:
+                edges, after = cq.shape_export_edges(await self._run_read(*cq.export_edges_page(label, flt, after, page, skip)), page)
+                if edges:
+                    yield "edges", edges
+                if after is None:
+                    break
+
+    @timed("neo4j.graph_version")
+    async def graph_version(self) -> str:
+        return cq.shape_graph_version(await self._run_read(*cq.graph_version()))
+
+    @timed("neo4j.shortest_path")
+    async def shortest_path(self, source_id: str, target_id: str, max_hops: Optional[int] = None, rel_types: Optional[List[str]] = None, directed: bool = False) -> Optional[Dict]:
+        return cq.shape_path(await self._run_read(*cq.shortest_path(source_id, target_id, _path_args(max_hops), rel_types, directed)))
+
+    @timed("neo4j.get_all_entities_as_text")
+    async def get_all_entities_as_text(self) -> List[str]:
+        return cq.shape_entity_docs(await self._run_read(*cq.entities_as_text()))
+
+    @timed("neo4j.list_customers")
+    async def list_customers(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        return cq.shape_customers(await self._run_read(*cq.list_customers(skip, limit)))
+
+    @timed("neo4j.get_neighbors")
+    async def get_neighbors(self, node_id: str, depth: int = 1, rel_types: Optional[List[str]] = None, limit: Optional[int] = None, fanout: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+        q, params = cq.neighbors(node_id, *_neighbor_args(depth, rel_types, limit, fanout, cursor))
+        return cq.shape_neighbors(node_id, await self._run_read(q, params))
+
+    @timed("neo4j.import_ast")
+    async def import_ast(self, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]], batch_size: Optional[int] = None, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict:
+        await self._run_write(*cq.code_node_index())
+        await self._run_read(*cq.await_indexes())
+        await self._run_auto(*cq.code_node_backfill())
+        stats = _ImportProgress(len(entities), len(relationships), progress)
+        for kind, key, q, rows in cq.ast_import_plan(entities, relationships, batch_size or settings.neo4j_import_batch_size):
+            stats.add(kind, key, len(rows), await self._run_write(q, {"rows": rows}))
+        await self._run_write(*cq.bump_graph_version())
+        _notify_write("bulk")
+        return stats.result()
@@ -0,0 +1,383 @@
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.db.neo4j_schema import CODE_NODE_LABEL, GRAPH_META_LABEL, ID_LABELS, AWAIT_INDEXES, code_node_backfill_statement, code_node_index_statement
+
+# Cypher and result shaping shared by Neo4jService and AsyncNeo4jService, so the sync and
+# async paths only differ in how they talk to the driver.
+
+Query = Tuple[str, Dict[str, Any]]
+
+AST_LABELS = {
+    'File': 'CodeFile',
+    'Component': 'Component',
+    'Function': 'Function',
+    'Hook': 'Hook',
+    'Import': 'Import',
+    'Export': 'Export',
+}
+
+def match_by_id(var: str = "n", param: str = "id") -> str:
+    # `MATCH (n {id:$id})` scans every node; a UNION over the id-indexed labels is one index
+    # seek per label instead.
+    branches = " UNION ".join(f"MATCH ({var}:{label} {{id:${param}}}) RETURN {var}" for label in ID_LABELS)
+    return f"CALL {{ {branches} }} "
+
+def versioned(q: str) -> str:
+    # CRM writes bump the GraphMeta counter in the same transaction and return the resulting
+    # graph version (see graph_version), so property-only updates still change the version and
+    # in-process caches can tell their own writes apart. The counter node serialises them.
+    return (
+        q.rstrip() + " WITH count(*) AS written "
+        f"MERGE (m:{GRAPH_META_LABEL} {{id:'graph'}}) SET m.version = coalesce(m.version, 0) + 1 "
+        "WITH m "
+        "CALL { MATCH (n) RETURN count(n) AS nodes } "
+        "CALL { MATCH ()-[r]->() RETURN count(r) AS rels } "
+        "RETURN nodes, rels, m.version AS version"
+    )
+
+def merge_entity(label: str, id_key: str, data: Dict) -> Query:
+    q = (
+        f"MERGE (x:{label} {{id:$id}}) "
+        "SET x += $props "
+    )
+    return versioned(q), {"id": data.get(id_key) or data.get("id"), "props": data}
+
+def link_customer_to_company(customer_id: str, company_id: str) -> Query:
+    return versioned("MATCH (c:Customer {id:$cid}),(co:Company {id:$coid}) MERGE (c)-[:WORKS_AT]->(co)"), {"cid": customer_id, "coid": company_id}
+
+def link_customer_to_deal(customer_id: str, deal_id: str) -> Query:
+    return versioned("MATCH (c:Customer {id:$cid}),(d:Deal {id:$did}) MERGE (c)-[:HAS_DEAL]->(d)"), {"cid": customer_id, "did": deal_id}
+
+def link_customer_to_interaction(customer_id: str, interaction_id: str) -> Query:
+    return versioned("MATCH (c:Customer {id:$cid}),(i:Interaction {id:$iid}) MERGE (c)-[:PARTICIPATED_IN]->(i)"), {"cid": customer_id, "iid": interaction_id}
+
+def export_all() -> Tuple[Query, Query]:
+    nodes_q = f"MATCH (n) WHERE NOT n:{GRAPH_META_LABEL} RETURN labels(n) AS labels, n.id AS id, properties(n) AS props"
+    edges_q = "MATCH (a)-[r]->(b) RETURN a.id AS source, b.id AS target, type(r) AS type"
+    return (nodes_q, {}), (edges_q, {})
+
+def export_labels(labels: List[str]) -> Tuple[Query, Query]:
+    nodes_q = (
+        "MATCH (n) WHERE any(l IN labels(n) WHERE l IN $labels) "
+        "RETURN labels(n) AS labels, n.id AS id, properties(n) AS props"
+    )
+    edges_q = (
+        "MATCH (a)-[r]->(b) WHERE any(l IN labels(a) WHERE l IN $labels) AND any(m IN labels(b) WHERE m IN $labels) "
+        "RETURN a.id AS source, b.id AS target, type(r) AS type"
+    )
+    return (nodes_q, {"labels": labels}), (edges_q, {"labels": labels})
+
+def shape_graph(nodes, edges) -> Dict:
+    return {
+        "nodes": [{"id": rec["id"], "labels": rec["labels"], "props": rec["props"]} for rec in nodes],
+        "edges": [{"source": rec["source"], "target": rec["target"], "type": rec["type"]} for rec in edges],
+    }
+
+# Export cursor: (id, elementId) of the last node of a page. Ids are not guaranteed unique, so
+# elementId breaks ties and a page boundary between equal ids skips nothing.
+Cursor = Tuple[str, str]
+
+def export_sources(labels: Optional[List[str]]) -> List[Tuple[Optional[str], Optional[List[str]], List[str]]]:
+    # (label to page through, label filter, labels already exported). Paging walks an id index in
+    # order, so a labelled export scans CodeNode and filters; the full export walks every
+    # id-indexed label in turn and skips nodes an earlier label already produced, then picks up
+    # the rest of the graph (label None) so it returns what export_all does.
+    if labels:
+        return [(CODE_NODE_LABEL, list(labels), [])]
+    return [(label, None, ID_LABELS[:i]) for i, label in enumerate(ID_LABELS)] + [(None, None, list(ID_LABELS))]
+
+def _id_range(var: str, after: Optional[Cursor]) -> str:
+    # Kept as a range predicate on the id (no `$after IS NULL OR ...`) so the planner seeks and
+    # orders by the index; the elementId tiebreak only filters within one id.
+    if after is None:
+        return f"{var}.id IS NOT NULL"
+    return f"{var}.id >= $after AND ({var}.id > $after OR elementId({var}) > $after_eid)"
+
+def _source_filter(var: str, labels: Optional[List[str]], skip: List[str]) -> str:
+    out = f" AND any(l IN labels({var}) WHERE l IN $labels)" if labels else ""
+    if skip:
+        out += f" AND NOT any(l IN labels({var}) WHERE l IN $skip)"
+    return out
+
+def _page_scan(var: str, label: Optional[str], labels: Optional[List[str]], after: Optional[Cursor], skip: List[str]) -> Tuple[str, str]:
+    # (MATCH ... WHERE clause, ORDER BY keys) for one export source.
+    if label is None:
+        # Nodes without an id-indexed label or without an id. No index orders them, so every page
+        # is a node scan keyed on elementId; this pass is meant for the small remainder of a graph.
+        where = f"NOT {var}:{GRAPH_META_LABEL} AND ({var}.id IS NULL OR NOT any(l IN labels({var}) WHERE l IN $skip))"
+        if after is not None:
+            where += f" AND elementId({var}) > $after_eid"
+        return f"MATCH ({var}) WHERE {where}", f"elementId({var})"
+    where = _id_range(var, after) + _source_filter(var, labels, skip)
+    return f"MATCH ({var}:{quote_name(label)}) WHERE {where}", f"{var}.id, elementId({var})"
+
+def _cursor_params(after: Optional[Cursor]) -> Dict[str, Any]:
+    return {"after": after[0] if after else None, "after_eid": after[1] if after else None}
+
+def _projection(var: str, props: Optional[List[str]]) -> str:
+    return f"properties({var}) AS props" if props is None else f"[k IN $props | {var}[k]] AS vals"
+
+def export_nodes_page(label: Optional[str], labels: Optional[List[str]], props: Optional[List[str]], after: Optional[Cursor], page: int, skip: Optional[List[str]] = None) -> Query:
+    scan, order = _page_scan("n", label, labels, after, skip or [])
+    q = (
+        f"{scan} "
+        f"RETURN n.id AS id, elementId(n) AS eid, labels(n) AS labels, {_projection('n', props)} "
+        f"ORDER BY {order} LIMIT $page"
+    )
+    return q, {**_cursor_params(after), "labels": labels, "skip": skip or [], "props": props, "page": page}
+
+def export_edges_page(label: Optional[str], labels: Optional[List[str]], after: Optional[Cursor], page: int, skip: Optional[List[str]] = None) -> Query:
+    # Edges have no index of their own, so they are paged by source node: all outgoing edges of
+    # the next `page` sources. `last` is the cursor even when those sources have no edges.
+    scan, order = _page_scan("a", label, labels, after, skip or [])
+    target = " WHERE any(l IN labels(b) WHERE l IN $labels)" if labels else ""
+    q = (
+        f"{scan} "
+        f"WITH a ORDER BY {order} LIMIT $page "
+        "WITH collect(a) AS batch "
+        "UNWIND batch AS a "
+        f"OPTIONAL MATCH (a)-[r]->(b){target} "
+        "RETURN a.id AS source, b.id AS target, type(r) AS type, batch[-1].id AS last, elementId(batch[-1]) AS last_eid, size(batch) AS sources"
+    )
+    return q, {**_cursor_params(after), "labels": labels, "skip": skip or [], "page": page}
+
+def shape_export_nodes(rows, props: Optional[List[str]], page: int) -> Tuple[List[Dict], Optional[Cursor]]:
+    nodes = []
+    last = None
+    for rec in rows:
+        if props is None:
+            p = rec["props"]
+        else:
+            p = {k: v for k, v in zip(props, rec["vals"]) if v is not None}
+        nodes.append({"id": rec["id"], "labels": rec["labels"], "props": p})
+        last = (rec["id"], rec["eid"])
+    after = last if len(nodes) >= page else None
+    return nodes, after
+
+def shape_export_edges(rows, page: int) -> Tuple[List[Dict], Optional[Cursor]]:
+    rows = list(rows)
+    if not rows:
+        return [], None
+    edges = [{"source": r["source"], "target": r["target"], "type": r["type"]} for r in rows if r["type"] is not None]
+    after = (rows[0]["last"], rows[0]["last_eid"]) if rows[0]["sources"] >= page else None
+    return edges, after
+
+def graph_version() -> Query:
+    # Node/relationship totals come from the count store, so this is O(1) at any graph size; the
+    # meta counter catches writes that only change properties or rewrite existing nodes and edges.
+    return (
+        "CALL { MATCH (n) RETURN count(n) AS nodes } "
+        "CALL { MATCH ()-[r]->() RETURN count(r) AS rels } "
+        f"OPTIONAL MATCH (m:{GRAPH_META_LABEL} {{id:'graph'}}) "
+        "RETURN nodes, rels, coalesce(m.version, 0) AS version"
+    ), {}
+
+def bump_graph_version() -> Query:
+    return f"MERGE (m:{GRAPH_META_LABEL} {{id:'graph'}}) SET m.version = coalesce(m.version, 0) + 1", {}
+
+def shape_graph_version(rows) -> str:
+    rows = list(rows)
+    if not rows:
+        return "0:0:0"
+    r = rows[0]
+    return f"{r['nodes']}:{r['rels']}:{r['version']}"
+
+def entities_as_text() -> Query:
+    return (
+        "MATCH (c:Customer) OPTIONAL MATCH (c)-[:WORKS_AT]->(co:Company) "
+        "OPTIONAL MATCH (c)-[:HAS_DEAL]->(d:Deal) "
+        "OPTIONAL MATCH (c)-[:PARTICIPATED_IN]->(i:Interaction) "
+        "RETURN c, co, collect(d) AS deals, collect(i) AS interactions"
+    ), {}
+
+def shape_entity_docs(customers) -> List[str]:
+    docs: List[str] = []
+    for rec in customers:
+        c = rec["c"]
+        co = rec["co"]
+        deals = [d for d in rec["deals"] if d is not None]
+        interactions = [i for i in rec["interactions"] if i is not None]
+        lines = [
+            f"Customer: {c.get('first_name','')} {c.get('last_name','')} ({c.get('email','')})",
+            f"Company: {co.get('name','') if co else ''}",
+            f"Role: {c.get('role','')}",
+            "Deals:",
+        ]
+        for d in deals:
+            lines.append(f"- Deal {d.get('id','')}: stage {d.get('stage','')} value {d.get('value','')}")
+        lines.append("Interactions:")
+        for i in interactions:
+            lines.append(f"- {i.get('type','')} on {i.get('date','')}: {i.get('summary','')}")
+        docs.append("\n".join(lines))
+    return docs
+
+def list_customers(skip: int, limit: int) -> Query:
+    return "MATCH (c:Customer) RETURN c SKIP $skip LIMIT $limit", {"skip": skip, "limit": limit}
+
+def shape_customers(rows) -> List[Dict[str, Any]]:
+    return [dict(r["c"]) for r in rows]
+
+def neighbors(node_id: str, depth: int = 1, rel_types: Optional[List[str]] = None, limit: int = 100, fanout: int = 25, cursor: Optional[str] = None) -> Query:
+    # One round trip for the whole k-hop neighbourhood. The root's own edges are keyset-paginated
+    # (ordered by neighbour id, type, direction; `cursor` is the last key of the previous page) so
+    # hubs come back a page at a time; every later hop expands at most `fanout` edges per node.
+    where = "($types IS NULL OR type(r) IN $types)"
+    q = match_by_id() + (
+        "CALL { WITH n "
+        f"MATCH (n)-[r]-(m) WHERE {where} "
+        "WITH r, m, coalesce(m.id, elementId(m)) + '|' + type(r) + '|' + CASE WHEN startNode(r) = n THEN 'out' ELSE 'in' END AS key "
+        "WHERE $after IS NULL OR key > $after "
+        "RETURN r, m, key ORDER BY key LIMIT $page } "
+        "WITH n, collect({r:r, m:m, key:key}) AS rows "
+        "WITH n, rows[..$limit] AS hop, size(rows) > $limit AS more "
+        "WITH n, CASE WHEN more THEN hop[-1].key END AS next_key, [x IN hop | x.r] AS rels, [x IN hop | x.m] AS nodes, [x IN hop | x.m] AS frontier "
+    )
+    for _ in range(max(1, depth) - 1):
+        q += (
+            "CALL { WITH frontier UNWIND frontier AS f "
+            f"CALL {{ WITH f MATCH (f)-[r]-(m) WHERE {where} RETURN r, m LIMIT $fanout }} "
+            "RETURN collect(DISTINCT r) AS hr, collect(DISTINCT m) AS hm } "
+            "WITH n, next_key, rels + hr AS rels, nodes + hm AS nodes, hm AS frontier "
+        )
+    q += (
+        "RETURN n.id AS root, next_key, "
+        "[m IN nodes | {id: m.id, labels: labels(m), props: properties(m)}] AS nodes, "
+        "[r IN rels | {rid: elementId(r), source: startNode(r).id, target: endNode(r).id, type: type(r)}] AS edges"
+    )
+    params = {
+        "id": node_id,
+        "types": list(rel_types) if rel_types else None,
+        "limit": max(1, limit),
+        "page": max(1, limit) + 1,
+        "fanout": max(1, fanout),
+        "after": cursor or None,
+    }
+    return q, params
+
+def shape_neighbors(node_id: str, rows) -> Dict:
+    rows = list(rows)
+    if not rows:
+        return {"nodes": [], "edges": [], "next_cursor": None}
+    rec = rows[0]
+    seen = {node_id}
+    nodes = []
+    for m in rec["nodes"]:
+        if m["id"] in seen:
+            continue
+        seen.add(m["id"])
+        nodes.append(m)
+    rids = set()
+    edges = []
+    for e in rec["edges"]:
+        if e["rid"] in rids:
+            continue
+        rids.add(e["rid"])
+        edges.append({"source": e["source"], "target": e["target"], "type": e["type"]})
+    return {"nodes": nodes, "edges": edges, "next_cursor": rec["next_key"]}
+
+def shortest_path(source_id: str, target_id: str, max_hops: int, rel_types: Optional[List[str]] = None, directed: bool = False) -> Query:
+    # Variable-length bounds and relationship types cannot be parameters, so both are inlined.
+    types = ":" + "|".join(quote_name(t) for t in rel_types) if rel_types else ""
+    q = match_by_id("a", "source") + match_by_id("b", "target") + (
+        f"MATCH p = shortestPath((a)-[{types}*0..{int(max_hops)}]-{'>' if directed else ''}(b)) "
+        "RETURN [x IN nodes(p) | {id: x.id, labels: labels(x), props: properties(x)}] AS nodes, "
+        "[e IN relationships(p) | {source: startNode(e).id, target: endNode(e).id, type: type(e)}] AS edges"
+    )
+    return q, {"source": source_id, "target": target_id}
+
+def shape_path(rows) -> Optional[Dict]:
+    rows = list(rows)
+    if not rows:
+        return None
+    rec = rows[0]
+    return {"path": [n["id"] for n in rec["nodes"]], "nodes": rec["nodes"], "edges": rec["edges"], "length": len(rec["edges"])}
+
+def ast_label(t: str) -> str:
+    return AST_LABELS.get(t, 'Code')
+
+def _plain(v: Any) -> Any:
+    # Rows from pandas (numpy or Arrow-backed) hand over numpy scalars and NA markers; Neo4j
+    # should see Python numbers and nulls, not their string forms.
+    if isinstance(v, np.generic):
+        v = v.item()
+    elif isinstance(v, np.ndarray):
+        return v.tolist()
+    if v is not None and pd.api.types.is_scalar(v) and pd.isna(v):
+        return None
+    return v
+
+def ast_props(e: Dict[str, Any]) -> Dict[str, Any]:
+    props = {}
+    for k, v in e.items():
+        if k in ['id', 'type']:
+            continue
+        v = _plain(v)
+        if isinstance(v, (str, int, float)) or v is None:
+            props[k] = v
+        else:
+            try:
+                props[k] = json.dumps(v, default=_plain)
+            except Exception:
+                props[k] = str(v)
+    return props
+
+def quote_name(name: str) -> str:
+    # Labels and relationship types cannot be parameters; backtick-quote them instead.
+    return "`" + name.replace("`", "``") + "`"
+
+def code_node_index() -> Query:
+    # Normally created at startup (app.db.neo4j_schema); repeated so scripts can import on their own.
+    return code_node_index_statement(), {}
+
+def await_indexes() -> Query:
+    return AWAIT_INDEXES, {}
+
+def code_node_backfill() -> Query:
+    # Also run by every import: code nodes that predate the shared label would otherwise be
+    # duplicated by the CodeNode MERGE below, e.g. when startup skipped or has not finished the
+    # migration. Uses IN TRANSACTIONS, so it must run in an auto-commit transaction.
+    return code_node_backfill_statement(), {}
+
+def import_ast_nodes(label: str) -> str:
+    return (
+        "UNWIND $rows AS row "
+        f"MERGE (n:{CODE_NODE_LABEL} {{id:row.id}}) "
+        f"SET n:{quote_name(label)}, n += row.props"
+    )
+
+def import_ast_edges(rel_type: str) -> str:
+    return (
+        "UNWIND $rows AS row "
+        f"MATCH (a:{CODE_NODE_LABEL} {{id:row.src}}) "
+        f"MATCH (b:{CODE_NODE_LABEL} {{id:row.tgt}}) "
+        f"MERGE (a)-[:{quote_name(rel_type)}]->(b)"
+    )
+
+def group_ast(entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Dict]], Dict[str, List[Dict]]]:
+    nodes: Dict[str, List[Dict]] = defaultdict(list)
+    for e in entities:
+        if e.get('id') is None:
+            continue
+        nodes[ast_label(str(e.get('type', 'Code')))].append({"id": e.get('id'), "props": ast_props(e)})
+    edges: Dict[str, List[Dict]] = defaultdict(list)
+    for r in relationships:
+        if r.get('source') is None or r.get('target') is None:
+            continue
+        edges[str(r.get('type') or 'RELATED_TO')].append({"src": r.get('source'), "tgt": r.get('target')})
+    return dict(nodes), dict(edges)
+
+def ast_import_plan(entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]], batch_size: int) -> Iterator[Tuple[str, str, str, List[Dict]]]:
+    # (kind, label or type, query, rows) per UNWIND batch; all nodes first so edges find both ends.
+    nodes, edges = group_ast(entities, relationships)
+    size = max(1, batch_size)
+    for label, rows in nodes.items():
+        q = import_ast_nodes(label)
+        for i in range(0, len(rows), size):
+            yield "nodes", label, q, rows[i:i + size]
+    for rel_type, rows in edges.items():
+        q = import_ast_edges(rel_type)
+        for i in range(0, len(rows), size):
+            yield "edges", rel_type, q, rows[i:i + size]
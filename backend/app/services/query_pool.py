@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+class QueueFull(Exception):
+    pass
+
+class EndpointLimiter:
+    # At most `concurrency` requests run at once and at most `queue_depth` wait behind them;
+    # anything beyond that is rejected immediately instead of growing the tail latency.
+    def __init__(self, name: str, concurrency: int, queue_depth: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_depth = max(0, queue_depth)
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._sem.locked() and self.waiting >= self.queue_depth:
+            self.rejected += 1
+            raise QueueFull(self.name)
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._sem.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"concurrency": self.concurrency, "queue_depth": self.queue_depth, "running": self.running, "waiting": self.waiting, "rejected": self.rejected}
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_limiters: Dict[str, EndpointLimiter] = {}
+
+def get_query_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(1, settings.graphrag_query_workers), thread_name_prefix="graphrag-query")
+    return _pool
+
+def shutdown_query_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    _limiters.clear()
+
+async def run_blocking(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    # Like asyncio.to_thread, carry the caller's context so request-scoped spans reach the worker.
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_query_pool(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+def get_limiter(name: str) -> EndpointLimiter:
+    lim = _limiters.get(name)
+    if lim is None:
+        conc = settings.graphrag_query_concurrency
+        depth = settings.graphrag_query_queue_depth
+        lim = _limiters.setdefault(name, EndpointLimiter(
+            name,
+            int(conc.get(name, conc.get("default", 8))),
+            int(depth.get(name, depth.get("default", 64))),
+        ))
+    return lim
+
+def limiter_stats() -> Dict[str, Dict[str, int]]:
+    return {name: lim.stats() for name, lim in _limiters.items()}
@@ -0,0 +1,56 @@
+import os
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.ann import ANN_INDEX_FILE, IVFFlatIndex, write_ann_index
+from app.services.graphrag import GraphRAGService
+
+def _clustered(n=4000, dim=32, centers=40, seed=1):
+    rng = np.random.default_rng(seed)
+    c = rng.normal(size=(centers, dim))
+    x = c[rng.integers(0, centers, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+def test_ivf_recall_against_exact_search():
+    mat = _clustered()
+    idx = IVFFlatIndex.build(mat)
+    rng = np.random.default_rng(2)
+    hits = 0
+    queries = mat[rng.choice(len(mat), size=50, replace=False)]
+    for q in queries:
+        exact = set(np.argsort(-(mat @ q))[:10].tolist())
+        cand = idx.search(q, 8)
+        approx = set(cand[np.argsort(-(mat[cand] @ q))[:10]].tolist())
+        hits += len(exact & approx)
+    assert hits / (10 * len(queries)) >= 0.9
+
+def test_ivf_search_with_every_list_probed_is_exhaustive():
+    mat = _clustered(n=500)
+    idx = IVFFlatIndex.build(mat)
+    assert sorted(idx.search(mat[0], idx.nlist).tolist()) == list(range(500))
+
+def _write_units(artifacts, mat):
+    df = pd.DataFrame({"text": [f"unit {i}" for i in range(len(mat))], "embedding": list(mat)})
+    df.to_parquet(os.path.join(artifacts, "create_final_text_units.parquet"), index=False)
+
+def test_stale_or_missing_index_falls_back_to_exact_scoring(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "graphrag_ann_min_units", 10)
+    artifacts = str(tmp_path)
+    mat = _clustered(n=400)
+    _write_units(artifacts, mat)
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).build_ann_index()["built"]
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).ann_index is not None
+
+    # Text units rewritten after the index was built: the index must not be trusted.
+    _write_units(artifacts, mat[::-1].copy())
+    later = os.stat(os.path.join(artifacts, ANN_INDEX_FILE, "meta.json")).st_mtime + 10
+    os.utime(os.path.join(artifacts, "create_final_text_units.parquet"), (later, later))
+    svc = GraphRAGService(artifacts, artifacts_dir=artifacts)
+    assert svc.ann_index is None
+    q = mat[7]
+    np.testing.assert_allclose(svc._unit_scores("unit", q.tolist(), nprobe=4), svc.unit_bm25.scores("unit") + svc.embedding_matrix @ q, rtol=1e-5)
+
+    # Too few embedded units to index: a leftover index is removed rather than left to go stale.
+    assert write_ann_index(artifacts, mat[:5], np.ones(5, dtype=bool), min_units=10) is None
+    assert not os.path.exists(os.path.join(artifacts, ANN_INDEX_FILE))
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).ann_index is None
@@ -0,0 +1,91 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.ann import IVFFlatIndex
+from app.services.embeddings import EmbeddingClient
+from app.services.graphrag import GraphRAGService
+
+WORDS = ["graph", "view", "api", "node", "edge", "render", "hook", "client"]
+
+def _service(n=300, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    texts = [" ".join(rng.choice(WORDS, size=5)) for _ in range(n)]
+    df = pd.DataFrame({
+        "text": texts,
+        "document_id": [f"frontend/src/{'lib' if i % 3 else 'app'}/f{i}.ts" for i in range(n)],
+        "embedding": list(rng.normal(size=(n, dim)).astype(np.float32)),
+    })
+    return GraphRAGService.from_frames(text_units=df)
+
+def _requests(dim=8, seed=1):
+    rng = np.random.default_rng(seed)
+    reqs = [
+        {"query": "graph view", "top_k": 5, "offset": 0, "min_score": 0.0, "filters": None, "nprobe": 0},
+        {"query": "api client", "top_k": 3, "offset": 2, "min_score": 0.0, "filters": {"document_id_contains": "lib"}, "nprobe": None},
+        {"query": "render hook", "top_k": 10, "offset": 0, "min_score": 0.8, "filters": {"document_id_regex": "app/f1"}, "nprobe": 2},
+        {"query": "edge", "top_k": 4, "offset": 0, "min_score": 0.0, "filters": None, "nprobe": 0},
+        {"query": "nothing matches", "top_k": 4, "offset": 0, "min_score": 0.0, "filters": None, "nprobe": 0},
+    ]
+    qembs = [rng.normal(size=dim).tolist() for _ in reqs]
+    qembs[3] = []
+    return reqs, qembs
+
+def _single(svc, reqs, qembs):
+    return [svc._local_search(r["query"], r["top_k"], r["offset"], r["min_score"], r["filters"], r["nprobe"], q) for r, q in zip(reqs, qembs)]
+
+def _assert_same(batch, single):
+    # A matrix-matrix product may round differently from a matrix-vector one in the last bit,
+    # so ranks must match exactly and scores to float32 precision.
+    assert len(batch) == len(single)
+    for b, s in zip(batch, single):
+        assert [c["row_index"] for c in b["sources"]] == [c["row_index"] for c in s["sources"]]
+        np.testing.assert_allclose([c["score"] for c in b["sources"]], [c["score"] for c in s["sources"]], rtol=1e-6)
+        assert {k: v for k, v in b.items() if k != "sources"} == {k: v for k, v in s.items() if k != "sources"}
+
+def test_batch_ranking_matches_single_queries_on_the_exact_path():
+    svc = _service()
+    reqs, qembs = _requests()
+    _assert_same(svc._batch_local_search(reqs, qembs, block=2), _single(svc, reqs, qembs))
+
+def test_batch_ranking_matches_single_queries_through_the_ann_index():
+    svc = _service()
+    svc.ann_index = IVFFlatIndex.build(svc.embedding_matrix, svc.embedding_mask, nlist=8)
+    reqs, qembs = _requests()
+    batch = svc._batch_local_search(reqs, qembs)
+    _assert_same(batch, _single(svc, reqs, qembs))
+    assert any(r["sources"] for r in batch)
+
+class _BatchEmbedder(EmbeddingClient):
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.batches = []
+        self.fail_on = fail_on
+
+    def provider(self):
+        return ("fake", "m")
+
+    async def _arequest_batch(self, provider, model, texts):
+        self.batches.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("batch rejected")
+        return [[float(len(t)), 1.0] for t in texts]
+
+def test_query_embeddings_are_deduplicated_and_chunked_to_the_provider_limit(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_batch_size", 2)
+    client = _BatchEmbedder()
+    texts = ["a", "bb", "A", "ccc", "dddd", "bb ", "eeeee"]
+    out = asyncio.run(client.aembed_many(texts))
+    assert out == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [3.0, 1.0], [4.0, 1.0], [2.0, 1.0], [5.0, 1.0]]
+    assert all(len(b) <= 2 for b in client.batches)
+    assert sorted(t for b in client.batches for t in b) == ["a", "bb", "ccc", "dddd", "eeeee"]
+    client.batches.clear()
+    assert asyncio.run(client.aembed_many(["BB", "eeeee"])) == [[2.0, 1.0], [5.0, 1.0]]
+    assert client.batches == []
+
+def test_a_failed_chunk_only_blanks_its_own_queries(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "embedding_batch_size", 2)
+    client = _BatchEmbedder(fail_on="ccc")
+    out = asyncio.run(client.aembed_many(["a", "bb", "ccc", "dddd"]))
+    assert out == [[1.0, 1.0], [2.0, 1.0], None, None]
+    assert "batch of 2 texts failed" in caplog.text
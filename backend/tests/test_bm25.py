@@ -0,0 +1,98 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+from app.services import graphrag as graphrag_module
+from app.services.bm25 import BM25Index, BM25_INDEX_FILE, tokenize
+from app.services.embeddings import EmbeddingClient
+from app.services.graphrag import GraphRAGService
+
+DOCS = ["the graph view renders nodes", "graph api calls the graph", "", "nodes and edges of the graph view"]
+
+def _reference(query, docs, k1=1.2, b=0.75):
+    toks = [tokenize(d) for d in docs]
+    avgdl = sum(len(t) for t in toks) / len(toks)
+    out = []
+    for t in toks:
+        s = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in toks)
+            tf = t.count(term)
+            if not df or not tf:
+                continue
+            idf = math.log(1.0 + (len(toks) - df + 0.5) / (df + 0.5))
+            s += idf * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * len(t) / avgdl))
+        out.append(s)
+    return np.asarray(out)
+
+def test_scores_match_the_okapi_formula():
+    idx = BM25Index.build(DOCS)
+    for q in ["graph view", "nodes", "missing", "Graph, API!"]:
+        np.testing.assert_allclose(idx.scores(q, normalize=False), _reference(q, DOCS), rtol=1e-5)
+
+def test_normalised_scores_peak_at_one_and_sparse_agrees_with_dense():
+    idx = BM25Index.build(DOCS)
+    dense = idx.scores("graph view")
+    assert dense.max() == 1.0
+    ids, vals = idx.sparse("graph view")
+    raw = idx.scores("graph view", normalize=False)
+    np.testing.assert_allclose(vals, raw[ids], rtol=1e-6)
+    assert set(ids.tolist()) == set(np.flatnonzero(raw).tolist())
+    assert not idx.scores("missing").any()
+
+def test_save_and_load_round_trip(tmp_path):
+    idx = BM25Index.build(DOCS)
+    idx.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    np.testing.assert_array_equal(loaded.scores("graph nodes"), idx.scores("graph nodes"))
+
+def _write_units(artifacts, texts, embeddings=None):
+    df = pd.DataFrame({"text": texts})
+    if embeddings is not None:
+        df["embedding"] = embeddings
+    path = os.path.join(artifacts, "create_final_text_units.parquet")
+    df.to_parquet(path, index=False)
+    return path
+
+def _touch_after(path, ref):
+    t = os.stat(ref).st_mtime + 10
+    os.utime(path, (t, t))
+
+def test_persisted_index_is_reused_only_while_fresh(tmp_path, monkeypatch):
+    artifacts = str(tmp_path)
+    _write_units(artifacts, DOCS)
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).save_keyword_index()
+    builds = []
+    real_build = BM25Index.build
+    monkeypatch.setattr(BM25Index, "build", classmethod(lambda cls, texts, **kw: builds.append(1) or real_build(texts, **kw)))
+    svc = GraphRAGService(artifacts, artifacts_dir=artifacts)
+    assert builds == []
+    np.testing.assert_array_equal(svc.unit_bm25.scores("graph"), real_build(DOCS).scores("graph"))
+
+    # Same row count, different text: the saved postings must not be used.
+    path = _write_units(artifacts, ["alpha", "beta", "gamma", "delta"])
+    _touch_after(path, os.path.join(artifacts, BM25_INDEX_FILE, "meta.json"))
+    svc = GraphRAGService(artifacts, artifacts_dir=artifacts)
+    assert builds == [1]
+    assert svc.unit_bm25.scores("alpha")[0] == 1.0
+    assert not svc.unit_bm25.scores("graph").any()
+
+class _FakeEmbedder(EmbeddingClient):
+    def provider(self):
+        return ("fake", "m")
+
+    def embed_batch(self, texts, provider=None):
+        return [[float(len(t)), 1.0] for t in texts]
+
+def test_embedding_enrichment_leaves_the_keyword_index_fresh(tmp_path, monkeypatch):
+    artifacts = str(tmp_path)
+    _write_units(artifacts, DOCS)
+    svc = GraphRAGService(artifacts, artifacts_dir=artifacts)
+    svc.save_keyword_index()
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: _FakeEmbedder())
+    res = svc.enrich_text_unit_embeddings(batch_size=2, concurrency=1)
+    assert res["updated"] == len(DOCS) and res["saved"]
+    rebuilt = []
+    monkeypatch.setattr(BM25Index, "build", classmethod(lambda cls, texts, **kw: rebuilt.append(1)))
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).unit_bm25 is not None
+    assert rebuilt == []
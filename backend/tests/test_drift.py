@@ -0,0 +1,66 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from app.services import graphrag as graphrag_module
+from app.services.embeddings import EmbeddingClient
+from app.services.graphrag import GraphRAGService
+
+DOCS = [
+    "frontend/src/components/GraphView.tsx",
+    "frontend/src/components/Sidebar.tsx",
+    "frontend/src/app/page.tsx",
+    "frontend/src/lib/api.ts",
+    "frontend/src/lib/graph.ts",
+    "backend/app/main.py",
+]
+
+def _service():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "text": [f"graph view component {d}" if i % 2 else f"graph api client {d}" for i, d in enumerate(DOCS)],
+        "document_id": DOCS,
+        "embedding": list(rng.normal(size=(len(DOCS), 4)).astype(np.float32)),
+    })
+    return GraphRAGService.from_frames(text_units=df)
+
+def _old_drift(svc, query, periods, top_k, min_score, filters, qemb):
+    # The per-period loop single-pass drift replaced: one full scoring pass per period, with the
+    # period's directory regex written over any document_id_regex filter.
+    dir_map = {"Q1": r"frontend/src/components", "Q2": r"frontend/src/app", "Q3": r"frontend/src/lib"}
+    out = []
+    for p in periods:
+        f = dict(filters or {})
+        if dir_map.get(p):
+            f["document_id_regex"] = dir_map[p]
+        out.append(svc._top_units(query, k=top_k, min_score=min_score, filters=f, qemb=qemb))
+    return out
+
+def test_segment_masks_match_the_per_period_regex_filters():
+    svc = _service()
+    qemb = [0.5, -1.0, 0.25, 2.0]
+    periods = ["Q1", "Q2", "Q3", "Q4"]
+    for filters in [None, {"document_id_contains": "graph"}, {"document_id_regex": "lib"}, {"document_id_regex": "app", "document_id_contains": "frontend"}, {"document_id": DOCS[3]}]:
+        res = svc._drift_search("graph view", periods, 3, 0.0, filters, 0, qemb)
+        expected = _old_drift(svc, "graph view", periods, 3, 0.0, filters, qemb)
+        for entry, citations in zip(res["timeline"], expected):
+            assert entry["metrics"]["matches"] == len(citations)
+            assert entry["answer_preview"] == "\n".join(c["text_preview"] for c in citations)[:280]
+
+class _CountingEmbedder(EmbeddingClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def provider(self):
+        return ("fake", "m")
+
+    async def _arequest(self, provider, model, text):
+        self.calls += 1
+        return [1.0, 0.0, 0.0, 0.0]
+
+def test_drift_embeds_the_query_once_for_all_periods(monkeypatch):
+    embedder = _CountingEmbedder()
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: embedder)
+    res = asyncio.run(_service().drift_search("graph view", ["Q1", "Q2", "Q3", "Q4"], top_k=2))
+    assert [t["period"] for t in res["timeline"]] == ["Q1", "Q2", "Q3", "Q4"]
+    assert embedder.calls == 1
@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.services import graphrag as graphrag_module
+from app.services.embeddings import EmbeddingClient
+from app.services.graphrag import EMBEDDING_CHECKPOINT_DIR, GraphRAGService
+
+TEXTS = ["graph view", "graph api", "", "nodes and edges"]
+
+class _FakeEmbedder(EmbeddingClient):
+    def __init__(self, skip=()):
+        super().__init__()
+        self.skip = set(skip)
+        self.batches = []
+
+    def provider(self):
+        return ("fake", "m")
+
+    def embed_batch(self, texts, provider=None):
+        self.batches.append(list(texts))
+        return [None if t in self.skip else [float(len(t)) + 1.0, 1.0] for t in texts]
+
+def _artifacts(tmp_path):
+    artifacts = str(tmp_path)
+    pd.DataFrame({"text": TEXTS, "document_id": ["a", "b", "c", "d"]}).to_parquet(os.path.join(artifacts, "create_final_text_units.parquet"), index=False)
+    return artifacts
+
+def test_enrichment_writes_a_large_list_column_and_keeps_failed_rows_missing(tmp_path, monkeypatch):
+    artifacts = _artifacts(tmp_path)
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: _FakeEmbedder(skip={"graph api"}))
+    res = GraphRAGService(artifacts, artifacts_dir=artifacts).enrich_text_unit_embeddings(batch_size=2, concurrency=1)
+    assert (res["updated"], res["failed"], res["saved"]) == (3, 1, True)
+    col = pq.read_table(os.path.join(artifacts, "create_final_text_units.parquet")).column("embedding")
+    assert col.type == pa.large_list(pa.float32())
+    assert col.to_pylist()[1] is None
+    svc = GraphRAGService(artifacts, artifacts_dir=artifacts)
+    assert svc.embedding_mask.tolist() == [True, False, True, True]
+    np.testing.assert_allclose(np.linalg.norm(svc.embedding_matrix[svc.embedding_mask], axis=1), 1.0, rtol=1e-6)
+
+def test_rerun_without_new_embeddings_rewrites_nothing(tmp_path, monkeypatch):
+    artifacts = _artifacts(tmp_path)
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: _FakeEmbedder())
+    GraphRAGService(artifacts, artifacts_dir=artifacts).enrich_text_unit_embeddings()
+    before = {n: os.stat(os.path.join(artifacts, n)).st_mtime_ns for n in os.listdir(artifacts)}
+    embedder = _FakeEmbedder()
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: embedder)
+    res = GraphRAGService(artifacts, artifacts_dir=artifacts).enrich_text_unit_embeddings()
+    assert (res["updated"], res["skipped"], res["saved"]) == (0, len(TEXTS), False)
+    assert embedder.batches == []
+    assert {n: os.stat(os.path.join(artifacts, n)).st_mtime_ns for n in os.listdir(artifacts)} == before
+
+def test_checkpointed_vectors_are_restored_and_saved(tmp_path, monkeypatch):
+    artifacts = _artifacts(tmp_path)
+    ckpt = os.path.join(artifacts, EMBEDDING_CHECKPOINT_DIR)
+    os.makedirs(ckpt)
+    np.savez(os.path.join(ckpt, "part-000000.npz"), rows=np.array([0, 3]), vectors=np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+    embedder = _FakeEmbedder(skip=set(TEXTS))
+    monkeypatch.setattr(graphrag_module, "get_embedder", lambda: embedder)
+    res = GraphRAGService(artifacts, artifacts_dir=artifacts).enrich_text_unit_embeddings()
+    assert (res["updated"], res["restored"], res["failed"], res["saved"]) == (0, 2, 2, True)
+    assert [t for b in embedder.batches for t in b] == ["graph api", ""]
+    assert not os.path.exists(ckpt)
+    assert GraphRAGService(artifacts, artifacts_dir=artifacts).embedding_mask.tolist() == [True, False, False, True]
@@ -0,0 +1,53 @@
+import asyncio
+from app.services.embeddings import EmbeddingCache, EmbeddingClient
+
+class _CountingClient(EmbeddingClient):
+    def __init__(self, cache=None, fail=False):
+        super().__init__(cache)
+        self.calls = []
+        self.fail = fail
+
+    def provider(self):
+        return ("fake", "m")
+
+    def _vector(self, text):
+        if self.fail:
+            raise RuntimeError("provider down")
+        self.calls.append(text)
+        return [float(len(text)), 1.0]
+
+    def _request(self, provider, model, text):
+        return self._vector(text)
+
+    async def _arequest(self, provider, model, text):
+        return self._vector(text)
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+    cache.put(("p", "m", "a"), [1.0])
+    cache.put(("p", "m", "b"), [2.0])
+    assert cache.get(("p", "m", "a")) is not None
+    cache.put(("p", "m", "c"), [3.0])
+    assert cache.get(("p", "m", "b")) is None
+    assert cache.get(("p", "m", "a")).tolist() == [1.0]
+    assert len(cache) == 2
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "emb" / "cache.sqlite")
+    EmbeddingCache(path=path).put(("p", "m", "graph"), [0.5, 0.25])
+    assert EmbeddingCache(path=path).get(("p", "m", "graph")).tolist() == [0.5, 0.25]
+
+def test_embed_calls_the_provider_once_per_normalised_text():
+    client = _CountingClient()
+    first = client.embed("Graph  View")
+    assert client.embed("graph view\n") == first
+    assert asyncio.run(client.aembed(" GRAPH VIEW ")) == first
+    assert client.calls == ["Graph  View"]
+
+def test_failed_requests_are_not_cached():
+    client = _CountingClient(fail=True)
+    assert client.embed("graph") is None
+    assert asyncio.run(client.aembed("graph")) is None
+    client.fail = False
+    assert client.embed("graph") == [5.0, 1.0]
+    assert client.calls == ["graph"]
@@ -0,0 +1,67 @@
+import re
+from app.db.neo4j_schema import GRAPH_META_LABEL
+from app.services.neo4j import Neo4jService
+
+# (elementId, id, labels). Ids repeat across page boundaries, some nodes carry several id-indexed
+# labels, and a few have none (or no id) and only come out of the final pass.
+STORE = [(f"4:x:{i:03d}", f"id{i // 3:02d}", ["CodeNode", "Function"] + (["Customer"] if i % 5 == 0 else [])) for i in range(40)]
+STORE += [
+    ("4:x:900", "c1", ["Customer"]),
+    ("4:x:901", "c1", ["Company"]),
+    ("4:x:902", "t1", ["Tag"]),
+    ("4:x:903", None, ["Note"]),
+    ("4:x:904", None, ["CodeNode", "Function"]),
+    ("4:x:905", "graph", [GRAPH_META_LABEL]),
+]
+RELS = [("4:x:000", "4:x:003", "CALLS"), ("4:x:005", "4:x:900", "WORKS_AT"), ("4:x:001", "4:x:002", "CALLS"), ("4:x:902", "4:x:000", "TAGS"), ("4:x:903", "4:x:902", "MENTIONS")]
+BY_EID = {e: i for e, i, _ in STORE}
+
+def _select(q, p):
+    label = re.match(r"MATCH \((?:n|a)(?::`(\w+)`)?\)", q).group(1)
+    rows = []
+    if label is None:
+        for eid, i, labs in sorted(STORE):
+            if GRAPH_META_LABEL in labs or (i is not None and set(labs) & set(p["skip"])):
+                continue
+            if p["after_eid"] is not None and eid <= p["after_eid"]:
+                continue
+            rows.append((eid, i, labs))
+    else:
+        for eid, i, labs in sorted((r for r in STORE if r[1] is not None), key=lambda r: (r[1], r[0])):
+            if label not in labs or (p["labels"] and not set(labs) & set(p["labels"])) or set(labs) & set(p["skip"]):
+                continue
+            if p["after"] is not None and not (i > p["after"] or (i == p["after"] and eid > p["after_eid"])):
+                continue
+            rows.append((eid, i, labs))
+    return rows[:p["page"]]
+
+def _fake_read(q, p):
+    rows = _select(q, p)
+    if "AS eid" in q:
+        return [{"id": i, "eid": e, "labels": l, "props": {}} for e, i, l in rows]
+    out = []
+    for e, i, _ in rows:
+        for s, t, ty in [r for r in RELS if r[0] == e] or [(e, None, None)]:
+            out.append({"source": i, "target": BY_EID[t] if t else None, "type": ty, "last": rows[-1][1], "last_eid": rows[-1][0], "sources": len(rows)})
+    return out
+
+def _export(labels, page):
+    svc = Neo4jService(driver=object())
+    svc._run_read = _fake_read
+    nodes, edges = [], []
+    for kind, items in svc.export_stream(labels, page_size=page):
+        (nodes if kind == "nodes" else edges).extend(items)
+    return nodes, edges
+
+def test_full_export_streams_every_node_once_at_any_page_size():
+    expected = sorted((i or "", tuple(l)) for _, i, l in STORE if GRAPH_META_LABEL not in l)
+    for page in (1, 2, 3, 4, 7, 100):
+        nodes, edges = _export(None, page)
+        assert sorted((n["id"] or "", tuple(n["labels"])) for n in nodes) == expected, page
+        assert sorted((e["source"] or "", e["target"], e["type"]) for e in edges) == sorted((BY_EID[s] or "", BY_EID[t], ty) for s, t, ty in RELS), page
+
+def test_labelled_export_pages_over_duplicate_ids():
+    for page in (1, 2, 5):
+        nodes, edges = _export(["Function"], page)
+        assert len(nodes) == 40
+        assert [n["id"] for n in nodes] == sorted(n["id"] for n in nodes)
@@ -0,0 +1,60 @@
+import asyncio
+from app.services.graph_lod import GraphLOD, GraphLODCache
+
+def test_duplicate_ids_keep_first_node():
+    nodes = [
+        {"id": "src/a.ts", "labels": ["CodeFile", "CodeNode"], "props": {"name": "a", "file_path": "src/a.ts"}},
+        {"id": "fn_a", "labels": ["Function", "CodeNode"], "props": {"name": "a", "file_path": "src/a.ts"}},
+        {"id": "fn_a", "labels": ["Customer"], "props": {"name": "dup"}},
+        {"id": "lib/b.ts", "labels": ["CodeFile", "CodeNode"], "props": {"name": "b", "file_path": "lib/b.ts"}},
+    ]
+    edges = [
+        {"source": "src/a.ts", "target": "fn_a", "type": "CONTAINS"},
+        {"source": "fn_a", "target": "lib/b.ts", "type": "IMPORTS"},
+    ]
+    lod = GraphLOD.from_records("v1", nodes, edges)
+    assert lod.ids == ["src/a.ts", "fn_a", "lib/b.ts"]
+    assert lod.labels[1] == "Function"
+    view = lod.view("directory")
+    assert {n["id"] for n in view["nodes"]} == {"dir:src", "dir:lib"}
+    assert view["edges"] == [{"source": "dir:src", "target": "dir:lib", "type": "IMPORTS", "weight": 1}]
+    members = lod.members("directory", "dir:src")
+    assert [n["id"] for n in members["nodes"]] == ["src/a.ts", "fn_a"]
+
+class _FakeNeo:
+    def __init__(self):
+        self.version = "2:1:0"
+        self.version_reads = 0
+        self.exports = 0
+
+    async def graph_version(self):
+        self.version_reads += 1
+        return self.version
+
+    async def export_stream(self, labels, props=None):
+        self.exports += 1
+        yield "nodes", [{"id": "src/a.ts", "labels": ["CodeFile"], "props": {"file_path": "src/a.ts"}}, {"id": "lib/b.ts", "labels": ["CodeFile"], "props": {"file_path": "lib/b.ts"}}]
+        yield "edges", [{"source": "src/a.ts", "target": "lib/b.ts", "type": "IMPORTS"}]
+
+def test_cache_checks_the_version_at_most_once_per_interval_and_after_writes():
+    async def scenario():
+        cache = GraphLODCache(check_interval=60)
+        neo = _FakeNeo()
+        first = await cache.get(neo, "code", None)
+        assert await cache.get(neo, "code", None) is first
+        assert (neo.version_reads, neo.exports) == (1, 1)
+
+        # A property-only write elsewhere bumps the meta counter; a local write triggers a recheck.
+        neo.version = "2:1:1"
+        assert await cache.get(neo, "code", None) is first
+        cache.on_write("node", {"label": "Company", "id": "co1", "props": {}, "version": "2:1:1"})
+        second = await cache.get(neo, "code", None)
+        assert second is not first and second.version == "2:1:1"
+        assert (neo.version_reads, neo.exports) == (2, 2)
+
+        unthrottled = GraphLODCache()
+        await unthrottled.get(neo, "code", None)
+        await unthrottled.get(neo, "code", None)
+        assert neo.version_reads == 4
+
+    asyncio.run(scenario())
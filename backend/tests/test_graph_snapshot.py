@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+import numpy as np
+import pytest
+from app.services import graph_snapshot as graph_snapshot_module
+from app.services.graph_snapshot import GraphSnapshot, GraphSnapshotManager
+
+TYPES = ["CALLS", "RENDERS", "IMPORTS"]
+
+def _random_graph(n=60, m=150, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = [{"id": f"n{i}", "labels": ["Function"], "props": {}} for i in range(n)]
+    edges = [{"source": f"n{a}", "target": f"n{b}", "type": TYPES[t]} for a, b, t in zip(rng.integers(0, n, m), rng.integers(0, n, m), rng.integers(0, 3, m))]
+    return nodes, edges
+
+def _reference_hops(edges, s, t, directed, rel_types, max_hops):
+    adj = {}
+    for e in edges:
+        if rel_types and e["type"] not in rel_types:
+            continue
+        adj.setdefault(e["source"], []).append(e["target"])
+        if not directed:
+            adj.setdefault(e["target"], []).append(e["source"])
+    dist = {s: 0}
+    queue = deque([s])
+    while queue:
+        v = queue.popleft()
+        for w in adj.get(v, []):
+            if w not in dist:
+                dist[w] = dist[v] + 1
+                queue.append(w)
+    d = dist.get(t)
+    return d if d is not None and d <= max_hops else None
+
+@pytest.mark.parametrize("directed,rel_types,max_hops", [(False, None, 10), (True, None, 10), (False, ["CALLS"], 10), (True, ["CALLS", "RENDERS"], 10), (False, None, 2)])
+def test_bidirectional_bfs_finds_shortest_paths(directed, rel_types, max_hops):
+    nodes, edges = _random_graph()
+    snap = GraphSnapshot.from_records("v", nodes, edges)
+    present = {(e["source"], e["target"], e["type"]) for e in edges}
+    for s, t in [(f"n{i}", f"n{j}") for i in range(0, 60, 7) for j in range(3, 60, 11)]:
+        res = snap.shortest_path(s, t, max_hops=max_hops, rel_types=rel_types, directed=directed)
+        expected = _reference_hops(edges, s, t, directed, rel_types, max_hops)
+        if expected is None:
+            assert res is None
+            continue
+        assert res["length"] == expected and res["path"][0] == s and res["path"][-1] == t
+        for a, b, e in zip(res["path"], res["path"][1:], res["edges"]):
+            assert (e["source"], e["target"]) in ({(a, b)} if directed else {(a, b), (b, a)})
+            assert (e["source"], e["target"], e["type"]) in present
+            assert rel_types is None or e["type"] in rel_types
+
+def test_shortest_path_edge_cases():
+    snap = GraphSnapshot.from_records("v", [{"id": i, "labels": [], "props": {}} for i in "abc"], [{"source": "a", "target": "b", "type": "CALLS"}])
+    assert snap.shortest_path("a", "a")["length"] == 0
+    assert snap.shortest_path("a", "c") is None
+    assert snap.shortest_path("a", "missing") is None
+    assert snap.shortest_path("b", "a", directed=True) is None
+    assert snap.shortest_path("b", "a")["path"] == ["b", "a"]
+
+def _hub(n=7):
+    nodes = [{"id": "hub", "labels": ["Component"], "props": {}}] + [{"id": f"x{i}", "labels": ["Function"], "props": {}} for i in range(n)]
+    edges = [{"source": "hub", "target": f"x{i}", "type": "CALLS"} for i in range(n)]
+    edges += [{"source": "x2", "target": "hub", "type": "RENDERS"}, {"source": "x0", "target": "x1", "type": "CALLS"}]
+    return GraphSnapshot.from_records("v", nodes, edges)
+
+def test_neighbour_pages_follow_the_cursor_to_the_end():
+    snap = _hub()
+    full = snap.neighbors("hub", limit=100)
+    assert full["next_cursor"] is None and len(full["edges"]) == 8
+    edges, cursor, pages = [], None, 0
+    while True:
+        page = snap.neighbors("hub", limit=3, cursor=cursor)
+        edges += page["edges"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert edges == full["edges"]
+    assert snap.neighbors("hub", limit=3)["next_cursor"] == "x2|CALLS|out"
+    assert snap.neighbors("hub", limit=3, cursor="x2|CALLS|out")["edges"][0] == {"source": "x2", "target": "hub", "type": "RENDERS"}
+    assert snap.neighbors("hub", rel_types=["RENDERS"])["nodes"] == [snap.node(snap.index["x2"])]
+    assert snap.neighbors("missing") == {"nodes": [], "edges": [], "next_cursor": None}
+
+def test_second_hop_is_capped_by_fanout():
+    snap = _hub()
+    res = snap.neighbors("hub", depth=2, limit=1, fanout=1)
+    assert [n["id"] for n in res["nodes"]] == ["x0", "x1"]
+    assert res["edges"] == [{"source": "hub", "target": "x0", "type": "CALLS"}, {"source": "x0", "target": "x1", "type": "CALLS"}]
+
+def test_overlay_writes_are_visible_to_neighbours_and_paths():
+    snap = _hub(2)
+    snap.add_node("y", ["Contact"], {"name": "Y"})
+    snap.add_edge("x1", "y", "OWNS")
+    snap.add_edge("x1", "y", "OWNS")
+    snap.add_edge("x1", "nowhere", "OWNS")
+    snap.add_node("y", ["Lead"], {"stage": "new"})
+    assert snap.edge_count == 4
+    assert snap.node(snap.index["y"])["labels"] == ["Contact", "Lead"]
+    assert snap.neighbors("y")["edges"] == [{"source": "x1", "target": "y", "type": "OWNS"}]
+    assert snap.shortest_path("hub", "y", directed=True)["path"] == ["hub", "x1", "y"]
+    assert snap.shortest_path("y", "hub", rel_types=["OWNS"]) is None
+
+class _FakeNeo:
+    def __init__(self, version, nodes, edges):
+        self.version = version
+        self.nodes = nodes
+        self.edges = edges
+        self.exports = 0
+        self.gate = None
+
+    def __call__(self, driver=None):
+        return self
+
+    async def graph_version(self):
+        return self.version
+
+    async def export_stream(self, labels):
+        self.exports += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        yield "nodes", list(self.nodes)
+        yield "edges", list(self.edges)
+
+def _manager(monkeypatch, version="2:1:4"):
+    neo = _FakeNeo(version, [{"id": "a", "labels": ["Contact"], "props": {}}, {"id": "b", "labels": ["Account"], "props": {}}], [{"source": "a", "target": "b", "type": "WORKS_AT"}])
+    monkeypatch.setattr(graph_snapshot_module, "AsyncNeo4jService", neo)
+    return GraphSnapshotManager(driver=object(), source="neo4j", check_interval=0), neo
+
+def test_overlay_writes_advance_the_version_so_no_reload_follows(monkeypatch):
+    mgr, neo = _manager(monkeypatch)
+    asyncio.run(mgr.refresh())
+    assert neo.exports == 1
+    neo.version = "3:1:5"
+    mgr.on_write("node", {"label": "Lead", "id": "c", "props": {}, "version": "3:1:5"})
+    neo.version = "3:2:6"
+    mgr.on_write("edge", {"source": "c", "target": "b", "type": "WORKS_AT", "version": "3:2:6"})
+    assert mgr.get().version == "3:2:6"
+    asyncio.run(mgr.refresh())
+    assert neo.exports == 1
+    assert mgr.get().shortest_path("a", "c")["length"] == 2
+
+def test_a_write_from_elsewhere_in_between_still_reloads(monkeypatch):
+    mgr, neo = _manager(monkeypatch)
+    asyncio.run(mgr.refresh())
+    mgr.on_write("node", {"label": "Lead", "id": "c", "props": {}, "version": "3:1:6"})
+    mgr.on_write("node", {"label": "Lead", "id": "d", "props": {}})
+    assert mgr.get().version == "2:1:4"
+    neo.version = "3:1:6"
+    asyncio.run(mgr.refresh())
+    assert neo.exports == 2
+    assert mgr.get().version == "3:1:6"
+
+def test_writes_during_a_rebuild_are_replayed_onto_the_new_snapshot(monkeypatch):
+    mgr, neo = _manager(monkeypatch)
+    asyncio.run(mgr.refresh())
+    old = mgr.get()
+
+    async def scenario():
+        neo.gate = asyncio.Event()
+        neo.version = "2:1:7"
+        task = asyncio.create_task(mgr.refresh())
+        while neo.exports < 2:
+            await asyncio.sleep(0)
+        # The export has started from version 7; this write lands after it and must survive.
+        mgr.on_write("node", {"label": "Lead", "id": "c", "props": {"stage": "new"}, "version": "3:1:8"})
+        mgr.on_write("edge", {"source": "c", "target": "a", "type": "REFERRED", "version": "3:2:9"})
+        neo.version = "3:2:9"
+        neo.gate.set()
+        await task
+
+    asyncio.run(scenario())
+    snap = mgr.get()
+    assert snap is not old
+    assert snap.version == "3:2:9"
+    assert snap.node(snap.index["c"])["props"] == {"stage": "new"}
+    assert snap.neighbors("a", rel_types=["REFERRED"])["nodes"][0]["id"] == "c"
+    assert mgr._pending is None
+    asyncio.run(mgr.refresh())
+    assert neo.exports == 2
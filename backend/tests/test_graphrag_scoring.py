@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from app.services.graphrag import GraphRAGService
+
+def _service(embeddings):
+    texts = ["alpha beta", "beta gamma", "gamma delta", "delta alpha", "epsilon"][:len(embeddings)]
+    df = pd.DataFrame({"text": texts, "document_id": [f"doc{i}" for i in range(len(texts))], "embedding": embeddings})
+    return GraphRAGService.from_frames(text_units=df)
+
+def test_embedding_matrix_normalises_rows_and_masks_unusable_ones():
+    svc = _service([[3.0, 4.0], None, "[0, 2]", [1.0, 2.0, 3.0], [0.0, 0.0]])
+    assert svc.embedding_mask.tolist() == [True, False, True, False, False]
+    np.testing.assert_allclose(svc.embedding_matrix[0], [0.6, 0.8], rtol=1e-6)
+    np.testing.assert_allclose(svc.embedding_matrix[2], [0.0, 1.0], rtol=1e-6)
+    assert not svc.embedding_matrix[[1, 3, 4]].any()
+
+def test_unit_scores_add_cosine_similarity_to_normalised_bm25():
+    vecs = [[1.0, 0.0], [0.0, 2.0], [1.0, 1.0], [-1.0, 0.5]]
+    svc = _service(vecs)
+    q = [2.0, 1.0]
+    got = svc._unit_scores("beta", q, nprobe=0)
+    bm25 = svc.unit_bm25.scores("beta")
+    qn = np.asarray(q) / np.linalg.norm(q)
+    cos = [float(np.dot(v, qn) / np.linalg.norm(v)) for v in vecs]
+    np.testing.assert_allclose(got, bm25 + np.asarray(cos), rtol=1e-5)
+    assert bm25.max() == 1.0
+
+def test_unit_scores_ignore_query_vectors_of_the_wrong_dimension():
+    svc = _service([[1.0, 0.0], [0.0, 1.0]])
+    np.testing.assert_array_equal(svc._unit_scores("alpha", [1.0, 0.0, 0.0]), svc.unit_bm25.scores("alpha"))
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import graphrag as graphrag_api
+from app.api.deps import get_graphrag_service
+from app.core.config import settings
+from app.services.graphrag import GraphRAGService
+from app.services.query_pool import get_limiter, shutdown_query_pool
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "graphrag_query_concurrency", {"local": 1})
+    monkeypatch.setattr(settings, "graphrag_query_queue_depth", {"local": 0})
+    shutdown_query_pool()
+    df = pd.DataFrame({"text": ["graph view renders nodes", "graph api client", "unrelated"], "document_id": ["a", "b", "c"]})
+    svc = GraphRAGService.from_frames(text_units=df)
+    app = FastAPI()
+    app.include_router(graphrag_api.router, prefix="/api/graphrag")
+    app.dependency_overrides[get_graphrag_service] = lambda: svc
+    with TestClient(app) as c:
+        yield c
+    shutdown_query_pool()
+
+def test_stream_emits_citations_then_the_answer_and_frees_the_slot(client):
+    r = client.post("/api/graphrag/query/local/stream", json={"query": "graph"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert [e["type"] for e in events] == ["citation", "citation", "entities", "answer"]
+    assert sorted(e["document_id"] for e in events[:2]) == ["a", "b"]
+    assert get_limiter("local").stats()["running"] == 0
+    # With one slot and no queue, a second request would be rejected if the first still held it.
+    assert client.post("/api/graphrag/query/local/stream", json={"query": "graph"}, headers={"accept": "text/event-stream"}).text.startswith("event: citation\n")
+
+def test_stream_is_rejected_with_503_while_the_slot_is_taken(client):
+    lim = get_limiter("local")
+    asyncio.run(lim._sem.acquire())
+    try:
+        r = client.post("/api/graphrag/query/local/stream", json={"query": "graph"})
+    finally:
+        lim._sem.release()
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert lim.stats()["rejected"] == 1
+
+class _Request:
+    headers = {}
+
+def _run_response(events, receive, send):
+    async def scenario():
+        res = await graphrag_api._stream(_Request(), "local", events)
+        assert get_limiter("local").stats()["running"] == 1
+        await res({"type": "http"}, receive, send)
+    asyncio.run(scenario())
+
+def test_slot_is_released_when_the_response_never_starts(monkeypatch):
+    monkeypatch.setattr(settings, "graphrag_query_concurrency", {"local": 1})
+    shutdown_query_pool()
+    started = []
+
+    async def events():
+        started.append(1)
+        yield {"type": "answer"}
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        raise ConnectionResetError("client went away")
+
+    with pytest.raises(ConnectionResetError):
+        _run_response(events(), receive, send)
+    assert started == []
+    assert get_limiter("local").stats()["running"] == 0
+    shutdown_query_pool()
+
+def test_slot_is_released_when_the_client_disconnects_mid_stream(monkeypatch):
+    monkeypatch.setattr(settings, "graphrag_query_concurrency", {"local": 1})
+    shutdown_query_pool()
+    sent = []
+
+    async def events():
+        yield {"type": "citation"}
+        await asyncio.sleep(3600)
+        yield {"type": "answer"}
+
+    async def receive():
+        while not any(m.get("body") for m in sent):
+            await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    _run_response(events(), receive, send)
+    assert sent[1]["body"] == b'{"type": "citation"}\n'
+    assert get_limiter("local").stats()["running"] == 0
+    shutdown_query_pool()
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from app.services import neo4j_queries as cq
+
+def test_ast_props_keep_nulls_null_and_numbers_numeric():
+    row = {
+        "id": "fn_a", "type": "Function",
+        "line": np.int64(12), "score": np.float32(1.0), "exported": np.bool_(True),
+        "doc": pd.NA, "missing": np.nan, "when": pd.NaT, "name": "a",
+        "params": np.array(["x", "y"]), "meta": {"async": True},
+    }
+    props = cq.ast_props(row)
+    assert props == {
+        "line": 12, "score": 1.0, "exported": True,
+        "doc": None, "missing": None, "when": None, "name": "a",
+        "params": '["x", "y"]', "meta": '{"async": true}',
+    }
+    assert type(props["line"]) is int and type(props["score"]) is float
+
+def test_ast_props_from_arrow_backed_rows():
+    df = pd.DataFrame({"id": ["a", "b"], "type": ["File", "Hook"], "line": [3, None], "name": ["x", None]})
+    frame = pa.Table.from_pandas(df).to_pandas(types_mapper=pd.ArrowDtype)
+    assert [cq.ast_props(frame.iloc[i].to_dict()) for i in range(2)] == [{"line": 3.0, "name": "x"}, {"line": None, "name": None}]
+
+def test_group_ast_labels_rows_and_skips_missing_ids():
+    nodes, edges = cq.group_ast(
+        [{"id": "f", "type": "File", "path": "a.ts"}, {"id": None, "type": "File"}, {"id": "c", "type": "Widget"}],
+        [{"source": "f", "target": "c", "type": "CONTAINS"}, {"source": "f", "target": None}, {"source": "c", "target": "f"}],
+    )
+    assert nodes == {"CodeFile": [{"id": "f", "props": {"path": "a.ts"}}], "Code": [{"id": "c", "props": {}}]}
+    assert edges == {"CONTAINS": [{"src": "f", "tgt": "c"}], "RELATED_TO": [{"src": "c", "tgt": "f"}]}
+
+def test_match_by_id_seeks_each_id_indexed_label():
+    q = cq.match_by_id("a", "source")
+    assert q.startswith("CALL { ") and q.endswith("} ")
+    branches = q[len("CALL { "):-len("} ")].strip().split(" UNION ")
+    assert branches == [f"MATCH (a:{label} {{id:$source}}) RETURN a" for label in cq.ID_LABELS]
+    assert cq.ID_LABELS[0] == "CodeNode"
+
+def test_code_node_backfill_labels_legacy_code_nodes_in_batches():
+    q, params = cq.code_node_backfill()
+    assert params == {}
+    assert "NOT n:CodeNode" in q and "SET n:CodeNode" in q
+    assert q.endswith("IN TRANSACTIONS OF 10000 ROWS")
+    assert all(f"'{label}'" in q for label in ["CodeFile", "Component", "Function", "Hook", "Import", "Export", "Code"])
+
+def test_neighbors_pages_the_root_and_caps_later_hops():
+    q, params = cq.neighbors("fn_a", depth=1, rel_types=None, limit=50, fanout=10, cursor=None)
+    assert q.startswith(cq.match_by_id())
+    assert "LIMIT $fanout" not in q
+    assert "ORDER BY key LIMIT $page" in q
+    assert params == {"id": "fn_a", "types": None, "limit": 50, "page": 51, "fanout": 10, "after": None}
+
+    q3, params3 = cq.neighbors("fn_a", depth=3, rel_types=["CALLS", "RENDERS"], limit=0, fanout=0, cursor="b|CALLS|out")
+    assert q3.count("LIMIT $fanout") == 2
+    assert q3.startswith(q[:q.index("RETURN n.id AS root")])
+    assert params3 == {"id": "fn_a", "types": ["CALLS", "RENDERS"], "limit": 1, "page": 2, "fanout": 1, "after": "b|CALLS|out"}
+
+def test_shape_neighbors_drops_the_root_and_repeated_rows():
+    rows = [{
+        "root": "a",
+        "next_key": "c|CALLS|out",
+        "nodes": [{"id": "b"}, {"id": "a"}, {"id": "c"}, {"id": "b"}],
+        "edges": [
+            {"rid": "1", "source": "a", "target": "b", "type": "CALLS"},
+            {"rid": "2", "source": "a", "target": "c", "type": "CALLS"},
+            {"rid": "1", "source": "a", "target": "b", "type": "CALLS"},
+        ],
+    }]
+    assert cq.shape_neighbors("a", rows) == {
+        "nodes": [{"id": "b"}, {"id": "c"}],
+        "edges": [{"source": "a", "target": "b", "type": "CALLS"}, {"source": "a", "target": "c", "type": "CALLS"}],
+        "next_cursor": "c|CALLS|out",
+    }
+    assert cq.shape_neighbors("a", []) == {"nodes": [], "edges": [], "next_cursor": None}
+
+def test_export_nodes_page_is_keyset_paged_on_id_then_element_id():
+    q, params = cq.export_nodes_page("CodeNode", None, None, None, 100, ["CodeNode"])
+    assert q.startswith("MATCH (n:`CodeNode`) WHERE n.id IS NOT NULL AND NOT any(l IN labels(n) WHERE l IN $skip) ")
+    assert q.endswith("ORDER BY n.id, elementId(n) LIMIT $page")
+    assert params == {"after": None, "after_eid": None, "labels": None, "skip": ["CodeNode"], "props": None, "page": 100}
+
+    q, params = cq.export_nodes_page("CodeNode", ["Function"], ["name"], ("fn_a", "4:x:7"), 10)
+    assert "WHERE n.id >= $after AND (n.id > $after OR elementId(n) > $after_eid) AND any(l IN labels(n) WHERE l IN $labels) " in q
+    assert "[k IN $props | n[k]] AS vals" in q
+    assert (params["after"], params["after_eid"], params["labels"], params["props"]) == ("fn_a", "4:x:7", ["Function"], ["name"])
+
+def test_full_export_ends_with_a_pass_over_the_rest_of_the_graph():
+    sources = cq.export_sources(None)
+    assert [s[0] for s in sources] == cq.ID_LABELS + [None]
+    assert sources[-1] == (None, None, cq.ID_LABELS)
+    assert cq.export_sources(["Function"]) == [("CodeNode", ["Function"], [])]
+    q, _ = cq.export_nodes_page(None, None, None, ("x", "4:x:9"), 10, cq.ID_LABELS)
+    assert q.startswith("MATCH (n) WHERE NOT n:GraphMeta AND (n.id IS NULL OR NOT any(l IN labels(n) WHERE l IN $skip)) AND elementId(n) > $after_eid ")
+    assert q.endswith("ORDER BY elementId(n) LIMIT $page")
+    q, _ = cq.export_edges_page(None, None, None, 10, cq.ID_LABELS)
+    assert "WITH a ORDER BY elementId(a) LIMIT $page" in q
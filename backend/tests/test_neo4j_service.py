@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+from app.services import neo4j_queries as cq
+from app.services.neo4j import AsyncNeo4jService, Neo4jService, add_write_listener, remove_write_listener
+
+ENTITIES = [{"id": "src/a.ts", "type": "File"}, {"id": "fn_a", "type": "Function", "name": "a"}]
+RELATIONSHIPS = [{"source": "src/a.ts", "target": "fn_a", "type": "CONTAINS"}]
+
+def _summary():
+    return SimpleNamespace(counters=SimpleNamespace(nodes_created=1, relationships_created=1))
+
+def _expected_calls():
+    return [
+        ("write", cq.code_node_index()[0]),
+        ("read", cq.await_indexes()[0]),
+        ("auto", cq.code_node_backfill()[0]),
+        ("write", cq.import_ast_nodes("CodeFile")),
+        ("write", cq.import_ast_nodes("Function")),
+        ("write", cq.import_ast_edges("CONTAINS")),
+        ("write", cq.bump_graph_version()[0]),
+    ]
+
+def test_import_backfills_code_node_labels_before_merging():
+    svc = Neo4jService(driver=object())
+    calls = []
+    svc._run_write = lambda q, p: calls.append(("write", q)) or _summary()
+    svc._run_read = lambda q, p=None: calls.append(("read", q)) or []
+    svc._run_auto = lambda q, p: calls.append(("auto", q)) or _summary()
+    res = svc.import_ast(ENTITIES, RELATIONSHIPS)
+    assert calls == _expected_calls()
+    assert (res["nodes"], res["edges"], res["batches"]) == (2, 1, 3)
+
+def test_async_import_backfills_code_node_labels_before_merging():
+    svc = AsyncNeo4jService(driver=object())
+    calls = []
+
+    async def write(q, p):
+        calls.append(("write", q))
+        return _summary()
+
+    async def read(q, p=None):
+        calls.append(("read", q))
+        return []
+
+    async def auto(q, p):
+        calls.append(("auto", q))
+        return _summary()
+
+    svc._run_write, svc._run_read, svc._run_auto = write, read, auto
+    asyncio.run(svc.import_ast(ENTITIES, RELATIONSHIPS))
+    assert calls == _expected_calls()
+
+def test_crm_writes_bump_the_graph_version_and_report_it():
+    svc = Neo4jService(driver=object())
+    writes = []
+    versions = iter(["3:0:7", "3:1:8"])
+    svc._run_versioned = lambda q, p: writes.append(q) or (_summary(), next(versions))
+    events = []
+    listener = lambda event, data: events.append((event, data))
+    add_write_listener(listener)
+    try:
+        svc.create_customer({"customer_id": "c1", "company_id": "co1", "name": "Ada"})
+    finally:
+        remove_write_listener(listener)
+    assert writes == [cq.merge_entity("Customer", "customer_id", {})[0], cq.link_customer_to_company("c1", "co1")[0]]
+    assert all("MERGE (m:GraphMeta {id:'graph'}) SET m.version = coalesce(m.version, 0) + 1" in q for q in writes)
+    assert events == [
+        ("node", {"label": "Customer", "id": "c1", "props": {"customer_id": "c1", "company_id": "co1", "name": "Ada"}, "version": "3:0:7"}),
+        ("edge", {"source": "c1", "target": "co1", "type": "WORKS_AT", "version": "3:1:8"}),
+    ]
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+import pandas as pd
+from app.api.graphrag import _cached
+from app.services import query_cache as query_cache_module
+from app.services.graphrag_manager import GraphRAGManager
+from app.services.query_cache import QueryCache, filters_key, normalize_query
+
+def test_keys_fold_whitespace_and_filter_order_only():
+    assert normalize_query("  which  components\nrender GraphView ") == "which components render GraphView"
+    assert normalize_query("GraphView") != normalize_query("graphview")
+    assert filters_key({"b": 1, "a": 2}) == filters_key({"a": 2, "b": 1})
+    assert filters_key(None) == filters_key({})
+
+def test_entries_expire_and_evict(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache_module.time, "monotonic", lambda: now[0])
+    cache = QueryCache(max_size=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") is None
+    now[0] += 11
+    assert cache.get("b") is None
+    assert cache.stats()["size"] == 1
+    assert QueryCache(max_size=0).get("a") is None
+
+def _write_units(index_root, run, texts):
+    artifacts = os.path.join(index_root, run, "artifacts")
+    os.makedirs(artifacts, exist_ok=True)
+    pd.DataFrame({"text": texts}).to_parquet(os.path.join(artifacts, "create_final_text_units.parquet"), index=False)
+
+def test_reload_clears_the_cache_and_changes_the_key(tmp_path):
+    root = str(tmp_path)
+    _write_units(root, "1", ["graph view"])
+    manager = GraphRAGManager(root, reload_interval=0)
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return {"answer": manager.service.unit_bm25.n_docs}
+
+    def query():
+        return json.loads(asyncio.run(_cached(manager, manager.service, "local", ("graph",), run)).body)
+
+    assert query() == {"answer": 1}
+    assert query() == {"answer": 1}
+    assert len(calls) == 1
+    assert manager.refresh() is False
+    assert manager.cache.stats()["size"] == 1
+
+    _write_units(root, "2", ["graph view", "graph api"])
+    assert manager.refresh() is True
+    assert manager.cache.stats()["size"] == 0
+    assert query() == {"answer": 2}
+    assert len(calls) == 2
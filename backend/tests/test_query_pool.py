@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import threading
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from app.api.graphrag import _slot
+from app.core.config import settings
+from app.services.graphrag import GraphRAGService
+from app.services.query_pool import EndpointLimiter, QueueFull, get_limiter, run_blocking, shutdown_query_pool
+
+def test_limiter_queues_up_to_its_depth_then_rejects():
+    async def scenario():
+        lim = EndpointLimiter("t", concurrency=1, queue_depth=1)
+        gate = asyncio.Event()
+        order = []
+
+        async def job(name):
+            async with lim.slot():
+                order.append(name)
+                await gate.wait()
+
+        first = asyncio.create_task(job("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job("second"))
+        await asyncio.sleep(0)
+        assert (lim.running, lim.waiting) == (1, 1)
+        with pytest.raises(QueueFull):
+            async with lim.slot():
+                pass
+        gate.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert lim.stats() == {"concurrency": 1, "queue_depth": 1, "running": 0, "waiting": 0, "rejected": 1}
+
+    asyncio.run(scenario())
+
+def test_full_queue_is_a_503_with_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "graphrag_query_concurrency", {"local": 1})
+    monkeypatch.setattr(settings, "graphrag_query_queue_depth", {"local": 0})
+    shutdown_query_pool()
+
+    async def scenario():
+        async with _slot("local"):
+            with pytest.raises(HTTPException) as exc:
+                async with _slot("local"):
+                    pass
+        assert exc.value.status_code == 503
+        assert exc.value.headers == {"Retry-After": "1"}
+        async with _slot("local"):
+            pass
+        assert get_limiter("local").stats()["rejected"] == 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        shutdown_query_pool()
+
+def test_run_blocking_carries_the_callers_context():
+    var = contextvars.ContextVar("var", default=None)
+
+    async def scenario():
+        var.set("request-1")
+        return await run_blocking(lambda: (var.get(), threading.current_thread().name))
+
+    value, thread = asyncio.run(scenario())
+    assert value == "request-1"
+    assert thread.startswith("graphrag-query")
+
+def test_filter_masks_are_built_on_the_query_pool(monkeypatch):
+    df = pd.DataFrame({"text": ["graph view", "graph api"], "document_id": ["frontend/src/lib/a.ts", "frontend/src/app/b.ts"]})
+    svc = GraphRAGService.from_frames(text_units=df)
+    threads = []
+    real = svc._filter_mask
+    monkeypatch.setattr(svc, "_filter_mask", lambda filters: threads.append(threading.current_thread().name) or real(filters))
+
+    async def scenario():
+        events = [ev async for ev in svc.local_search_stream("graph", filters={"document_id_regex": "lib"})]
+        await svc.drift_search("graph", ["Q1", "Q3"], filters={"document_id_contains": "src"})
+        return events
+
+    events = asyncio.run(scenario())
+    assert [ev["document_id"] for ev in events if ev["type"] == "citation"] == ["frontend/src/lib/a.ts"]
+    assert threads and all(t.startswith("graphrag-query") for t in threads)
@@ -13,6 +13,7 @@ export default function GraphView() {
   const [q, setQ] = useState('')
   const [selectedId, setSelectedId] = useState<string | null>(null)
   const [rfInstance, setRfInstance] = useState<any>(null)
+  const [cursors, setCursors] = useState<Record<string, string | null>>({})
 
   useEffect(() => {
     setLoading(true)
@@ -159,7 +160,9 @@ export default function GraphView() {
                   onClick={async () => {
                     try {
                       setLoading(true)
-                      const { data } = await graphAPI.neighbors(String(selectedNode.id), 1)
+                      const nid = String(selectedNode.id)
+                      const { data } = await graphAPI.neighbors(nid, 1, { cursor: cursors[nid] })
+                      setCursors(prev => ({ ...prev, [nid]: data.next_cursor ?? null }))
                       setRaw(prev => {
                         const pn = prev?.nodes || []
                         const pe = prev?.edges || []
@@ -178,7 +181,7 @@ export default function GraphView() {
                     }
                   }}
                   disabled={loading}
-                >{loading ? 'Expanding...' : 'Expand neighbors'}</button>
+                >{loading ? 'Expanding...' : cursors[String(selectedNode.id)] ? 'Load more neighbors' : 'Expand neighbors'}</button>
               </div>
               <div className="text-sm font-semibold mt-3">Connected Edges</div>
               <ul className="text-xs list-disc pl-4">
@@ -13,10 +13,43 @@ export const graphragAPI = {
   localQuery: (query: string, history?: any[]) => api.post('/api/graphrag/query/local', { query, history }),
   globalQuery: (query: string, history?: any[]) => api.post('/api/graphrag/query/global', { query, history }),
   driftQuery: (query: string, periods: string[]) => api.post('/api/graphrag/query/drift', { query, periods }),
+  batchQuery: (queries: { query: string; top_k?: number; offset?: number; min_score?: number; filters?: Record<string, any> }[]) => api.post('/api/graphrag/query/batch', { queries }),
+  entity: (id: string) => api.get(`/api/graphrag/entities/${encodeURIComponent(id)}`),
+  searchEntities: (q: string, limit: number = 10) => api.get('/api/graphrag/entities/search', { params: { q, limit } }),
+}
+
+// Reads an NDJSON query stream (/query/local/stream, /query/global/stream) and hands
+// each event to onEvent as soon as its line arrives.
+export async function streamGraphragQuery(path: 'local' | 'global', body: { query: string; top_k?: number; filters?: Record<string, any> }, onEvent: (event: any) => void) {
+  const res = await fetch(`${api.defaults.baseURL}/api/graphrag/query/${path}/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+    body: JSON.stringify(body),
+  })
+  if (!res.ok || !res.body) throw new Error(`Stream request failed: ${res.status}`)
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buf = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buf += decoder.decode(value, { stream: true })
+    let nl
+    while ((nl = buf.indexOf('\n')) >= 0) {
+      const line = buf.slice(0, nl).trim()
+      buf = buf.slice(nl + 1)
+      if (line) onEvent(JSON.parse(line))
+    }
+  }
+  if (buf.trim()) onEvent(JSON.parse(buf))
 }
 
 export const graphAPI = {
   export: (dataset?: string) => api.get('/api/graph/export', { params: { dataset: dataset || 'crm' } }),
   exportCode: () => api.get('/api/graph/export', { params: { dataset: 'code' } }),
-  neighbors: (id: string, depth: number = 1) => api.get(`/api/graph/neighbors/${id}`, { params: { depth } }),
+  exportLod: (dataset: string, lod: 'directory' | 'community') => api.get('/api/graph/export', { params: { dataset, lod } }),
+  lodMembers: (dataset: string, lod: 'directory' | 'community', group: string, offset: number = 0, limit: number = 500) =>
+    api.get('/api/graph/export/members', { params: { dataset, lod, group, offset, limit } }),
+  neighbors: (id: string, depth: number = 1, opts: { types?: string[]; limit?: number; fanout?: number; cursor?: string | null } = {}) =>
+    api.get(`/api/graph/neighbors/${id}`, { params: { depth, types: opts.types?.join(','), limit: opts.limit, fanout: opts.fanout, cursor: opts.cursor || undefined } }),
 }
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_artifacts import VOCAB, add_size_args, sizes_from, generate_frames, write_artifacts
+
+STRUCTURAL = {
+    "calls": "List functions that call graphAPI.",
+    "renders": "Which components render GraphView?",
+    "imports": "Which files import @/lib/api?",
+}
+
+def _rss_mb() -> float:
+    # Peak resident set of this process. VmHWM belongs to the current address space, whereas
+    # ru_maxrss survives exec and would report the parent's peak in the worker.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _percentiles(lat) -> dict:
+    a = np.asarray(lat) * 1000.0
+    return {
+        "n": int(a.size),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "mean_ms": round(float(a.mean()), 3),
+    }
+
+def _timed(fn, args_list, warmup: int = 1) -> dict:
+    for args in args_list[:warmup]:
+        fn(*args)
+    lat = []
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        lat.append(time.perf_counter() - t)
+    return _percentiles(lat)
+
+def measure(index_path: str, artifacts_dir: str, queries: int, top_k: int, seed: int = 1) -> dict:
+    # Runs in its own process (see run()) so peak RSS covers just the load and the queries.
+    from app.services.graphrag import GraphRAGService
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    svc = GraphRAGService(index_path, artifacts_dir=artifacts_dir)
+    load_s = time.perf_counter() - t0
+    rss_loaded = _rss_mb()
+    rng = np.random.default_rng(seed)
+    texts = [" ".join(rng.choice(VOCAB, 3)) for _ in range(queries)]
+    # Query vectors are supplied directly, so no embedding provider or key is needed and
+    # the numbers cover retrieval only.
+    dim = svc.embedding_matrix.shape[1] if svc.embedding_matrix is not None else 0
+    qembs = [rng.standard_normal(dim).tolist() if dim else [] for _ in range(queries)]
+    periods = list(svc.segment_masks) or ["Q1"]
+    latency = {
+        "local": _timed(svc._local_search, [(q, top_k, 0, 0.0, None, None, e) for q, e in zip(texts, qembs)]),
+        "global": _timed(svc._global_search, [(q, top_k) for q in texts]),
+        "drift": _timed(svc._drift_search, [(q, periods, top_k, 0.0, None, None, e) for q, e in zip(texts, qembs)]),
+    }
+    for name, q in STRUCTURAL.items():
+        latency[f"structural_{name}"] = _timed(svc._local_search, [(q, top_k, 0, 0.0, None, None, e) for e in qembs])
+    return {
+        "load_s": round(load_s, 3),
+        "rss_before_load_mb": rss_before,
+        "rss_after_load_mb": rss_loaded,
+        "peak_rss_mb": _rss_mb(),
+        "ann_index": svc.ann_index is not None,
+        "latency": latency,
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+def run(a) -> list:
+    results = []
+    commit = _git_commit()
+    for units in [int(u) for u in str(a.units).split(",")]:
+        a_units = argparse.Namespace(**{**vars(a), "units": units})
+        sizes = sizes_from(a_units)
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = a.artifacts_root or tmp
+            artifacts_dir = None if a.artifacts_root else write_artifacts(index_path, generate_frames(seed=a.seed, **sizes), columnar=a.columnar)
+            if artifacts_dir is None:
+                from app.services.graphrag import latest_artifacts_dir
+                artifacts_dir = latest_artifacts_dir(index_path)
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", index_path, artifacts_dir, "--queries", str(a.queries), "--top-k", str(a.top_k)],
+                capture_output=True, text=True, check=True,
+            )
+            res = {"commit": commit, "sizes": sizes if not a.artifacts_root else {"artifacts_dir": artifacts_dir}, "columnar": a.columnar, "queries": a.queries, "top_k": a.top_k}
+            res.update(json.loads(out.stdout.strip().splitlines()[-1]))
+            print(json.dumps(res), flush=True)
+            results.append(res)
+        if a.artifacts_root:
+            break
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        wp = argparse.ArgumentParser()
+        wp.add_argument("index_path")
+        wp.add_argument("artifacts_dir")
+        wp.add_argument("--queries", type=int)
+        wp.add_argument("--top-k", type=int)
+        w = wp.parse_args(sys.argv[2:])
+        print(json.dumps(measure(w.index_path, w.artifacts_dir, w.queries, w.top_k)))
+        sys.exit(0)
+    ap = argparse.ArgumentParser(description="Offline GraphRAGService benchmark: load time, peak RSS and query latency percentiles (JSON lines)")
+    add_size_args(ap)
+    ap.add_argument("--units", default="10000", help="comma-separated text-unit counts, one run each")
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--columnar", action="store_true", help="benchmark the memory-mapped artifact layout")
+    ap.add_argument("--artifacts-root", default=None, help="benchmark an existing index path instead of generating one")
+    ap.add_argument("--out", default=None, help="also write all results as a JSON array to this file")
+    a = ap.parse_args()
+    results = run(a)
+    if a.out:
+        with open(a.out, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_graphrag import _percentiles, _git_commit
+
+PREFIX = "bench_"
+TYPES = ["File", "Component", "Function", "Hook", "Import", "Export"]
+REL_TYPES = ["CONTAINS", "IMPORTS", "CALLS", "RENDERS"]
+
+# Cypher as it was before the code-graph schema: unlabeled id matches, i.e. an all-nodes scan each.
+LEGACY_NEIGHBORS = [
+    "MATCH (n {id:$id})-[]->(m) RETURN m.id AS id, labels(m) AS labels, properties(m) AS props",
+    "MATCH (m)-[]->(n {id:$id}) RETURN m.id AS id, labels(m) AS labels, properties(m) AS props",
+    "MATCH (n {id:$id})-[r]->(m) RETURN n.id AS source, m.id AS target, type(r) AS type",
+    "MATCH (m)-[r]->(n {id:$id}) RETURN m.id AS source, n.id AS target, type(r) AS type",
+]
+LEGACY_EDGE = "MATCH (a {id:$src}),(b {id:$tgt}) MERGE (a)-[:BENCH_LEGACY]->(b)"
+
+def synthetic_graph(nodes: int, edges_per_node: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, len(TYPES), size=nodes)
+    entities = [{"id": f"{PREFIX}{i}", "type": TYPES[k], "name": f"n{i}"} for i, k in enumerate(kinds)]
+    m = nodes * edges_per_node
+    src = rng.integers(0, nodes, size=m)
+    dst = rng.integers(0, nodes, size=m)
+    rtype = rng.integers(0, len(REL_TYPES), size=m)
+    relationships = [{"source": f"{PREFIX}{s}", "target": f"{PREFIX}{t}", "type": REL_TYPES[r]} for s, t, r in zip(src, dst, rtype)]
+    return entities, relationships
+
+def _lat(fn, ids) -> dict:
+    fn(ids[0])
+    lat = []
+    for i in ids:
+        t = time.perf_counter()
+        fn(i)
+        lat.append(time.perf_counter() - t)
+    return _percentiles(lat)
+
+def run(a) -> dict:
+    from app.services.neo4j import Neo4jService
+    from app.db.neo4j_schema import init_schema
+    neo = Neo4jService()
+    try:
+        init_schema(neo._driver)
+        res = {"commit": _git_commit(), "nodes": a.nodes, "edges": a.nodes * a.edges_per_node, "lookups": a.lookups}
+        if not a.skip_load:
+            entities, relationships = synthetic_graph(a.nodes, a.edges_per_node, a.seed)
+            res["import"] = neo.import_ast(entities, relationships, batch_size=a.batch_size)
+            res["import"].pop("labels", None)
+            res["import"].pop("types", None)
+            del entities, relationships
+        rng = np.random.default_rng(a.seed + 1)
+        ids = [f"{PREFIX}{i}" for i in rng.integers(0, a.nodes, size=a.lookups)]
+        res["get_neighbors_indexed"] = _lat(lambda i: neo.get_neighbors(i), ids)
+        # The legacy queries scan every node, so a handful of samples is already conclusive at 1M.
+        legacy_ids = ids[:a.legacy_lookups]
+        res["get_neighbors_legacy"] = _lat(lambda i: [neo._run_read(q, {"id": i}) for q in LEGACY_NEIGHBORS], legacy_ids)
+        pairs = list(zip(legacy_ids, reversed(legacy_ids)))
+        t = time.perf_counter()
+        for s, d in pairs:
+            neo._run_write(LEGACY_EDGE, {"src": s, "tgt": d})
+        res["legacy_edge_rows_per_s"] = round(len(pairs) / max(time.perf_counter() - t, 1e-9), 1)
+        neo._run_write("MATCH ()-[r:BENCH_LEGACY]->() DELETE r", {})
+        if a.cleanup:
+            with neo._session() as session:
+                session.run(
+                    "MATCH (n:CodeNode) WHERE n.id STARTS WITH $prefix "
+                    "CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS",
+                    prefix=PREFIX,
+                ).consume()
+        return res
+    finally:
+        neo.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Neo4j id-lookup benchmark: indexed code-graph lookups vs the legacy unlabeled matches (needs a running Neo4j; writes bench_* nodes)")
+    ap.add_argument("--nodes", type=int, default=1000000)
+    ap.add_argument("--edges-per-node", type=int, default=2)
+    ap.add_argument("--batch-size", type=int, default=None, help="defaults to NEO4J_IMPORT_BATCH_SIZE")
+    ap.add_argument("--lookups", type=int, default=200)
+    ap.add_argument("--legacy-lookups", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--skip-load", action="store_true", help="reuse bench_* nodes from a previous run")
+    ap.add_argument("--cleanup", action="store_true", help="delete the bench_* nodes afterwards")
+    a = ap.parse_args()
+    print(json.dumps(run(a)), flush=True)
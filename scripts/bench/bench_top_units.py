@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
+
+from app.services.graphrag import GraphRAGService
+
+VOCAB = ["graph", "view", "render", "component", "hook", "import", "export", "query", "node", "edge",
+         "layout", "state", "effect", "fetch", "api", "button", "panel", "search", "index", "filter"]
+
+def synthetic_units(n: int, dim: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(VOCAB)[rng.integers(0, len(VOCAB), size=(n, 12))]
+    texts = [" ".join(w) for w in words]
+    emb = rng.standard_normal((n, dim), dtype=np.float32)
+    return pd.DataFrame({
+        "document_id": [f"frontend/src/components/File{i % 1000}.tsx" for i in range(n)],
+        "chunk_id": np.arange(n),
+        "text": texts,
+        "embedding": list(emb),
+    })
+
+def run(sizes, dim: int, queries: int, top_k: int):
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        t0 = time.perf_counter()
+        svc = GraphRAGService.from_frames(text_units=synthetic_units(n, dim))
+        load_s = time.perf_counter() - t0
+        qvecs = rng.standard_normal((queries, dim), dtype=np.float32)
+        lat = []
+        for i in range(queries):
+            t = time.perf_counter()
+            svc._top_units("graph render", k=top_k, qemb=qvecs[i].tolist())
+            lat.append((time.perf_counter() - t) * 1000.0)
+        lat = np.array(lat)
+        print(json.dumps({
+            "text_units": n,
+            "dim": dim,
+            "build_s": round(load_s, 3),
+            "p50_ms": round(float(np.percentile(lat, 50)), 3),
+            "p95_ms": round(float(np.percentile(lat, 95)), 3),
+            "mean_ms": round(float(lat.mean()), 3),
+        }))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Per-query latency of GraphRAGService._top_units")
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--dim", type=int, default=128)
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--top-k", type=int, default=10)
+    a = ap.parse_args()
+    run([int(s) for s in a.sizes.split(",")], a.dim, a.queries, a.top_k)
@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
+
+VOCAB = ["graph", "view", "render", "component", "hook", "import", "export", "query", "node", "edge",
+         "layout", "state", "effect", "fetch", "api", "button", "panel", "search", "index", "filter"]
+DIRS = ["frontend/src/components", "frontend/src/app", "frontend/src/lib", "frontend/src/hooks"]
+MODULES = ["@/lib/api", "@/lib/utils", "react", "next/link", "@/components/graph/GraphView"]
+API_CALLS = ["graphAPI.export", "graphAPI.exportCode", "graphAPI.neighbors", "graphragAPI.localQuery", "graphragAPI.globalQuery"]
+
+def generate_frames(units: int, dim: int, entities: int, relationships: int, reports: int, seed: int = 0):
+    # Same column layout as scripts/graphrag/run_indexing.py, sized at will; entity ids use the
+    # cmp_/fn_/imp_ prefixes so every structural branch of local search has something to find.
+    rng = np.random.default_rng(seed)
+    files = max(1, units // 4)
+    words = np.array(VOCAB)[rng.integers(0, len(VOCAB), size=(units, 24))]
+    doc_ids = [f"{DIRS[i % len(DIRS)]}/File{i}.tsx" for i in range(files)]
+    text_units = pd.DataFrame({
+        "chunk_id": np.arange(units),
+        "document_id": [doc_ids[i % files] for i in range(units)],
+        "text": [" ".join(w) for w in words],
+    })
+    if dim > 0:
+        text_units["embedding"] = list(rng.standard_normal((units, dim), dtype=np.float32))
+
+    kinds = rng.integers(0, 3, size=entities)
+    ent_ids, ent_names, ent_types = [], [], []
+    for i, k in enumerate(kinds):
+        if k == 0:
+            name = f"{VOCAB[i % len(VOCAB)].capitalize()}Panel{i}"
+            ent_ids.append(f"cmp_{name}")
+            ent_types.append("Component")
+        elif k == 1:
+            name = f"use{VOCAB[i % len(VOCAB)].capitalize()}{i}"
+            ent_ids.append(f"fn_{name}")
+            ent_types.append("Function")
+        else:
+            name = f"{DIRS[i % len(DIRS)]}/File{i}.tsx"
+            ent_ids.append(name)
+            ent_types.append("File")
+        ent_names.append(name)
+    ents = pd.DataFrame({
+        "id": ent_ids,
+        "name": ent_names,
+        "type": ent_types,
+        "description": [f"{t} {n}" for t, n in zip(ent_types, ent_names)],
+    })
+
+    if not entities:
+        relationships = 0
+    src = rng.integers(0, max(1, entities), size=relationships)
+    rel_kind = rng.integers(0, 3, size=relationships)
+    targets = []
+    types = []
+    for s, k in zip(src, rel_kind):
+        if k == 0:
+            targets.append(API_CALLS[s % len(API_CALLS)])
+            types.append("CALLS")
+        elif k == 1:
+            targets.append("cmp_GraphView" if s % 10 == 0 else ent_ids[int(rng.integers(0, entities))])
+            types.append("RENDERS")
+        else:
+            targets.append(f"imp_{MODULES[s % len(MODULES)]}")
+            types.append("IMPORTS")
+    rels = pd.DataFrame({"source": [ent_ids[s] for s in src], "target": targets, "type": types})
+
+    rep_words = np.array(VOCAB)[rng.integers(0, len(VOCAB), size=(reports, 40))]
+    reps = pd.DataFrame({
+        "community_id": [f"{DIRS[i % len(DIRS)]}/group{i}" for i in range(reports)],
+        "report": [" ".join(w) for w in rep_words],
+        "components": rng.integers(0, 50, size=reports),
+        "functions": rng.integers(0, 200, size=reports),
+    })
+    return {
+        "create_final_text_units": text_units,
+        "create_final_entities": ents,
+        "create_final_relationships": rels,
+        "create_final_community_reports": reps,
+    }
+
+def write_artifacts(index_path: str, frames, run_id: str = "1", columnar: bool = False) -> str:
+    artifacts_dir = os.path.join(index_path, run_id, "artifacts")
+    os.makedirs(artifacts_dir, exist_ok=True)
+    for name, df in frames.items():
+        df.to_parquet(os.path.join(artifacts_dir, name + ".parquet"), index=False)
+    if columnar:
+        from app.services.graphrag import GraphRAGService
+        svc = GraphRAGService(index_path, artifacts_dir=artifacts_dir)
+        svc.write_columnar()
+        svc.save_keyword_index()
+        svc.build_ann_index()
+    return artifacts_dir
+
+def add_size_args(ap: argparse.ArgumentParser):
+    # --units is left to the caller: a single count here, a comma-separated sweep in the benchmark.
+    ap.add_argument("--dim", type=int, default=128, help="0 writes text units without embeddings")
+    ap.add_argument("--entities", type=int, default=None, help="defaults to units / 2")
+    ap.add_argument("--relationships", type=int, default=None, help="defaults to 4 x entities")
+    ap.add_argument("--reports", type=int, default=None, help="defaults to units / 50")
+    ap.add_argument("--seed", type=int, default=0)
+
+def sizes_from(a) -> dict:
+    entities = a.entities if a.entities is not None else max(1, a.units // 2)
+    return {
+        "units": a.units,
+        "dim": a.dim,
+        "entities": entities,
+        "relationships": a.relationships if a.relationships is not None else 4 * entities,
+        "reports": a.reports if a.reports is not None else max(1, a.units // 50),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic GraphRAG artifacts directory (create_final_*.parquet)")
+    ap.add_argument("out", help="index path; artifacts go to <out>/<run-id>/artifacts")
+    ap.add_argument("--run-id", default="1")
+    ap.add_argument("--columnar", action="store_true", help="also write the memory-mapped copies and BM25/ANN indexes")
+    ap.add_argument("--units", type=int, default=10000)
+    add_size_args(ap)
+    a = ap.parse_args()
+    sizes = sizes_from(a)
+    path = write_artifacts(a.out, generate_frames(seed=a.seed, **sizes), run_id=a.run_id, columnar=a.columnar)
+    print(json.dumps({"artifacts_dir": path, **sizes}))
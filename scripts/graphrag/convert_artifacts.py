@@ -0,0 +1,27 @@
+import os
+import sys
+import json
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
+
+from app.services.graphrag import GraphRAGService, latest_artifacts_dir
+
+def main():
+    ap = argparse.ArgumentParser(description="Write memory-mappable copies (Arrow IPC, .npy) of an existing GraphRAG artifacts directory.")
+    ap.add_argument("--index-path", default=os.getenv("GRAPHRAG_INDEX_PATH", "graphrag-pipeline/output"))
+    ap.add_argument("--artifacts-dir", default=None, help="defaults to the latest <run>/artifacts under --index-path")
+    args = ap.parse_args()
+    target = args.artifacts_dir or latest_artifacts_dir(args.index_path)
+    if not target:
+        sys.exit(f"No artifacts found under {args.index_path}")
+    svc = GraphRAGService(args.index_path, artifacts_dir=target)
+    out = svc.write_columnar()
+    out["bm25"] = svc.save_keyword_index()
+    out["ann"] = svc.build_ann_index()
+    print(json.dumps({"artifacts_dir": target, **out}))
+
+if __name__ == "__main__":
+    main()
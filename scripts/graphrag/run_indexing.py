@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import glob
 import pandas as pd
@@ -9,6 +10,8 @@ except Exception:
     genai = None
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.append(BACKEND)
 INPUT_DIR = os.path.join(ROOT, "data", "output", "input")
 DEF_OUT_BASE = os.getenv("GRAPHRAG_INDEX_PATH", "graphrag-pipeline/output")
 PIPELINE_OUT = DEF_OUT_BASE if os.path.isabs(DEF_OUT_BASE) else os.path.join(ROOT, DEF_OUT_BASE)
@@ -99,6 +102,18 @@ def run():
         pd.DataFrame(columns=["source","target","type"]).to_parquet(os.path.join(artifacts_dir, "create_final_relationships.parquet"), compression="snappy")
     pd.DataFrame(reports_rows).to_parquet(os.path.join(artifacts_dir, "create_final_community_reports.parquet"), compression="snappy")
 
+    from app.services.graphrag import GraphRAGService
+    svc = GraphRAGService(PIPELINE_OUT, artifacts_dir=artifacts_dir)
+    # Columnar copies first: the ANN index is only trusted if it is newer than the embeddings sidecar.
+    cols = svc.write_columnar()
+    print(f"Columnar artifacts written: {', '.join(cols['written'])}")
+    bm25 = svc.save_keyword_index()
+    if bm25:
+        print(f"BM25 index written to: {bm25}")
+    ann = svc.build_ann_index()
+    if ann.get("built"):
+        print(f"ANN index written to: {ann['path']}")
+
     print(f"Artifacts written to: {artifacts_dir}")
 
 if __name__ == "__main__":